@@ -3,15 +3,20 @@
 Script para crear municipios iniciales de Colombia
 """
 
-import sqlite3
-from datetime import datetime
 import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+
+from sqlalchemy import DateTime, bindparam, inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import get_engine
 
 def crear_municipios_iniciales():
     """Crea municipios principales de Colombia."""
     
-    db_path = os.path.join('data', 'miloapps.db')
-    
     # Lista de municipios principales
     municipios = [
         ('BOGOTÁ', 'CUNDINAMARCA', '11001'),
@@ -36,17 +41,12 @@ def crear_municipios_iniciales():
         ('VALLEDUPAR', 'CESAR', '20001')
     ]
     
+    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = get_engine().connect()
         
         # Verificar si la tabla existe
-        cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='talent_municipios'
-        """)
-        
-        if not cursor.fetchone():
+        if not inspect(conn).has_table("talent_municipios"):
             print("❌ La tabla talent_municipios no existe")
             print("   Ejecuta el servidor para crear las tablas primero")
             return False
@@ -58,30 +58,33 @@ def crear_municipios_iniciales():
             nombre_completo = f"{nombre} - {departamento}"
             
             # Verificar si ya existe
-            cursor.execute("""
+            existe = conn.execute(text("""
                 SELECT id FROM talent_municipios 
-                WHERE nombre_completo = ?
-            """, (nombre_completo,))
+                WHERE nombre_completo = :nombre_completo
+            """), {'nombre_completo': nombre_completo}).first()
             
-            if cursor.fetchone():
+            if existe:
                 duplicados += 1
                 continue
             
             # Insertar municipio
-            cursor.execute("""
+            conn.execute(text("""
                 INSERT INTO talent_municipios (
                     nombre, departamento, codigo_dane, nombre_completo, 
                     activo, fecha_creacion, usuario_creacion
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                nombre,
-                departamento,
-                codigo_dane,
-                nombre_completo,
-                True,
-                datetime.now().isoformat(),
-                'SYSTEM'
-            ))
+                ) VALUES (
+                    :nombre, :departamento, :codigo_dane, :nombre_completo,
+                    :activo, :fecha_creacion, :usuario_creacion
+                )
+            """).bindparams(bindparam('fecha_creacion', type_=DateTime)), {
+                'nombre': nombre,
+                'departamento': departamento,
+                'codigo_dane': codigo_dane,
+                'nombre_completo': nombre_completo,
+                'activo': True,
+                'fecha_creacion': datetime.now(),
+                'usuario_creacion': 'SYSTEM'
+            })
             
             insertados += 1
         
@@ -93,13 +96,12 @@ def crear_municipios_iniciales():
         print(f"   - Total procesados: {len(municipios)}")
         
         # Verificar total
-        cursor.execute("SELECT COUNT(*) FROM talent_municipios")
-        total = cursor.fetchone()[0]
+        total = conn.execute(text("SELECT COUNT(*) FROM talent_municipios")).scalar()
         print(f"📊 Total municipios en BD: {total}")
         
         return True
         
-    except sqlite3.Error as e:
+    except SQLAlchemyError as e:
         print(f"❌ Error con la base de datos: {e}")
         return False
     except Exception as e:
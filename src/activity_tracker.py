@@ -0,0 +1,116 @@
+"""
+MiloApps - Registro de actividad de usuarios
+Buffer en memoria que agrupa las marcas de última actividad y las
+persiste en un UPDATE por lotes, en lugar de un commit por petición
+"""
+
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+
+from models import db, User
+from structured_logging import get_logger
+
+logger = get_logger("activity")
+
+
+class ActivityTracker:
+    """Acumula last_activity por usuario y lo escribe periódicamente.
+
+    - granularity: segundos mínimos entre dos marcas del mismo usuario;
+      las peticiones dentro de esa ventana no generan escritura
+    - flush_interval: segundos entre escrituras del lote pendiente
+    """
+
+    def __init__(self, flush_interval=30, granularity=60):
+        self.flush_interval = flush_interval
+        self.granularity = granularity
+        self._pending = {}
+        self._last_seen = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Lee la configuración y registra el flush al terminar el proceso"""
+        self.flush_interval = app.config.get(
+            "ACTIVITY_FLUSH_INTERVAL", self.flush_interval
+        )
+        self.granularity = app.config.get(
+            "ACTIVITY_GRANULARITY", self.granularity
+        )
+        app.extensions["activity_tracker"] = self
+
+        def _flush_on_exit():
+            with app.app_context():
+                self.flush()
+
+        atexit.register(_flush_on_exit)
+
+    def record(self, user_id, when=None):
+        """Registra actividad del usuario (sin tocar la base de datos)"""
+        when = when or datetime.utcnow()
+        with self._lock:
+            last = self._last_seen.get(user_id)
+            if last and (when - last).total_seconds() < self.granularity:
+                return False
+            self._last_seen[user_id] = when
+            self._pending[user_id] = when
+            return True
+
+    def discard(self, user_id):
+        """Olvida la marca pendiente del usuario (cierre de sesión): un
+        flush posterior no debe pisar el last_activity ya limpiado"""
+        with self._lock:
+            self._pending.pop(user_id, None)
+            self._last_seen.pop(user_id, None)
+
+    def flush_due(self):
+        """Indica si ya pasó el intervalo de escritura"""
+        return time.monotonic() - self._last_flush >= self.flush_interval
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Persiste las marcas pendientes en un único UPDATE por lotes.
+        Usa una conexión propia para no confirmar la sesión de la petición.
+        """
+        with self._lock:
+            self._last_flush = time.monotonic()
+            # Las marcas más viejas que la granularidad ya no limitan nada:
+            # se descartan para que el mapa no crezca con cada usuario
+            limite = datetime.utcnow() - timedelta(seconds=self.granularity)
+            self._last_seen = {
+                uid: ts for uid, ts in self._last_seen.items() if ts >= limite
+            }
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+
+        users = User.__table__
+        stmt = (
+            users.update()
+            .where(users.c.id == db.bindparam("uid"))
+            .values(last_activity=db.bindparam("ts"))
+        )
+        rows = [{"uid": uid, "ts": ts} for uid, ts in pending.items()]
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(stmt, rows)
+        except Exception as e:
+            logger.exception(
+                "❌ Error guardando actividad de usuarios: %s", e,
+                extra={"count": len(rows)},
+            )
+            # Reencolar sin pisar marcas más recientes
+            with self._lock:
+                for uid, ts in pending.items():
+                    current = self._pending.get(uid)
+                    if not current or current < ts:
+                        self._pending[uid] = ts
+            return 0
+        return len(rows)
+
+
+activity_tracker = ActivityTracker()
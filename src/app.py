@@ -2,6 +2,7 @@
 # Aplicación web flexible para trabajo remoto con autenticación completa
 
 import json
+import logging
 import os
 import secrets
 from datetime import datetime
@@ -13,17 +14,32 @@ from flask_moment import Moment
 from dotenv import load_dotenv
 
 # Importar módulos de autenticación
-from models import db, User, init_db, cleanup_old_audit_logs
+from models import db, User, init_db
 from auth_routes import auth
 from email_service import init_mail
+from activity_tracker import activity_tracker
+from audit_writer import audit_writer
+from retention import init_retention
+from catalog_cache import catalog_cache
+from image_pipeline import image_pipeline
+from query_profiler import query_profiler
+from structured_logging import configure_logging, get_logger
 
 # Cargar variables de entorno
 load_dotenv()
 
+logger = get_logger("app")
+request_logger = get_logger("request")
+
 
 class MiloAppsApp:
     def __init__(self):
         self.app = Flask(__name__)
+        configure_logging()
+        # La configuración de entorno se carga primero: define el perfil
+        # del motor de base de datos y el logging
+        self.config = self.load_config()
+        configure_logging(self.config.get("logging"))
         self.setup_config()
         self.setup_csrf()
         self.setup_database()
@@ -31,7 +47,6 @@ class MiloAppsApp:
         self.setup_email()
         self.setup_cors()
         self.setup_moment()
-        self.config = self.load_config()
         self.setup_routes()
         self.setup_error_handlers()
 
@@ -44,12 +59,28 @@ class MiloAppsApp:
         # CSRF se configurará en setup_csrf()
         self.app.config["WTF_CSRF_TIME_LIMIT"] = 3600  # 1 hora
 
-        # Base de datos SQLite
-        db_path = os.path.join(os.path.dirname(__file__), "..", "data", "miloapps.db")
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        self.app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+        # Base de datos: DATABASE_URL (PostgreSQL, MySQL...) o SQLite local
+        from database import (
+            DEFAULT_MAINTENANCE_MINUTES,
+            build_engine_options,
+            get_database_uri,
+            get_sqlite_pragmas,
+        )
+
+        db_settings = self.config.get("database", {})
+        database_uri = get_database_uri()
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+        self.app.config["SQLALCHEMY_ENGINE_OPTIONS"] = build_engine_options(
+            database_uri, db_settings
+        )
         self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+        # Perfil del motor SQLite por entorno (config/*.json -> database)
+        self.app.config["SQLITE_PRAGMAS"] = get_sqlite_pragmas(db_settings)
+        self.app.config["SQLITE_MAINTENANCE_MINUTES"] = db_settings.get(
+            "maintenance_interval_minutes", DEFAULT_MAINTENANCE_MINUTES
+        )
+
         # Configuración de seguridad
         self.app.config["SESSION_COOKIE_SECURE"] = False  # True en HTTPS
         self.app.config["SESSION_COOKIE_HTTPONLY"] = True
@@ -65,10 +96,74 @@ class MiloAppsApp:
         self.app.config["SESSION_WARNING_TIME"] = 5  # Aviso 5 min antes
         self.app.config["SINGLE_SESSION_ENABLED"] = True  # Una sola sesión activa
 
+        # Registro de actividad: escritura por lotes de last_activity
+        self.app.config["ACTIVITY_FLUSH_INTERVAL"] = int(
+            os.environ.get("ACTIVITY_FLUSH_INTERVAL", 30)
+        )  # segundos entre escrituras
+        self.app.config["ACTIVITY_GRANULARITY"] = int(
+            os.environ.get("ACTIVITY_GRANULARITY", 60)
+        )  # una marca por usuario por minuto
+
+        # Auditoría asíncrona: cola acotada + inserción por lotes
+        self.app.config["AUDIT_ASYNC"] = True
+        self.app.config["AUDIT_QUEUE_SIZE"] = 10000
+        self.app.config["AUDIT_BATCH_SIZE"] = 200
+        self.app.config["AUDIT_FLUSH_INTERVAL"] = 1.0  # segundos
+        # sync | block | drop (ver AuditWriter)
+        self.app.config["AUDIT_BACKPRESSURE"] = os.environ.get(
+            "AUDIT_BACKPRESSURE", "sync"
+        )
+
+        # Retención de auditoría (hilo programado + comando purge-audit).
+        # El hilo borra datos: se habilita en un solo proceso (no en cada
+        # worker de gunicorn ni en los comandos flask); el resto puede usar
+        # `flask purge-audit` desde cron
+        self.app.config["RETENTION_ENABLED"] = (
+            os.environ.get("RETENTION_ENABLED", "false").lower() == "true"
+        )
+        self.app.config["RETENTION_INTERVAL_HOURS"] = 24
+        self.app.config["RETENTION_CHUNK_SIZE"] = 1000
+        self.app.config["RETENTION_MONTHS"] = {"audit_logs": 6}
+        self.app.config["RETENTION_ARCHIVE_DIR"] = os.environ.get(
+            "RETENTION_ARCHIVE_DIR"
+        )  # None = no archivar
+
+        # Caché de catálogos de Talent (municipios, bancos, EPS...)
+        self.app.config["CATALOG_CACHE_TTL"] = int(
+            os.environ.get("CATALOG_CACHE_TTL", 300)
+        )  # segundos; 0 = solo invalidación por versión
+
+        # Estadísticas de MiloTalent: caché corta + ajuste incremental
+        self.app.config["MILOTALENT_STATS_TTL"] = int(
+            os.environ.get("MILOTALENT_STATS_TTL", 30)
+        )  # segundos
+        self.app.config["MILOTALENT_STATS_INCREMENTAL"] = True
+
+        # Exportación masiva de MiloTalent (trabajos en segundo plano). El
+        # estado de cada trabajo se guarda en EXPORT_DIR: con varios workers
+        # debe ser una carpeta compartida por todos
+        self.app.config["EXPORT_DIR"] = os.environ.get("EXPORT_DIR") or os.path.join(
+            os.path.dirname(__file__), "..", "data", "exports"
+        )
+        self.app.config["EXPORT_WORKERS"] = 2
+        self.app.config["EXPORT_CHUNK_SIZE"] = 1000
+        self.app.config["EXPORT_MAX_JOBS"] = 50
+        self.app.config["IMPORT_BATCH_SIZE"] = 500  # filas por transacción
+
+        # Cache-Control por grupo de endpoints (ETag + 304 en http_cache):
+        # solo los grupos que sobrescriben http_cache.DEFAULT_CACHE_CONTROL
+        # (config/*.json -> http_cache_control)
+        self.app.config["HTTP_CACHE_CONTROL"] = self.config.get(
+            "http_cache_control", {}
+        )
+
+        # Perfilado de consultas por petición (config/*.json -> profiling)
+        self.app.config["PERF_PROFILING"] = self.config.get("profiling", {})
+
         # Configuración de registro
         self.app.config["REGISTRATION_ENABLED"] = True
 
-        print("✅ Configuración Flask establecida")
+        logger.info("✅ Configuración Flask establecida")
 
     def setup_csrf(self):
         """Configurar CSRF Protection con excepción correcta para MiloTalent"""
@@ -82,12 +177,16 @@ class MiloAppsApp:
         from apps.milotalent.routes_new import milotalent_bp
         csrf.exempt(milotalent_bp)
 
-        print("✅ CSRF Protection habilitado con excepción correcta para MiloTalent")
+        logger.info("✅ CSRF Protection habilitado con excepción correcta para MiloTalent")
 
     def setup_database(self):
         """Configurar base de datos"""
         init_db(self.app)
-        print("✅ Base de datos configurada")
+        query_profiler.init_app(self.app)
+        audit_writer.init_app(self.app)
+        catalog_cache.init_app(self.app)
+        init_retention(self.app)
+        logger.info("✅ Base de datos configurada")
 
     def setup_auth(self):
         """Configurar autenticación"""
@@ -110,24 +209,32 @@ class MiloAppsApp:
 
         # Registrar blueprint de autenticación
         self.app.register_blueprint(auth)
+        image_pipeline.init_app(self.app)
 
         # 🔐 MIDDLEWARE PARA CONTROL DE SESIÓN ÚNICA
         self.setup_session_middleware()
 
-        print("✅ Sistema de autenticación configurado")
+        logger.info("✅ Sistema de autenticación configurado")
 
     def setup_session_middleware(self):
         """Configurar middleware para control de sesión única"""
         from flask import session, redirect, url_for, flash
         from flask_login import current_user, logout_user
 
+        activity_tracker.init_app(self.app)
+
         @self.app.before_request
         def validate_session():
+            # Los archivos estáticos no cuentan como actividad
+            if request.endpoint == "static":
+                return None
+
             # Solo validar en rutas que requieren autenticación
             if current_user.is_authenticated:
                 current_session_id = session.get("session_id")
 
-                # Verificar si la sesión actual es válida
+                # Verificar si la sesión actual es válida (el session_id
+                # viene del usuario ya cargado por user_loader, sin escribir)
                 if not current_user.has_active_session(current_session_id):
                     logout_user()
                     session.clear()
@@ -137,21 +244,22 @@ class MiloAppsApp:
                     )
                     return redirect(url_for("auth.login"))
 
-                # Actualizar actividad del usuario
-                current_user.update_activity()
-                db.session.commit()
+                # Registrar actividad en memoria; se persiste por lotes
+                activity_tracker.record(current_user.id)
+                if activity_tracker.flush_due():
+                    activity_tracker.flush()
 
-        print("✅ Middleware de sesión única configurado")
+        logger.info("✅ Middleware de sesión única configurado")
 
     def setup_email(self):
         """Configurar servicio de email"""
         init_mail(self.app)
-        print("✅ Servicio de email configurado")
+        logger.info("✅ Servicio de email configurado")
 
     def setup_cors(self):
         """Configurar CORS"""
         CORS(self.app, supports_credentials=True)
-        print("✅ CORS configurado")
+        logger.info("✅ CORS configurado")
 
     def setup_moment(self):
         """Configurar Flask-Moment para fechas"""
@@ -184,7 +292,7 @@ class MiloAppsApp:
             else:
                 return "hace unos segundos"
 
-        print("✅ Flask-Moment configurado")
+        logger.info("✅ Flask-Moment configurado")
 
     def load_config(self):
         """Cargar configuración activa"""
@@ -196,10 +304,10 @@ class MiloAppsApp:
             if os.path.exists(config_path):
                 with open(config_path, "r", encoding="utf-8") as f:
                     config = json.load(f)
-                print(f"📋 Configuración cargada: {config['environment'].upper()}")
+                logger.info("📋 Configuración cargada: %s", config["environment"].upper())
                 return config
         except Exception as e:
-            print(f"⚠️  Error cargando configuración activa: {e}")
+            logger.warning("⚠️  Error cargando configuración activa: %s", e)
 
         # Cargar configuración por defecto
         try:
@@ -208,10 +316,10 @@ class MiloAppsApp:
             )
             with open(default_path, "r", encoding="utf-8") as f:
                 config = json.load(f)
-            print("📋 Usando configuración por defecto")
+            logger.info("📋 Usando configuración por defecto")
             return config
         except Exception as e:
-            print(f"❌ Error cargando configuración: {e}")
+            logger.error("❌ Error cargando configuración: %s", e)
             return self.get_fallback_config()
 
     def get_fallback_config(self):
@@ -228,8 +336,16 @@ class MiloAppsApp:
         # MiloTalent integrado - nueva estructura de PS
         try:
             from apps.milotalent.routes_new import milotalent_bp
+            from apps.milotalent.stats import stats_engine
+            from apps.milotalent.exportacion import export_manager
+            from apps.milotalent.importacion import init_importacion
+            from apps.milotalent.busqueda import init_busqueda
 
             self.app.register_blueprint(milotalent_bp)
+            stats_engine.init_app(self.app)
+            export_manager.init_app(self.app)
+            init_importacion(self.app)
+            init_busqueda(self.app)
             
 
             
@@ -237,30 +353,34 @@ class MiloAppsApp:
             try:
                 from entidades_routes import entidades_bp
                 self.app.register_blueprint(entidades_bp)
-                print("✅ Blueprint de entidades administrativas registrado")
+                logger.info("✅ Blueprint de entidades administrativas registrado")
             except ImportError as e:
-                print(f"⚠️  Error importando entidades administrativas: {e}")
+                logger.warning("⚠️  Error importando entidades administrativas: %s", e)
 
             # Deshabilitar CSRF específicamente para MiloTalent
             @self.app.before_request
             def disable_csrf_for_milotalent():
-                # Debug: Log TODAS las peticiones para investigar
-                print(f"🔍 PETICIÓN: {request.method} -> {request.endpoint} -> {request.url}")
-                
+                # Traza muestreada (miloapps.request); del formulario solo
+                # se registran los nombres de campo, nunca los valores
+                if request_logger.isEnabledFor(logging.DEBUG):
+                    request_logger.debug(
+                        "🔍 Petición",
+                        extra={
+                            "method": request.method,
+                            "endpoint": request.endpoint,
+                            "path": request.path,
+                            "form_fields": sorted(request.form) if request.method == "POST" else None,
+                        },
+                    )
+
                 if request.endpoint and request.endpoint.startswith("milotalent."):
-                    # Debug: Log todas las peticiones a MiloTalent
-                    print(f"🔍 Petición MiloTalent: {request.method} {request.endpoint}")
-                    print(f"🔍 URL: {request.url}")
-                    if request.method == 'POST':
-                        print(f"🔍 Form data: {dict(request.form)}")
-                    
                     # Deshabilitar CSRF para todas las rutas de MiloTalent
                     from flask import g
                     g._csrf_token = False
 
-            print("✅ MiloTalent integrado exitosamente (nueva estructura PS)")
+            logger.info("✅ MiloTalent integrado exitosamente (nueva estructura PS)")
         except Exception as e:
-            print(f"⚠️  Error integrando MiloTalent: {e}")
+            logger.exception("⚠️  Error integrando MiloTalent: %s", e)
 
         @self.app.route("/")
         def index():
@@ -273,8 +393,6 @@ class MiloAppsApp:
         @login_required
         def dashboard():
             """Dashboard principal del usuario"""
-            # Limpiar logs antiguos periódicamente
-            cleanup_old_audit_logs()
             return render_template(
                 "dashboard.html", config=self.config, user=current_user
             )
@@ -325,7 +443,7 @@ class MiloAppsApp:
             activities = [log.to_dict() for log in logs]
             if not activities:
                 # Si no hay actividad, usar mock
-                print("⚡ No hay actividad real, enviando datos de prueba (mock)")
+                logger.debug("⚡ No hay actividad real, enviando datos de prueba (mock)")
                 activities = [
                     {
                         "id": 1,
@@ -411,6 +529,16 @@ class MiloAppsApp:
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
 
+        @self.app.route("/api/admin/perf")
+        @login_required
+        def get_perf():
+            """API con percentiles por endpoint y consultas lentas (solo administradores)"""
+            if not current_user.role or current_user.role.name != "admin":
+                return jsonify({"error": "Acceso denegado"}), 403
+            if request.args.get("reset") == "1":
+                query_profiler.reset()
+            return jsonify(query_profiler.snapshot())
+
         @self.app.route("/docs")
         def docs():
             """Página de documentación"""
@@ -421,15 +549,17 @@ class MiloAppsApp:
 
         @self.app.errorhandler(400)
         def bad_request(error):
-            # DEBUG: Error 400 - vamos a investigar
-            print(f"❌ ERROR 400 CAPTURADO!")
-            print(f"URL: {request.url}")
-            print(f"Method: {request.method}")
-            print(f"Endpoint: {request.endpoint}")
-            print(f"Error: {error}")
-            print(f"Form: {dict(request.form)}")
-            print("=" * 50)
-            
+            logger.warning(
+                "❌ Error 400",
+                extra={
+                    "method": request.method,
+                    "endpoint": request.endpoint,
+                    "path": request.path,
+                    "error": str(error),
+                    "form_fields": sorted(request.form),
+                },
+            )
+
             return (
                 render_template(
                     "error_simple.html",
@@ -480,21 +610,20 @@ class MiloAppsApp:
         port = self.config["development"]["port"]
         debug = self.config["development"]["debug_mode"]
 
-        print("🚀 Iniciando MiloApps Flask App...")
-        print(f'📍 Entorno: {self.config["environment"]}')
-        print(f"🌐 URL: http://{host}:{port}")
-        print(f'🐛 Debug: {"ACTIVADO" if debug else "DESACTIVADO"}')
+        logger.info("🚀 Iniciando MiloApps Flask App...")
+        logger.info("📍 Entorno: %s", self.config["environment"])
+        logger.info("🌐 URL: http://%s:%s", host, port)
+        logger.info("🐛 Debug: %s", "ACTIVADO" if debug else "DESACTIVADO")
 
         if self.config.get("network", {}).get("proxy"):
-            print("🔗 Proxy: Configurado")
-
-        print("")
-        print("Endpoints disponibles:")
-        print(f"   📄 Home: http://{host}:{port}/")
-        print(f"   ⚙️  Config: http://{host}:{port}/api/config")
-        print(f"   📊 Status: http://{host}:{port}/api/status")
-        print(f"   📖 Docs: http://{host}:{port}/docs")
-        print("")
+            logger.info("🔗 Proxy: Configurado")
+
+        logger.info(
+            "Endpoints disponibles: 📄 Home: http://%s:%s/ | ⚙️  Config: /api/config "
+            "| 📊 Status: /api/status | 📖 Docs: /docs",
+            host,
+            port,
+        )
 
         self.app.run(host=host, port=port, debug=debug)
 
@@ -0,0 +1,250 @@
+# MiloSign App - Asignación masiva de firmantes
+# Documentos x firmantes (o la configuración de una SignatureTemplate) en
+# lotes: usuarios validados con un IN, firmas con un INSERT múltiple, una
+# auditoría por lote y un commit por lote; las notificaciones van en un
+# solo envío masivo por lote
+import json
+from datetime import datetime, timedelta
+
+from core.models import db, User
+from structured_logging import get_logger
+from .models import Document, Signature, SignatureAudit, SignatureTemplate
+from .workflow import active_signatures_by_document, notify_pairs
+
+logger = get_logger("milosign.assignment")
+
+DEFAULT_BATCH_SIZE = 100
+ASIGNABLES = ("draft", "pending")
+
+
+class AssignmentError(ValueError):
+    """Solicitud de asignación inválida"""
+
+
+def parse_signers(texto):
+    """Líneas "email[, orden]" -> [{"email", "order_index"}]; sin orden
+    explícito se usa la posición de la línea"""
+    signers = []
+    for posicion, linea in enumerate(
+        (l.strip() for l in (texto or "").splitlines() if l.strip()), start=1
+    ):
+        email, _, orden = linea.partition(",")
+        orden = orden.strip()
+        if orden and not orden.isdigit():
+            raise AssignmentError(f"Orden inválido en la línea {posicion}: {orden}")
+        signers.append({
+            "email": email.strip().lower(),
+            "order_index": int(orden) if orden else posicion,
+        })
+    return signers
+
+
+class AssignmentResult:
+    def __init__(self):
+        self.documents = 0
+        self.created = 0
+        self.skipped = 0
+        self.sent = 0
+        self.notified = 0
+        self.errors = []
+
+    def to_dict(self):
+        return {
+            "documents": self.documents,
+            "created": self.created,
+            "skipped": self.skipped,
+            "sent": self.sent,
+            "notified": self.notified,
+            "errors": self.errors,
+        }
+
+
+class BulkAssigner:
+    """Asigna firmantes a muchos documentos.
+
+    signers: [{"email" | "user_id", "order_index"}]
+    template: SignatureTemplate cuya configuración (expiración, todas las
+    firmas, orden) se aplica a los documentos
+    send: enviar a firma los borradores y notificar a los habilitados
+    """
+
+    def __init__(self, user_id, batch_size=DEFAULT_BATCH_SIZE):
+        self.user_id = user_id
+        self.batch_size = batch_size
+
+    def assign(self, document_ids, signers, template_id=None, send=False):
+        result = AssignmentResult()
+        document_ids = list(dict.fromkeys(int(i) for i in document_ids))
+        if not document_ids:
+            raise AssignmentError("No se seleccionaron documentos")
+        if not signers and template_id is None:
+            raise AssignmentError("No se indicaron firmantes ni plantilla")
+
+        template = None
+        if template_id is not None:
+            template = db.session.get(SignatureTemplate, template_id)
+            if template is None:
+                raise AssignmentError(f"Plantilla no encontrada: {template_id}")
+
+        usuarios = self._resolver_firmantes(signers, result)
+
+        for inicio in range(0, len(document_ids), self.batch_size):
+            self._lote(document_ids[inicio:inicio + self.batch_size],
+                       usuarios, template, send, result)
+        logger.info("✍️ Asignación masiva de firmantes", extra=result.to_dict())
+        return result
+
+    def _resolver_firmantes(self, signers, result):
+        """[(user_id, order_index)] validando todos los usuarios con un IN.
+
+        Se guardan ids (no instancias) porque el commit de cada lote
+        expira los objetos de la sesión."""
+        emails = {s["email"].lower() for s in signers if s.get("email")}
+        ids = {int(s["user_id"]) for s in signers if s.get("user_id")}
+        condiciones = []
+        if emails:
+            condiciones.append(db.func.lower(User.email).in_(emails))
+        if ids:
+            condiciones.append(User.id.in_(ids))
+        encontrados = db.session.execute(
+            db.select(User).where(db.or_(*condiciones), User.is_active.is_(True))
+        ).scalars().all() if condiciones else []
+        por_email = {u.email.lower(): u for u in encontrados}
+        por_id = {u.id: u for u in encontrados}
+
+        usuarios, vistos = [], set()
+        for signer in signers:
+            clave = signer.get("email") or signer.get("user_id")
+            user = (
+                por_email.get(signer["email"].lower()) if signer.get("email")
+                else por_id.get(int(signer["user_id"]))
+            )
+            if user is None:
+                result.errors.append({"signer": clave, "error": "Usuario no encontrado o inactivo"})
+            elif user.id not in vistos:
+                vistos.add(user.id)
+                usuarios.append((user.id, int(signer.get("order_index") or 0)))
+        return usuarios
+
+    def _lote(self, ids, usuarios, template, send, result):
+        """Un lote de documentos: una transacción y un envío de emails"""
+        documentos = db.session.execute(
+            db.select(Document).where(Document.id.in_(ids))
+        ).scalars().all()
+        encontrados = {d.id for d in documentos}
+        for document_id in ids:
+            if document_id not in encontrados:
+                result.errors.append({"document_id": document_id, "error": "Documento no encontrado"})
+        documentos = [d for d in documentos if self._asignable(d, result)]
+        if not documentos:
+            return
+        doc_ids = [d.id for d in documentos]
+        now = datetime.utcnow()
+
+        if template is not None:
+            valores = {
+                "requires_all_signatures": template.requires_all_signatures,
+                "signature_order": template.signature_order,
+                "updated_at": now,
+            }
+            if template.default_expiration_days:
+                valores["expires_at"] = now + timedelta(days=template.default_expiration_days)
+            db.session.execute(
+                db.update(Document).where(Document.id.in_(doc_ids)).values(**valores)
+                .execution_options(synchronize_session="fetch")
+            )
+
+        # Firmantes ya asignados: una consulta para todo el lote
+        existentes = set(db.session.execute(
+            db.select(Signature.document_id, Signature.signer_id).where(
+                Signature.document_id.in_(doc_ids),
+                Signature.signer_id.in_([u for u, _ in usuarios] or [0]),
+            )
+        ).tuples())
+        filas, auditoria = [], []
+        for document in documentos:
+            nuevos = []
+            for user_id, order_index in usuarios:
+                if (document.id, user_id) in existentes:
+                    result.skipped += 1
+                    continue
+                filas.append({
+                    "document_id": document.id,
+                    "signer_id": user_id,
+                    "status": "pending",
+                    "order_index": order_index,
+                    "created_at": now,
+                })
+                nuevos.append(user_id)
+            if nuevos or template is not None:
+                auditoria.append({
+                    "document_id": document.id,
+                    "user_id": self.user_id,
+                    "action": "assign_signers",
+                    "details": json.dumps({
+                        "signers": nuevos,
+                        "template_id": template.id if template else None,
+                    }),
+                    "timestamp": now,
+                })
+        if filas:
+            db.session.execute(db.insert(Signature), filas)
+        result.created += len(filas)
+
+        enviar = []
+        if send:
+            enviar = [d.id for d in documentos if d.status == "draft"]
+            con_firmantes = set(db.session.execute(
+                db.select(Signature.document_id).where(Signature.document_id.in_(enviar))
+            ).scalars()) if enviar else set()
+            for document_id in enviar:
+                if document_id not in con_firmantes:
+                    result.errors.append({"document_id": document_id, "error": "Sin firmantes"})
+            enviar = [i for i in enviar if i in con_firmantes]
+            if enviar:
+                db.session.execute(
+                    db.update(Document)
+                    .where(Document.id.in_(enviar), Document.status == "draft")
+                    .values(status="pending", updated_at=now)
+                    .execution_options(synchronize_session="fetch")
+                )
+                auditoria.extend(
+                    {"document_id": i, "user_id": self.user_id, "action": "send", "timestamp": now}
+                    for i in enviar
+                )
+        if auditoria:
+            db.session.execute(db.insert(SignatureAudit), auditoria)
+        pendientes_ids = [d.id for d in documentos if d.status == "pending"]
+        db.session.commit()
+        result.documents += len(documentos)
+        result.sent += len(enviar)
+
+        # Notificar a los firmantes habilitados: los de documentos recién
+        # enviados y los nuevos de documentos que ya estaban en firma
+        if not pendientes_ids:
+            return
+        recien_enviados = set(enviar)
+        nuevos_por_doc = {(f["document_id"], f["signer_id"]) for f in filas}
+        # Una consulta recarga los documentos expirados por el commit
+        pendientes = db.session.execute(
+            db.select(Document)
+            .where(Document.id.in_(pendientes_ids))
+            .options(db.joinedload(Document.owner))
+        ).scalars().all()
+        activas = active_signatures_by_document(pendientes)
+        pares = [
+            (document, s)
+            for document in pendientes
+            for s in activas[document.id]
+            if document.id in recien_enviados or (document.id, s.signer_id) in nuevos_por_doc
+        ]
+        result.notified += notify_pairs(pares)
+
+    def _asignable(self, document, result):
+        if document.status not in ASIGNABLES:
+            result.errors.append({
+                "document_id": document.id,
+                "error": f"Documento en estado {document.status}",
+            })
+            return False
+        return True
@@ -1,7 +1,14 @@
 # MiloSign App - Formularios
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileRequired, FileAllowed
-from wtforms import StringField, TextAreaField, SelectField, BooleanField, HiddenField
+from wtforms import (
+    StringField,
+    TextAreaField,
+    SelectField,
+    SelectMultipleField,
+    BooleanField,
+    HiddenField,
+)
 from wtforms.validators import DataRequired, Length, Email
 from wtforms import ValidationError
 
@@ -53,6 +60,20 @@ class AddSignerForm(FlaskForm):
     notes = TextAreaField("Notas para el firmante", validators=[Length(max=500)])
 
 
+class BulkSignersForm(FlaskForm):
+    """Formulario para asignar firmantes a varios documentos"""
+
+    document_ids = SelectMultipleField(
+        "Documentos", coerce=int, validators=[DataRequired()]
+    )
+    signers = TextAreaField(
+        "Firmantes (un email por línea, opcional: email, orden)",
+        validators=[Length(max=20000)],
+    )
+    template_id = SelectField("Plantilla", coerce=int, default=0)
+    send = BooleanField("Enviar a firma y notificar", default=True)
+
+
 class SignatureForm(FlaskForm):
     """Formulario para firmar documento"""
 
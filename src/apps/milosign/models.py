@@ -1,6 +1,8 @@
 # MiloSign App - Modelos de datos
 from datetime import datetime
 
+from sqlalchemy import event
+
 from core.models import db
 
 
@@ -8,10 +10,15 @@ class Document(db.Model):
     """Modelo para documentos a firmar"""
 
     __tablename__ = "milosign_documents"
+    __table_args__ = (
+        # Barrido de expiración: status = 'pending' AND expires_at <= ahora
+        db.Index("idx_milosign_documents_status_expires", "status", "expires_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
+    # Ruta relativa en el almacén (ab/cd/<hash>) o ruta antigua en disco
     file_path = db.Column(db.String(500), nullable=False)
     original_filename = db.Column(db.String(200), nullable=False)
     file_hash = db.Column(db.String(64), nullable=True)  # SHA-256
@@ -44,31 +51,101 @@ class Document(db.Model):
         return f"<Document {self.title}>"
 
     def get_signature_progress(self):
-        """Obtener progreso de firmas"""
-        total = len(self.signatures)
-        signed = len([s for s in self.signatures if s.status == "signed"])
-        return {
-            "signed": signed,
-            "total": total,
-            "percentage": (signed / total) * 100 if total > 0 else 0,
-        }
+        """Obtener progreso de firmas.
+
+        Usa el progreso precalculado por documents_with_progress(), las
+        firmas ya cargadas o, si no, un conteo agregado en SQL.
+        """
+        from .queries import progress_dict, signature_counts
+
+        progress = getattr(self, "_signature_progress", None)
+        if progress is not None:
+            return progress
+        if "signatures" in self.__dict__ or self.id is None:
+            estados = [s.status for s in self.signatures]
+            return progress_dict(
+                len(estados), estados.count("signed"), estados.count("pending")
+            )
+        return signature_counts([self.id])[self.id]
 
     def is_fully_signed(self):
         """Verificar si está completamente firmado"""
-        if not self.signatures:
-            return False
-        return all(sig.status == "signed" for sig in self.signatures)
+        progress = self.get_signature_progress()
+        return progress["total"] > 0 and progress["signed"] == progress["total"]
 
     def can_be_signed_by(self, user):
-        """Verificar si un usuario puede firmar este documento"""
-        signature = next((s for s in self.signatures if s.signer_id == user.id), None)
-        return signature and signature.status == "pending"
+        """Verificar si un usuario puede firmar este documento (firma
+        pendiente y, si hay orden de firma, que sea su turno)"""
+        from .workflow import can_sign
+
+        return can_sign(self, user.id)
+
+
+class Blob(db.Model):
+    """Contenido almacenado una vez por SHA-256, con sus referencias"""
+
+    __tablename__ = "milosign_blobs"
+
+    hash = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Blob {self.hash[:12]} refs={self.ref_count}>"
+
+
+blobs = Blob.__table__
+
+
+@event.listens_for(Document, "expire")
+@event.listens_for(Document, "refresh")
+def _descartar_progreso(target, *args):
+    """El progreso precalculado deja de valer al expirar (commit) o
+    recargar la instancia; el siguiente acceso vuelve a contarlo"""
+    if target is not None:  # instancia ya recolectada (referencia débil)
+        target.__dict__.pop("_signature_progress", None)
+
+
+@event.listens_for(Document, "after_insert")
+def _sumar_referencia(mapper, connection, target):
+    """Cada documento cuenta como referencia de su blob (misma transacción)"""
+    if not target.file_hash:
+        return
+    actualizados = connection.execute(
+        blobs.update()
+        .where(blobs.c.hash == target.file_hash)
+        .values(ref_count=blobs.c.ref_count + 1)
+    ).rowcount
+    if not actualizados:
+        connection.execute(
+            blobs.insert().values(
+                hash=target.file_hash,
+                size=target.file_size or 0,
+                ref_count=1,
+                created_at=datetime.utcnow(),
+            )
+        )
+
+
+@event.listens_for(Document, "after_delete")
+def _restar_referencia(mapper, connection, target):
+    """El archivo se borra después, en BlobStore.collect()"""
+    if target.file_hash:
+        connection.execute(
+            blobs.update()
+            .where(blobs.c.hash == target.file_hash, blobs.c.ref_count > 0)
+            .values(ref_count=blobs.c.ref_count - 1)
+        )
 
 
 class Signature(db.Model):
     """Modelo para firmas de documentos"""
 
     __tablename__ = "milosign_signatures"
+    __table_args__ = (
+        db.Index("idx_milosign_signatures_document_status", "document_id", "status"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     document_id = db.Column(
@@ -0,0 +1,60 @@
+# MiloSign App - Consultas agregadas
+# Progreso de firmas (firmadas/pendientes/total) calculado en SQL con una
+# consulta agrupada, en lugar de cargar cada Signature por documento
+from core.models import db
+from .models import Document, Signature
+
+
+def _conteos():
+    """Columnas agregadas sobre Signature: total, firmadas, pendientes"""
+    return (
+        db.func.count(Signature.id).label("total"),
+        db.func.coalesce(
+            db.func.sum(db.case((Signature.status == "signed", 1), else_=0)), 0
+        ).label("signed"),
+        db.func.coalesce(
+            db.func.sum(db.case((Signature.status == "pending", 1), else_=0)), 0
+        ).label("pending"),
+    )
+
+
+def progress_dict(total, signed, pending):
+    return {
+        "signed": signed,
+        "pending": pending,
+        "total": total,
+        "percentage": (signed / total) * 100 if total > 0 else 0,
+    }
+
+
+def signature_counts(document_ids):
+    """document_id -> progreso, para varios documentos en una consulta"""
+    document_ids = list(document_ids)
+    if not document_ids:
+        return {}
+    filas = db.session.execute(
+        db.select(Signature.document_id, *_conteos())
+        .where(Signature.document_id.in_(document_ids))
+        .group_by(Signature.document_id)
+    )
+    conteos = {id_: progress_dict(0, 0, 0) for id_ in document_ids}
+    for document_id, total, signed, pending in filas:
+        conteos[document_id] = progress_dict(total, signed, pending)
+    return conteos
+
+
+def documents_with_progress(*criterios, order_by=None):
+    """Documentos que cumplen los criterios con su progreso ya calculado
+    (una sola consulta: LEFT JOIN + GROUP BY)"""
+    stmt = (
+        db.select(Document, *_conteos())
+        .outerjoin(Signature, Signature.document_id == Document.id)
+        .where(*criterios)
+        .group_by(Document.id)
+        .order_by(order_by if order_by is not None else Document.created_at.desc())
+    )
+    documentos = []
+    for document, total, signed, pending in db.session.execute(stmt):
+        document._signature_progress = progress_dict(total, signed, pending)
+        documentos.append(document)
+    return documentos
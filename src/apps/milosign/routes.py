@@ -7,14 +7,28 @@ from flask import (
     url_for,
     flash,
     jsonify,
+    abort,
+    current_app,
+    send_file,
 )
 from flask_login import login_required, current_user
 from core.utils import require_app_permission, log_audit
 from core.models import db
-from .models import Document, Signature
-from .forms import DocumentUploadForm, SignatureForm
+from .models import Document, Signature, SignatureTemplate
+from .forms import BulkSignersForm, DocumentUploadForm, SignatureForm
+from .assignment import AssignmentError, BulkAssigner, parse_signers
+from .queries import documents_with_progress
+from .storage import blob_store, private_response
+from .workflow import (
+    WorkflowError,
+    can_sign,
+    decline,
+    expiry_sweeper,
+    send_for_signature,
+    sign,
+)
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
 
 # Crear blueprint para MiloSign
@@ -27,16 +41,25 @@ milosign_bp = Blueprint(
 )
 
 
+@milosign_bp.record_once
+def _init_app(state):
+    blob_store.init_app(state.app)
+    expiry_sweeper.init_app(state.app)
+
+
 @milosign_bp.route("/")
 @login_required
 @require_app_permission("milosign")
 def dashboard():
     """Dashboard principal de MiloSign"""
-    user_documents = Document.query.filter_by(owner_id=current_user.id).all()
-    pending_signatures = (
-        Document.query.join(Signature)
-        .filter(Signature.signer_id == current_user.id, Signature.status == "pending")
-        .all()
+    # Progreso de firmas de todos los documentos en una consulta agrupada
+    user_documents = documents_with_progress(Document.owner_id == current_user.id)
+    pending_signatures = documents_with_progress(
+        Document.signatures.any(
+            db.and_(
+                Signature.signer_id == current_user.id, Signature.status == "pending"
+            )
+        )
     )
 
     log_audit("MILOSIGN_DASHBOARD_VIEW", "milosign", current_user.id)
@@ -60,18 +83,25 @@ def upload_document():
         file = form.file.data
         if file:
             filename = secure_filename(file.filename)
-            file_path = os.path.join("uploads/documents", filename)
-            file.save(file_path)
+            # Almacenado por contenido: mismos bytes = un solo archivo
+            file_hash, file_size = blob_store.put(file.stream)
 
             # Crear registro de documento
             document = Document(
                 title=form.title.data,
                 description=form.description.data,
-                file_path=file_path,
+                file_path=blob_store.relative_path(file_hash),
+                file_hash=file_hash,
+                file_size=file_size,
                 original_filename=filename,
                 owner_id=current_user.id,
                 status="draft",
+                requires_all_signatures=form.requires_all_signatures.data,
+                signature_order=form.signature_order.data,
             )
+            expires_in_days = int(form.expires_in_days.data or 0)
+            if expires_in_days:
+                document.expires_at = datetime.utcnow() + timedelta(days=expires_in_days)
 
             db.session.add(document)
             db.session.commit()
@@ -114,6 +144,35 @@ def document_detail(id):
     )
 
 
+@milosign_bp.route("/document/<int:id>/download")
+@login_required
+@require_app_permission("milosign")
+def download_document(id):
+    """Descargar el archivo de un documento"""
+    document = Document.query.get_or_404(id)
+
+    # Verificar permisos
+    if document.owner_id != current_user.id and not current_user.is_admin:
+        signature = Signature.query.filter_by(
+            document_id=id, signer_id=current_user.id
+        ).first()
+        if not signature:
+            abort(403)
+
+    if document.file_hash:
+        return blob_store.send(document.file_hash, document.original_filename)
+
+    # Documentos subidos antes del almacén por contenido
+    if not os.path.exists(document.file_path):
+        abort(404)
+    return private_response(send_file(
+        os.path.abspath(document.file_path),
+        as_attachment=True,
+        download_name=document.original_filename,
+        conditional=True,
+    ))
+
+
 @milosign_bp.route("/sign/<int:document_id>", methods=["GET", "POST"])
 @login_required
 @require_app_permission("milosign")
@@ -128,24 +187,46 @@ def sign_document(document_id):
         flash("No tienes permisos para firmar este documento.", "danger")
         return redirect(url_for("milosign.dashboard"))
 
+    if document.status != "pending":
+        mensajes = {
+            "draft": "El documento aún no ha sido enviado a firma.",
+            "signed": "Este documento ya ha sido firmado.",
+            "expired": "El plazo para firmar este documento venció.",
+            "cancelled": "Este documento fue cancelado.",
+        }
+        flash(mensajes.get(document.status, "El documento no está disponible para firma."), "info")
+        return redirect(url_for("milosign.document_detail", id=document_id))
+
     if signature.status != "pending":
         flash("Este documento ya ha sido firmado.", "info")
         return redirect(url_for("milosign.document_detail", id=document_id))
 
+    if not can_sign(document, current_user.id):
+        flash("Aún no es tu turno para firmar este documento.", "info")
+        return redirect(url_for("milosign.document_detail", id=document_id))
+
     form = SignatureForm()
     if form.validate_on_submit():
-        signature.status = "signed"
-        signature.signed_at = datetime.utcnow()
-        signature.signature_data = form.signature_data.data
-        signature.ip_address = request.remote_addr
-
-        db.session.commit()
+        try:
+            completed = sign(
+                document,
+                current_user.id,
+                form.signature_data.data,
+                ip_address=request.remote_addr,
+                user_agent=request.headers.get("User-Agent", "")[:500],
+            )
+        except WorkflowError as e:
+            flash(str(e), "warning")
+            return redirect(url_for("milosign.document_detail", id=document_id))
 
         log_audit(
             "DOCUMENT_SIGNED", "milosign", current_user.id, "document", document_id
         )
 
-        flash("Documento firmado correctamente.", "success")
+        if completed:
+            flash("Documento firmado por todos los firmantes.", "success")
+        else:
+            flash("Documento firmado correctamente.", "success")
         return redirect(url_for("milosign.document_detail", id=document_id))
 
     return render_template(
@@ -153,26 +234,164 @@ def sign_document(document_id):
     )
 
 
+@milosign_bp.route("/document/<int:id>/send", methods=["POST"])
+@login_required
+@require_app_permission("milosign")
+def send_document(id):
+    """Enviar documento a firma (notifica al primer grupo de firmantes)"""
+    document = Document.query.get_or_404(id)
+    if document.owner_id != current_user.id and not current_user.is_admin:
+        abort(403)
+
+    try:
+        send_for_signature(document, user_id=current_user.id)
+    except WorkflowError as e:
+        flash(str(e), "warning")
+        return redirect(url_for("milosign.document_detail", id=id))
+
+    log_audit("DOCUMENT_SENT", "milosign", current_user.id, "document", id)
+    flash("Documento enviado a firma.", "success")
+    return redirect(url_for("milosign.document_detail", id=id))
+
+
+@milosign_bp.route("/document/<int:id>/decline", methods=["POST"])
+@login_required
+@require_app_permission("milosign")
+def decline_document(id):
+    """Rechazar la firma de un documento"""
+    document = Document.query.get_or_404(id)
+
+    try:
+        decline(
+            document,
+            current_user.id,
+            reason=request.form.get("reason", "")[:500] or None,
+            ip_address=request.remote_addr,
+            user_agent=request.headers.get("User-Agent", "")[:500],
+        )
+    except WorkflowError as e:
+        flash(str(e), "warning")
+        return redirect(url_for("milosign.document_detail", id=id))
+
+    log_audit("DOCUMENT_DECLINED", "milosign", current_user.id, "document", id)
+    flash("Has rechazado la firma del documento.", "info")
+    return redirect(url_for("milosign.dashboard"))
+
+
+@milosign_bp.route("/admin/signers", methods=["GET", "POST"])
+@login_required
+@require_app_permission("milosign", "admin")
+def bulk_signers():
+    """Asignación masiva de firmantes a documentos"""
+    form = BulkSignersForm()
+    documents = documents_with_progress(Document.status.in_(("draft", "pending")))
+    form.document_ids.choices = [
+        (d.id, f"{d.title} ({d.status})") for d in documents
+    ]
+    templates = SignatureTemplate.query.order_by(SignatureTemplate.name).all()
+    form.template_id.choices = [(0, "Sin plantilla")] + [
+        (t.id, t.name) for t in templates
+    ]
+
+    result = None
+    if form.validate_on_submit():
+        try:
+            result = _assign_signers(
+                form.document_ids.data,
+                parse_signers(form.signers.data),
+                form.template_id.data or None,
+                form.send.data,
+            )
+        except AssignmentError as e:
+            flash(str(e), "danger")
+        else:
+            flash(
+                f"{result['created']} firmas asignadas en {result['documents']} documentos.",
+                "success" if not result["errors"] else "warning",
+            )
+            # El progreso se calculó antes de asignar; se vuelve a consultar
+            documents = documents_with_progress(
+                Document.status.in_(("draft", "pending"))
+            )
+
+    return render_template(
+        "milosign/bulk_signers.html",
+        form=form,
+        documents=documents,
+        result=result,
+    )
+
+
+def _assign_signers(document_ids, signers, template_id, send):
+    assigner = BulkAssigner(
+        current_user.id,
+        batch_size=current_app.config.get("MILOSIGN_ASSIGN_BATCH_SIZE", 100),
+    )
+    result = assigner.assign(document_ids, signers, template_id=template_id, send=send)
+    log_audit(
+        "SIGNERS_BULK_ASSIGNED",
+        "milosign",
+        current_user.id,
+        details={k: v for k, v in result.to_dict().items() if k != "errors"},
+    )
+    return result.to_dict()
+
+
 # API endpoints
+@milosign_bp.route("/api/signers/bulk", methods=["POST"])
+@login_required
+@require_app_permission("milosign", "admin")
+def api_bulk_signers():
+    """API para asignar firmantes a varios documentos.
+
+    JSON: {"document_ids": [...], "signers": [{"email" | "user_id",
+    "order_index"}] o ["email", ...], "template_id": opcional,
+    "send": bool}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        # Sin orden explícito se usa la posición en la lista
+        signers = [
+            {"email": s, "order_index": i}
+            if isinstance(s, str)
+            else {"order_index": i, **s}
+            for i, s in enumerate(data.get("signers") or [], start=1)
+        ]
+        result = _assign_signers(
+            data.get("document_ids") or [],
+            signers,
+            data.get("template_id"),
+            bool(data.get("send")),
+        )
+    except (TypeError, ValueError) as e:
+        # AssignmentError es un ValueError
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
 @milosign_bp.route("/api/documents")
 @login_required
 @require_app_permission("milosign")
 def api_documents():
     """API para listar documentos del usuario"""
-    documents = Document.query.filter_by(owner_id=current_user.id).all()
+    documents = documents_with_progress(Document.owner_id == current_user.id)
 
-    return jsonify(
-        [
+    result = []
+    for doc in documents:
+        progress = doc.get_signature_progress()
+        result.append(
             {
                 "id": doc.id,
                 "title": doc.title,
                 "status": doc.status,
                 "created_at": doc.created_at.isoformat(),
-                "signatures_count": len(doc.signatures),
+                "signatures_count": progress["total"],
+                "signatures_signed": progress["signed"],
+                "signatures_pending": progress["pending"],
             }
-            for doc in documents
-        ]
-    )
+        )
+
+    return jsonify(result)
 
 
 @milosign_bp.route("/api/document/<int:id>/status")
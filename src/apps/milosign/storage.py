@@ -0,0 +1,156 @@
+# MiloSign App - Almacenamiento de documentos por contenido
+# Cada archivo se guarda una sola vez bajo su SHA-256 (ab/cd/<hash>); los
+# documentos que comparten contenido comparten el blob y el contador de
+# referencias (milosign_blobs) decide cuándo puede borrarse
+import hashlib
+import os
+import tempfile
+import time
+
+import click
+from flask import current_app, send_file
+
+from core.models import db
+from .models import Blob
+
+CHUNK_SIZE = 64 * 1024
+ORPHAN_MIN_AGE = 3600  # segundos antes de borrar archivos sin registro
+
+
+def private_response(response):
+    """Cache-Control: private, no-cache. Los documentos solo los ven su
+    dueño y sus firmantes: ningún proxy o CDN compartido debe guardarlos,
+    y el navegador revalida con el ETag antes de reutilizar su copia"""
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.cache_control.max_age = None
+    response.headers.pop("Expires", None)
+    return response
+
+
+class BlobStore:
+    """Almacén de blobs direccionado por contenido.
+
+    - MILOSIGN_STORAGE_DIR: raíz del almacén (por defecto data/milosign)
+    """
+
+    def __init__(self):
+        self.root = None
+
+    def init_app(self, app):
+        self.root = app.config.get("MILOSIGN_STORAGE_DIR") or os.path.join(
+            app.root_path, "..", "data", "milosign"
+        )
+        app.extensions["milosign_blobs"] = self
+
+        @app.cli.command("milosign-gc")
+        def milosign_gc_command():
+            """Elimina los documentos de MiloSign que ya no se referencian."""
+            eliminados = self.collect()
+            click.echo(f"{eliminados} blobs eliminados")
+
+    def _root(self):
+        if self.root is None:
+            return os.path.join(current_app.root_path, "..", "data", "milosign")
+        return self.root
+
+    @staticmethod
+    def relative_path(file_hash):
+        return os.path.join(file_hash[:2], file_hash[2:4], file_hash)
+
+    def path(self, file_hash):
+        return os.path.join(self._root(), self.relative_path(file_hash))
+
+    # ---- Escritura ----
+
+    def put(self, stream):
+        """Copia el stream a un temporal calculando el SHA-256 por bloques
+        y lo mueve (rename atómico) a su ruta definitiva si no existía.
+
+        Retorna (hash, tamaño). La referencia se cuenta al guardar el
+        Document con ese file_hash (eventos de models.py).
+        """
+        root = self._root()
+        tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as destino:
+                while True:
+                    bloque = stream.read(CHUNK_SIZE)
+                    if not bloque:
+                        break
+                    sha.update(bloque)
+                    size += len(bloque)
+                    destino.write(bloque)
+                destino.flush()
+                os.fsync(destino.fileno())
+
+            file_hash = sha.hexdigest()
+            final = self.path(file_hash)
+            if os.path.exists(final):
+                # Contenido duplicado: ya está almacenado. Se renueva la
+                # fecha para que collect() no lo borre mientras se registra
+                os.remove(tmp_path)
+                os.utime(final)
+            else:
+                os.makedirs(os.path.dirname(final), exist_ok=True)
+                os.replace(tmp_path, final)
+            return file_hash, size
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # ---- Lectura ----
+
+    def send(self, file_hash, download_name, mimetype=None, as_attachment=True):
+        """Respuesta de descarga: se pasa la ruta (no un objeto archivo) para
+        que el servidor WSGI use wsgi.file_wrapper/sendfile; conditional
+        atiende If-None-Match e If-Modified-Since y peticiones Range"""
+        return private_response(send_file(
+            self.path(file_hash),
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            conditional=True,
+            etag=file_hash,
+        ))
+
+    # ---- Limpieza ----
+
+    def collect(self):
+        """Borra los blobs sin referencias y los archivos huérfanos
+        (subidas cuya transacción nunca se confirmó)"""
+        root = self._root()
+        limite = time.time() - ORPHAN_MIN_AGE
+        sin_uso = []
+        for file_hash in db.session.execute(
+            db.select(Blob.hash).where(Blob.ref_count <= 0)
+        ).scalars():
+            ruta = self.path(file_hash)
+            if not os.path.exists(ruta):
+                sin_uso.append(file_hash)
+            elif os.path.getmtime(ruta) < limite:
+                # Los recién subidos pueden estar por registrarse
+                os.remove(ruta)
+                sin_uso.append(file_hash)
+        if sin_uso:
+            db.session.execute(db.delete(Blob).where(Blob.hash.in_(sin_uso)))
+            db.session.commit()
+
+        conocidos = set(db.session.execute(db.select(Blob.hash)).scalars())
+        huerfanos = 0
+        for carpeta, _, archivos in os.walk(root):
+            for nombre in archivos:
+                ruta = os.path.join(carpeta, nombre)
+                if nombre not in conocidos and os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+                    huerfanos += 1
+        return len(sin_uso) + huerfanos
+
+
+blob_store = BlobStore()
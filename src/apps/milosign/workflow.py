@@ -0,0 +1,409 @@
+# MiloSign App - Flujo de firma
+# Máquina de estados de documentos y firmas: respeta el orden de firma
+# (order_index), cierra el documento en la misma transacción de la última
+# firma, notifica por lotes a los siguientes firmantes y expira los
+# documentos vencidos con un barrido periódico
+import atexit
+import json
+import threading
+from datetime import datetime
+
+import click
+from flask import url_for
+
+from core.models import db
+from email_service import send_bulk_email
+from structured_logging import get_logger
+from .models import Document, Signature, SignatureAudit
+
+logger = get_logger("milosign.workflow")
+
+# Transiciones permitidas por estado
+DOCUMENT_TRANSITIONS = {
+    "draft": {"pending", "cancelled"},
+    "pending": {"signed", "cancelled", "expired"},
+    "signed": set(),
+    "cancelled": set(),
+    "expired": set(),
+}
+
+SIGNATURE_TRANSITIONS = {
+    "pending": {"signed", "declined", "expired"},
+    "signed": set(),
+    "declined": set(),
+    "expired": set(),
+}
+
+
+class WorkflowError(ValueError):
+    """Transición no permitida en el flujo de firma"""
+
+
+def _transition(model, transitions, row_id, origen, destino, **values):
+    """UPDATE condicionado al estado actual: si otra petición cambió el
+    estado antes, no afecta filas y la transición falla"""
+    if destino not in transitions.get(origen, ()):
+        raise WorkflowError(f"Transición no permitida: {origen} -> {destino}")
+    result = db.session.execute(
+        db.update(model)
+        .where(model.id == row_id, model.status == origen)
+        .values(status=destino, **values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _lock(document):
+    """Serializa las transiciones de un mismo documento (SELECT ... FOR
+    UPDATE): dos firmantes simultáneos no pueden dejar de ver que el otro
+    ya firmó y olvidar cerrar el documento"""
+    db.session.execute(
+        db.select(Document.id).where(Document.id == document.id).with_for_update()
+    )
+
+
+def _audit(document, action, user_id=None, signature=None, ip_address=None,
+           user_agent=None, **details):
+    db.session.add(
+        SignatureAudit(
+            document_id=document.id,
+            signature_id=signature.id if signature else None,
+            user_id=user_id,
+            action=action,
+            details=json.dumps(details) if details else None,
+            ip_address=ip_address,
+            user_agent=user_agent,
+        )
+    )
+
+
+# ========================================
+# CONSULTAS
+# ========================================
+
+def active_signatures(document):
+    """Firmas pendientes a las que les toca firmar ahora.
+
+    Con orden de firma solo el grupo de menor order_index pendiente
+    (índices iguales firman en paralelo); sin orden, todas.
+    """
+    return active_signatures_by_document([document])[document.id]
+
+
+def active_signatures_by_document(documents):
+    """document_id -> firmas habilitadas, para varios documentos en una
+    sola consulta"""
+    por_documento = {d.id: [] for d in documents}
+    pendientes = db.session.execute(
+        db.select(Signature)
+        .where(Signature.document_id.in_(list(por_documento)), Signature.status == "pending")
+        .order_by(Signature.document_id, Signature.order_index, Signature.id)
+        .options(db.joinedload(Signature.signer))
+    ).scalars().all()
+    for signature in pendientes:
+        por_documento[signature.document_id].append(signature)
+    for document in documents:
+        grupo = por_documento[document.id]
+        if document.signature_order and grupo:
+            turno = grupo[0].order_index
+            por_documento[document.id] = [s for s in grupo if s.order_index == turno]
+    return por_documento
+
+
+def can_sign(document, user_id):
+    if document.status != "pending":
+        return False
+    return any(s.signer_id == user_id for s in active_signatures(document))
+
+
+def _estado_firmas(document_id):
+    """(total, firmadas, pendientes) en una consulta agregada"""
+    from .queries import signature_counts
+
+    progreso = signature_counts([document_id])[document_id]
+    return progreso["total"], progreso["signed"], progreso["pending"]
+
+
+# ========================================
+# TRANSICIONES
+# ========================================
+
+def send_for_signature(document, user_id=None):
+    """draft -> pending y notifica al primer grupo de firmantes"""
+    total, _, _ = _estado_firmas(document.id)
+    if not total:
+        raise WorkflowError("El documento no tiene firmantes asignados")
+    if not _transition(Document, DOCUMENT_TRANSITIONS, document.id,
+                       document.status, "pending", updated_at=datetime.utcnow()):
+        raise WorkflowError("El documento cambió de estado; recarga la página")
+    _audit(document, "send", user_id=user_id, signers=total)
+    db.session.commit()
+    notify_signers(document, active_signatures(document))
+
+
+def sign(document, signer_id, signature_data, ip_address=None, user_agent=None):
+    """Registra la firma de `signer_id` y avanza el flujo.
+
+    La firma, el cierre del documento (si era la última) y la auditoría
+    se confirman en una sola transacción. Retorna True si el documento
+    quedó firmado.
+    """
+    if document.status != "pending":
+        raise WorkflowError("El documento no está disponible para firma")
+    _lock(document)
+    activas = active_signatures(document)
+    signature = next((s for s in activas if s.signer_id == signer_id), None)
+    if signature is None:
+        if document.signature_order and db.session.execute(
+            db.select(Signature.id).where(
+                Signature.document_id == document.id,
+                Signature.signer_id == signer_id,
+                Signature.status == "pending",
+            )
+        ).first():
+            raise WorkflowError("Aún no es tu turno para firmar este documento")
+        raise WorkflowError("No tienes una firma pendiente en este documento")
+
+    now = datetime.utcnow()
+    if not _transition(Signature, SIGNATURE_TRANSITIONS, signature.id, "pending",
+                       "signed", signed_at=now, signature_data=signature_data,
+                       ip_address=ip_address, user_agent=user_agent):
+        db.session.rollback()
+        raise WorkflowError("Esta firma ya fue registrada")
+    _audit(document, "sign", user_id=signer_id, signature=signature,
+           ip_address=ip_address, user_agent=user_agent)
+
+    total, firmadas, pendientes = _estado_firmas(document.id)
+    if document.requires_all_signatures:
+        completo = pendientes == 0 and firmadas == total
+    else:
+        completo = firmadas > 0
+    if completo:
+        _transition(Document, DOCUMENT_TRANSITIONS, document.id, "pending",
+                    "signed", updated_at=now)
+        # Sin firmas obligatorias, las que quedaban pendientes ya no aplican
+        if pendientes:
+            db.session.execute(
+                db.update(Signature)
+                .where(Signature.document_id == document.id,
+                       Signature.status == "pending")
+                .values(status="expired")
+                .execution_options(synchronize_session=False)
+            )
+        _audit(document, "completed", signatures=firmadas)
+    db.session.commit()
+    db.session.expire(document)
+
+    if not completo:
+        _notificar_siguientes(document, activas)
+    return completo
+
+
+def decline(document, signer_id, reason=None, ip_address=None, user_agent=None):
+    """Rechaza la firma; si se requieren todas, el documento se cancela"""
+    if document.status != "pending":
+        raise WorkflowError("El documento no está disponible para firma")
+    _lock(document)
+    signature = db.session.execute(
+        db.select(Signature).where(
+            Signature.document_id == document.id,
+            Signature.signer_id == signer_id,
+            Signature.status == "pending",
+        )
+    ).scalar_one_or_none()
+    if signature is None:
+        raise WorkflowError("No tienes una firma pendiente en este documento")
+
+    activas = active_signatures(document)
+    if not _transition(Signature, SIGNATURE_TRANSITIONS, signature.id, "pending",
+                       "declined", notes=reason, ip_address=ip_address,
+                       user_agent=user_agent):
+        db.session.rollback()
+        raise WorkflowError("Esta firma ya fue registrada")
+    _audit(document, "decline", user_id=signer_id, signature=signature,
+           ip_address=ip_address, user_agent=user_agent, reason=reason)
+
+    # Sin firmas obligatorias, el documento sigue mientras quede alguien
+    _, _, pendientes = _estado_firmas(document.id)
+    cancelado = document.requires_all_signatures or pendientes == 0
+    if cancelado:
+        _transition(Document, DOCUMENT_TRANSITIONS, document.id, "pending",
+                    "cancelled", updated_at=datetime.utcnow())
+    db.session.commit()
+    db.session.expire(document)
+    if not cancelado:
+        _notificar_siguientes(document, activas)
+
+
+def cancel(document, user_id=None):
+    if not _transition(Document, DOCUMENT_TRANSITIONS, document.id,
+                       document.status, "cancelled", updated_at=datetime.utcnow()):
+        raise WorkflowError("El documento cambió de estado; recarga la página")
+    _audit(document, "cancel", user_id=user_id)
+    db.session.commit()
+    db.session.expire(document)
+
+
+# ========================================
+# NOTIFICACIONES
+# ========================================
+
+def _notificar_siguientes(document, anteriores):
+    """Notifica a los firmantes que acaban de quedar habilitados"""
+    ya_avisados = {s.id for s in anteriores}
+    nuevos = [s for s in active_signatures(document) if s.id not in ya_avisados]
+    if nuevos:
+        notify_signers(document, nuevos)
+
+
+def notify_signers(document, signatures):
+    """Un solo lote de emails (send_bulk_email) para todos los firmantes"""
+    return notify_pairs([(document, s) for s in signatures])
+
+
+def notify_pairs(pairs):
+    """Notifica pares (documento, firma) de uno o varios documentos con
+    un solo send_bulk_email"""
+    if not pairs:
+        return 0
+    recipients = [
+        (
+            s.signer.email,
+            {
+                "signer_name": s.signer.get_full_name(),
+                "document_title": document.title,
+                "owner_name": (
+                    document.owner.get_full_name() if document.owner else "MiloSign"
+                ),
+                "expires_at": document.expires_at,
+                "sign_url": url_for(
+                    "milosign.sign_document", document_id=document.id, _external=True
+                ),
+            },
+        )
+        for document, s in pairs
+    ]
+    titulos = {document.title for document, _ in pairs}
+    subject = (
+        f"Documento pendiente de firma: {titulos.pop()}"
+        if len(titulos) == 1
+        else "Documentos pendientes de firma"
+    )
+    enviados = send_bulk_email(recipients, subject=subject, template="signature_request")
+    logger.info(
+        "📧 Firmantes notificados",
+        extra={"documents": len({d.id for d, _ in pairs}), "count": enviados},
+    )
+    return enviados
+
+
+# ========================================
+# EXPIRACIÓN
+# ========================================
+
+def expire_overdue(now=None):
+    """Expira los documentos pendientes vencidos y sus firmas pendientes.
+
+    Los vencidos se buscan con una sola consulta sobre el índice
+    (status, expires_at); retorna cuántos documentos expiraron.
+    """
+    now = now or datetime.utcnow()
+    vencidos = db.session.execute(
+        db.select(Document.id).where(
+            Document.status == "pending", Document.expires_at <= now
+        )
+    ).scalars().all()
+    if not vencidos:
+        return 0
+    expirados = _expirar_documentos(vencidos, now)
+    if expirados:
+        db.session.execute(
+            db.update(Signature)
+            .where(Signature.document_id.in_(expirados), Signature.status == "pending")
+            .values(status="expired")
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            db.insert(SignatureAudit),
+            [{"document_id": id_, "action": "expire", "timestamp": now}
+             for id_ in expirados],
+        )
+    db.session.commit()
+    logger.info("⌛ Documentos expirados", extra={"count": len(expirados)})
+    return len(expirados)
+
+
+def _expirar_documentos(ids, now):
+    """pending -> expired; retorna solo los ids que este barrido cambió
+    (un documento firmado o cancelado entre el SELECT y el UPDATE no se
+    toca ni arrastra sus firmas)"""
+    if db.session.get_bind().dialect.update_returning:
+        return db.session.execute(
+            db.update(Document)
+            .where(Document.id.in_(ids), Document.status == "pending")
+            .values(status="expired", updated_at=now)
+            .returning(Document.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+    # Sin RETURNING (MySQL): una transición condicionada por documento
+    return [
+        id_ for id_ in ids
+        if _transition(Document, DOCUMENT_TRANSITIONS, id_, "pending",
+                       "expired", updated_at=now)
+    ]
+
+
+class ExpirySweeper:
+    """Barrido periódico de documentos vencidos en un hilo de fondo.
+
+    - MILOSIGN_EXPIRY_SWEEPER: arrancar el hilo en este proceso (apagado
+      por defecto: se habilita en un solo proceso, no en cada worker ni
+      en los comandos flask; también sirve `flask milosign-expire` en cron)
+    - MILOSIGN_EXPIRY_INTERVAL: segundos entre barridos
+    """
+
+    def __init__(self, interval=300):
+        self.interval = interval
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        self._app = app
+        self.interval = app.config.get("MILOSIGN_EXPIRY_INTERVAL", self.interval)
+        app.extensions["milosign_expiry"] = self
+
+        @app.cli.command("milosign-expire")
+        def milosign_expire_command():
+            """Expira los documentos de MiloSign vencidos."""
+            click.echo(f"{expire_overdue()} documentos expirados")
+
+        if app.config.get("MILOSIGN_EXPIRY_SWEEPER", False):
+            self.start()
+            atexit.register(self.shutdown)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="milosign-expiry", daemon=True
+        )
+        self._thread.start()
+
+    def shutdown(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self._app.app_context():
+                    expire_overdue()
+            except Exception as e:
+                logger.exception("❌ Error expirando documentos: %s", e)
+
+
+expiry_sweeper = ExpirySweeper()
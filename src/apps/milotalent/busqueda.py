@@ -0,0 +1,200 @@
+"""
+MiloTalent - Índice de búsqueda de prestadores
+Tabla virtual FTS5 (SQLite) sobre cédula, código SAP y nombres, sin
+acentos y con prefijos, mantenida por triggers en cada INSERT/UPDATE/
+DELETE. Respalda el filtro del listado y la API de autocompletado; en
+otros motores se usa LIKE como respaldo
+"""
+
+from sqlalchemy import event, inspect
+
+from models import db
+from structured_logging import get_logger
+from utils import search_terms
+from .models import PrestadorServicio
+
+logger = get_logger('milotalent.busqueda')
+
+TABLA_FTS = 'talent_prestadores_fts'
+
+# Columnas indexadas y peso de cada una en el ranking bm25
+COLUMNAS_FTS = (
+    ('cedula_ps', 5.0),
+    ('codigo_sap', 5.0),
+    ('nombre_1', 2.0),
+    ('nombre_2', 1.0),
+    ('apellido_1', 2.0),
+    ('apellido_2', 1.0),
+)
+COLUMNAS_CODIGO = ('cedula_ps', 'codigo_sap')
+
+DEFAULT_LIMITE = 10
+
+_fts5_soportado = None
+
+
+# ========================================
+# DDL DEL ÍNDICE
+# ========================================
+
+def _ddl():
+    tabla = PrestadorServicio.__tablename__
+    columnas = ', '.join(c for c, _ in COLUMNAS_FTS)
+    nuevas = ', '.join(f'new.{c}' for c, _ in COLUMNAS_FTS)
+    viejas = ', '.join(f'old.{c}' for c, _ in COLUMNAS_FTS)
+    pesos = ', '.join(str(p) for _, p in COLUMNAS_FTS)
+    borrar = (
+        f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, {columnas}) "
+        f"VALUES ('delete', old.id, {viejas});"
+    )
+    insertar = f"INSERT INTO {TABLA_FTS}(rowid, {columnas}) VALUES (new.id, {nuevas});"
+    return [
+        # Contenido externo: el índice no duplica las filas de la tabla;
+        # remove_diacritics pliega acentos y prefix acelera "abc"*
+        f"CREATE VIRTUAL TABLE {TABLA_FTS} USING fts5({columnas}, "
+        f"content='{tabla}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rank) VALUES ('rank', 'bm25({pesos})')",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON {tabla} "
+        f"BEGIN {insertar} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON {tabla} "
+        f"BEGIN {borrar} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE OF {columnas} "
+        f"ON {tabla} BEGIN {borrar} {insertar} END",
+    ]
+
+
+def fts_soportado(bind):
+    """True si el motor es SQLite y fue compilado con FTS5"""
+    global _fts5_soportado
+    if bind.dialect.name != 'sqlite':
+        return False
+    if _fts5_soportado is None:
+        opciones = bind.exec_driver_sql('PRAGMA compile_options').scalars().all()
+        _fts5_soportado = 'ENABLE_FTS5' in opciones
+    return _fts5_soportado
+
+
+def crear_indice_busqueda(connection):
+    """Crea la tabla FTS5 y sus triggers si no existen; retorna True si la creó"""
+    if not fts_soportado(connection) or inspect(connection).has_table(TABLA_FTS):
+        return False
+    for sentencia in _ddl():
+        connection.exec_driver_sql(sentencia)
+    # Indexa los prestadores que ya existían
+    connection.exec_driver_sql(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+    return True
+
+
+@event.listens_for(PrestadorServicio.__table__, 'after_create')
+def _crear_con_tabla(target, connection, **kw):
+    crear_indice_busqueda(connection)
+
+
+@event.listens_for(PrestadorServicio.__table__, 'before_drop')
+def _eliminar_con_tabla(target, connection, **kw):
+    if fts_soportado(connection):
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {TABLA_FTS}')
+
+
+def init_busqueda(app):
+    """Crea el índice en bases existentes (idempotente)"""
+    with app.app_context():
+        try:
+            with db.engine.begin() as connection:
+                if crear_indice_busqueda(connection):
+                    logger.info('✅ Índice de búsqueda creado', extra={'table': TABLA_FTS})
+        except Exception as e:
+            logger.exception('⚠️ No se pudo crear el índice de búsqueda: %s', e)
+
+
+# ========================================
+# CONSULTAS
+# ========================================
+
+_fts = db.table(TABLA_FTS, db.column('rowid'), db.column('rank'))
+
+
+def expresion_fts(texto, columnas=None):
+    """Consulta MATCH: cada término como prefijo, todos obligatorios"""
+    palabras = search_terms(texto)
+    if not palabras:
+        return None
+    expresion = ' AND '.join(f'"{p}"*' for p in palabras)
+    if columnas:
+        expresion = f"{{{' '.join(columnas)}}} : ({expresion})"
+    return expresion
+
+
+def _match(expresion):
+    return db.literal_column(TABLA_FTS).op('MATCH')(expresion)
+
+
+def _respaldo_like(texto, columnas):
+    """Condición equivalente con LIKE para motores sin FTS5"""
+    condiciones = []
+    for palabra in search_terms(texto):
+        condiciones.append(db.or_(*(
+            getattr(PrestadorServicio, c).ilike(f'{palabra}%')
+            if c in COLUMNAS_CODIGO
+            else getattr(PrestadorServicio, c).ilike(f'%{palabra}%')
+            for c in columnas
+        )))
+    return db.and_(*condiciones)
+
+
+def condicion_busqueda(texto, columnas=None):
+    """Condición WHERE sobre PrestadorServicio para el texto buscado.
+
+    columnas limita la búsqueda (p. ej. solo cédula/código SAP); sin
+    valor se busca en todas las columnas indexadas.
+    """
+    expresion = expresion_fts(texto, columnas)
+    if expresion is None:
+        return None
+    if not fts_soportado(db.session.connection()):
+        return _respaldo_like(texto, columnas or [c for c, _ in COLUMNAS_FTS])
+    return PrestadorServicio.id.in_(
+        db.select(_fts.c.rowid).where(_match(expresion))
+    )
+
+
+def buscar(texto, limite=DEFAULT_LIMITE):
+    """Prestadores que coinciden con el texto, ordenados por relevancia"""
+    expresion = expresion_fts(texto)
+    if expresion is None:
+        return []
+    columnas = (
+        PrestadorServicio.id,
+        PrestadorServicio.cedula_ps,
+        PrestadorServicio.codigo_sap,
+        PrestadorServicio.nombre_1,
+        PrestadorServicio.nombre_2,
+        PrestadorServicio.apellido_1,
+        PrestadorServicio.apellido_2,
+    )
+    if fts_soportado(db.session.connection()):
+        stmt = (
+            db.select(*columnas)
+            .join(_fts, _fts.c.rowid == PrestadorServicio.id)
+            .where(_match(expresion))
+            .order_by(_fts.c.rank)
+        )
+    else:
+        stmt = (
+            db.select(*columnas)
+            .where(_respaldo_like(texto, [c for c, _ in COLUMNAS_FTS]))
+            .order_by(PrestadorServicio.apellido_1, PrestadorServicio.nombre_1)
+        )
+    filas = db.session.execute(stmt.limit(limite)).all()
+    return [
+        {
+            'id': fila.id,
+            'cedula_ps': fila.cedula_ps,
+            'codigo_sap': fila.codigo_sap,
+            'nombre_completo': ' '.join(
+                p for p in (fila.nombre_1, fila.nombre_2, fila.apellido_1, fila.apellido_2) if p
+            ),
+        }
+        for fila in filas
+    ]
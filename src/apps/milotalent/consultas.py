@@ -0,0 +1,167 @@
+"""
+MiloTalent - Consultas de prestadores
+Filtros compartidos del listado, paginación por keyset sobre
+(fecha_registro, id) con cursor opaco y lectura en streaming por
+columnas (sin materializar objetos ORM)
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from models import db
+from .busqueda import COLUMNAS_CODIGO, condicion_busqueda
+from .models import PrestadorServicio
+
+# Columnas que se pueden proyectar con ?fields=
+CAMPOS_PRESTADOR = tuple(c.name for c in PrestadorServicio.__table__.columns)
+
+DEFAULT_CHUNK_SIZE = 500
+
+COLUMNAS_NOMBRE = ('nombre_1', 'nombre_2', 'apellido_1', 'apellido_2')
+
+
+class CursorInvalido(ValueError):
+    """El token de paginación no se pudo decodificar"""
+
+
+def filtros_listado(args):
+    """Condiciones del listado a partir de los parámetros de la petición.
+
+    cedula (también código SAP), nombre (cuatro campos del nombre) y q
+    (todo) usan el índice de búsqueda: sin acentos y por prefijo.
+    """
+    filtro_sexo = args.get('sexo', '')
+    filtro_estado = args.get('estado', '')
+    filtro_area = args.get('area', '')
+
+    condiciones = []
+    for parametro, columnas in (
+        ('cedula', COLUMNAS_CODIGO),
+        ('nombre', COLUMNAS_NOMBRE),
+        ('q', None),
+    ):
+        condicion = condicion_busqueda(args.get(parametro, '').strip(), columnas)
+        if condicion is not None:
+            condiciones.append(condicion)
+    if filtro_sexo:
+        condiciones.append(PrestadorServicio.sexo == filtro_sexo)
+    if filtro_estado:
+        condiciones.append(PrestadorServicio.nuevo_viejo == filtro_estado)
+    if filtro_area:
+        condiciones.append(PrestadorServicio.area_personal_id == filtro_area)
+    return condiciones
+
+
+def resolver_campos(fields):
+    """Valida ?fields=a,b,c; sin valor retorna todas las columnas"""
+    if not fields:
+        return list(CAMPOS_PRESTADOR)
+    campos = [f.strip() for f in fields.split(',') if f.strip()]
+    invalidos = [f for f in campos if f not in CAMPOS_PRESTADOR]
+    if invalidos:
+        raise ValueError(f"Campos no válidos: {', '.join(invalidos)}")
+    return campos
+
+
+# ========================================
+# CURSOR OPACO (fecha_registro, id)
+# ========================================
+
+def encode_cursor(fecha_registro, ps_id):
+    raw = json.dumps(
+        [fecha_registro.isoformat() if fecha_registro else None, ps_id]
+    )
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padding = '=' * (-len(token) % 4)
+        fecha, ps_id = json.loads(base64.urlsafe_b64decode(token + padding))
+        return (datetime.fromisoformat(fecha) if fecha else None), int(ps_id)
+    except (ValueError, TypeError) as e:
+        raise CursorInvalido('Cursor de paginación inválido') from e
+
+
+def condicion_keyset(cursor):
+    """Filas posteriores al cursor en orden (fecha_registro DESC, id DESC).
+
+    Las filas sin fecha_registro van al final (NULLS LAST).
+    """
+    fecha, ps_id = cursor
+    sin_fecha = PrestadorServicio.fecha_registro.is_(None)
+    if fecha is None:
+        return sin_fecha & (PrestadorServicio.id < ps_id)
+    return (
+        (PrestadorServicio.fecha_registro < fecha)
+        | ((PrestadorServicio.fecha_registro == fecha) & (PrestadorServicio.id < ps_id))
+        | sin_fecha
+    )
+
+
+def orden_keyset():
+    return (
+        PrestadorServicio.fecha_registro.desc().nulls_last(),
+        PrestadorServicio.id.desc(),
+    )
+
+
+# ========================================
+# LECTURA EN STREAMING
+# ========================================
+
+def _valor_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+class StreamPrestadores:
+    """Recorre prestadores con los campos pedidos, en bloques de chunk_size.
+
+    Usa un cursor del lado del servidor (stream_results/yield_per) y
+    columnas simples, por lo que la memoria no crece con la tabla. Al
+    terminar la iteración, `total` tiene las filas emitidas y `siguiente`
+    el cursor de la próxima página (None si no hay más).
+    """
+
+    def __init__(self, campos, condiciones=(), cursor=None, limite=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        self.campos = list(campos)
+        self.condiciones = list(condiciones)
+        self.cursor = cursor
+        self.limite = limite
+        self.chunk_size = chunk_size
+        self.total = 0
+        self.siguiente = None
+
+    def statement(self):
+        columnas = list(dict.fromkeys(self.campos + ['fecha_registro', 'id']))
+        stmt = db.select(*[PrestadorServicio.__table__.c[c] for c in columnas])
+        for condicion in self.condiciones:
+            stmt = stmt.where(condicion)
+        if self.cursor is not None:
+            stmt = stmt.where(condicion_keyset(self.cursor))
+        stmt = stmt.order_by(*orden_keyset())
+        if self.limite:
+            stmt = stmt.limit(self.limite)
+        return stmt
+
+    def __iter__(self):
+        resultado = db.session.execute(
+            self.statement().execution_options(
+                stream_results=True, yield_per=self.chunk_size
+            )
+        )
+        ultima = None
+        try:
+            for fila in resultado.mappings():
+                ultima = fila
+                self.total += 1
+                yield {campo: _valor_json(fila[campo]) for campo in self.campos}
+        finally:
+            resultado.close()
+
+        if self.limite and self.total == self.limite and ultima is not None:
+            self.siguiente = encode_cursor(ultima['fecha_registro'], ultima['id'])
@@ -0,0 +1,376 @@
+"""
+MiloTalent - Exportación masiva de prestadores
+Trabajos en segundo plano que recorren talent_prestadores_new unido a
+TalentEntidad (nombres resueltos) por bloques y escriben CSV, XLSX o
+Parquet, con progreso consultable y archivo descargable. El estado de
+cada trabajo se guarda como JSON junto al archivo, de modo que cualquier
+worker que comparta EXPORT_DIR puede responder por él
+"""
+
+import csv
+import json
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from sqlalchemy import types as sa_types
+from sqlalchemy.orm import aliased
+
+from models import db, TalentEntidad
+from .consultas import filtros_listado
+from .models import PrestadorServicio, RELACIONES_ENTIDAD
+
+FORMATOS = {
+    'csv': ('.csv', 'text/csv'),
+    'xlsx': (
+        '.xlsx',
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    ),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_MAX_JOBS = 50
+
+_JOB_ID = re.compile(r'[0-9a-f]{32}')
+
+
+class ExportError(Exception):
+    """Error de configuración o ejecución de una exportación"""
+
+
+def consulta_exportacion(condiciones=()):
+    """SELECT de PS + <relación>_nombre con LEFT JOIN por cada FK"""
+    tabla = PrestadorServicio.__table__
+    columnas = list(tabla.columns)
+    stmt_from = tabla
+    for columna_fk, prefijo in RELACIONES_ENTIDAD:
+        entidad = aliased(TalentEntidad, name=f'ent_{prefijo}')
+        columnas.append(entidad.nombre.label(f'{prefijo}_nombre'))
+        stmt_from = stmt_from.outerjoin(
+            entidad, entidad.id == tabla.c[columna_fk]
+        )
+    stmt = db.select(*columnas).select_from(stmt_from)
+    for condicion in condiciones:
+        stmt = stmt.where(condicion)
+    return stmt.order_by(tabla.c.id)
+
+
+def _valor_celda(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+# ========================================
+# ESCRITORES POR FORMATO
+# ========================================
+
+class _CSVWriter:
+    def __init__(self, path, columnas):
+        encabezados = [c.name for c in columnas]
+        # utf-8-sig para que Excel reconozca los acentos
+        self._file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(encabezados)
+
+    def write_rows(self, filas):
+        self._writer.writerows(
+            [_valor_celda(v) for v in fila] for fila in filas
+        )
+
+    def close(self):
+        self._file.close()
+
+
+class _XLSXWriter:
+    def __init__(self, path, columnas):
+        try:
+            from openpyxl import Workbook
+        except ImportError as e:
+            raise ExportError('El formato xlsx requiere openpyxl') from e
+        self.path = path
+        # write_only: las filas se vuelcan al disco, no quedan en memoria
+        self._book = Workbook(write_only=True)
+        self._sheet = self._book.create_sheet('Prestadores')
+        self._sheet.append([c.name for c in columnas])
+
+    def write_rows(self, filas):
+        for fila in filas:
+            self._sheet.append(list(fila))
+
+    def close(self):
+        self._book.save(self.path)
+
+
+def _tipo_arrow(pa, tipo):
+    """Tipo Arrow de una columna según su tipo SQL; lo desconocido (o sin
+    tipo) va como texto"""
+    if isinstance(tipo, sa_types.Boolean):
+        return pa.bool_()
+    if isinstance(tipo, sa_types.Integer):
+        return pa.int64()
+    if isinstance(tipo, sa_types.Float):
+        return pa.float64()
+    if isinstance(tipo, sa_types.DateTime):
+        return pa.timestamp('us')
+    if isinstance(tipo, sa_types.Date):
+        return pa.date32()
+    return pa.string()
+
+
+class _ParquetWriter:
+    """El esquema sale de los tipos del SELECT, no del primer bloque: una
+    columna toda NULL al inicio no queda como tipo null"""
+
+    def __init__(self, path, columnas):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ExportError('El formato parquet requiere pyarrow') from e
+        self._pa = pa
+        self._schema = pa.schema(
+            [(c.name, _tipo_arrow(pa, c.type)) for c in columnas]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write_rows(self, filas):
+        valores = list(zip(*filas)) or [() for _ in self._schema]
+        tabla = self._pa.Table.from_arrays(
+            [
+                self._pa.array(list(columna), type=campo.type)
+                for columna, campo in zip(valores, self._schema)
+            ],
+            schema=self._schema,
+        )
+        self._writer.write_table(tabla)
+
+    def close(self):
+        self._writer.close()
+
+
+_WRITERS = {'csv': _CSVWriter, 'xlsx': _XLSXWriter, 'parquet': _ParquetWriter}
+
+
+# ========================================
+# TRABAJOS
+# ========================================
+
+class ExportJob:
+    """Estado de una exportación (consultado por el endpoint de progreso)"""
+
+    _CAMPOS = ('id', 'formato', 'filtros', 'user_id', 'estado', 'total',
+               'procesados', 'ruta', 'error')
+
+    def __init__(self, formato, filtros, user_id=None):
+        self.id = uuid.uuid4().hex
+        self.formato = formato
+        self.filtros = dict(filtros)
+        self.user_id = user_id
+        self.estado = 'pendiente'
+        self.total = None
+        self.procesados = 0
+        self.ruta = None
+        self.error = None
+        self.creado = datetime.utcnow()
+        self.finalizado = None
+
+    def to_state(self):
+        """Estado completo serializable (archivo <id>.json)"""
+        estado = {campo: getattr(self, campo) for campo in self._CAMPOS}
+        estado['creado'] = self.creado.isoformat()
+        estado['finalizado'] = self.finalizado.isoformat() if self.finalizado else None
+        return estado
+
+    @classmethod
+    def from_state(cls, estado):
+        job = cls(estado['formato'], estado['filtros'], estado['user_id'])
+        for campo in cls._CAMPOS:
+            setattr(job, campo, estado[campo])
+        job.creado = datetime.fromisoformat(estado['creado'])
+        if estado['finalizado']:
+            job.finalizado = datetime.fromisoformat(estado['finalizado'])
+        return job
+
+    @property
+    def nombre_archivo(self):
+        extension = FORMATOS[self.formato][0]
+        return f"prestadores_{self.creado.strftime('%Y%m%d_%H%M%S')}{extension}"
+
+    def to_dict(self):
+        progreso = None
+        if self.total:
+            progreso = round(100 * self.procesados / self.total, 1)
+        elif self.estado == 'completado':
+            progreso = 100.0
+        return {
+            'id': self.id,
+            'formato': self.formato,
+            'estado': self.estado,
+            'total': self.total,
+            'procesados': self.procesados,
+            'progreso': progreso,
+            'error': self.error,
+            'archivo': self.nombre_archivo if self.estado == 'completado' else None,
+            'creado': self.creado.isoformat(),
+            'finalizado': self.finalizado.isoformat() if self.finalizado else None,
+        }
+
+
+class ExportManager:
+    """Ejecuta exportaciones en un pool de hilos y guarda los artefactos.
+
+    El estado de cada trabajo se persiste en EXPORT_DIR/<id>.json (al
+    crearlo, por bloque y al terminar), así que el progreso y la descarga
+    funcionan con varios workers siempre que compartan EXPORT_DIR.
+
+    - EXPORT_DIR: carpeta de artefactos y estados (por defecto
+      data/exports); debe ser la misma para todos los workers
+    - EXPORT_WORKERS: exportaciones simultáneas
+    - EXPORT_CHUNK_SIZE: filas por bloque leído/escrito
+    - EXPORT_MAX_JOBS: trabajos terminados que se conservan (los más
+      antiguos se eliminan junto con su archivo)
+    """
+
+    def __init__(self):
+        self.app = None
+        self.export_dir = None
+        self.chunk_size = DEFAULT_CHUNK_SIZE
+        self.max_jobs = DEFAULT_MAX_JOBS
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.export_dir = app.config.get('EXPORT_DIR') or os.path.join(
+            app.root_path, '..', 'data', 'exports'
+        )
+        self.chunk_size = app.config.get('EXPORT_CHUNK_SIZE', self.chunk_size)
+        self.max_jobs = app.config.get('EXPORT_MAX_JOBS', self.max_jobs)
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('EXPORT_WORKERS', 2),
+            thread_name_prefix='milotalent-export',
+        )
+        app.extensions['milotalent_export'] = self
+
+    def submit(self, formato, filtros=None, user_id=None):
+        """Encola una exportación y retorna el trabajo"""
+        if formato not in FORMATOS:
+            raise ExportError(f'Formato no soportado: {formato}')
+        if self._executor is None:
+            raise ExportError('El gestor de exportaciones no está inicializado')
+        job = ExportJob(formato, filtros or {}, user_id)
+        os.makedirs(self.export_dir, exist_ok=True)
+        self._guardar(job)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        """Trabajo de este proceso o, si lo ejecuta otro worker, su último
+        estado guardado"""
+        if not _JOB_ID.fullmatch(job_id or ''):
+            return None
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            with open(self._ruta_estado(job_id), encoding='utf-8') as f:
+                return ExportJob.from_state(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _ruta_estado(self, job_id):
+        return os.path.join(self.export_dir, f'{job_id}.json')
+
+    def _guardar(self, job):
+        """Escribe el estado con renombrado atómico (nunca a medias)"""
+        ruta = self._ruta_estado(job.id)
+        temporal = f'{ruta}.{threading.get_ident()}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(job.to_state(), f)
+        os.replace(temporal, ruta)
+
+    def _prune(self):
+        """Conserva los max_jobs trabajos terminados más recientes (de
+        todos los workers) y elimina el resto junto con su archivo"""
+        terminados = []
+        for nombre in os.listdir(self.export_dir):
+            job_id, extension = os.path.splitext(nombre)
+            if extension != '.json' or not _JOB_ID.fullmatch(job_id):
+                continue
+            job = self.get(job_id)
+            if job is not None and job.finalizado:
+                terminados.append(job)
+        terminados.sort(key=lambda j: j.finalizado)
+        for job in terminados[: max(0, len(terminados) - self.max_jobs)]:
+            self._jobs.pop(job.id, None)
+            for ruta in (job.ruta, self._ruta_estado(job.id)):
+                if ruta and os.path.exists(ruta):
+                    os.remove(ruta)
+
+    def _run(self, job):
+        with self.app.app_context():
+            try:
+                self.run_job(job)
+            except Exception as e:
+                job.estado = 'error'
+                job.error = str(e)
+            finally:
+                job.finalizado = datetime.utcnow()
+                self._guardar(job)
+                db.session.remove()
+
+    def run_job(self, job):
+        """Ejecuta la exportación en el hilo actual (requiere app_context)"""
+        job.estado = 'ejecutando'
+        condiciones = filtros_listado(job.filtros)
+        job.total = db.session.execute(
+            db.select(db.func.count(PrestadorServicio.id)).where(*condiciones)
+        ).scalar()
+        self._guardar(job)
+
+        os.makedirs(self.export_dir, exist_ok=True)
+        ruta = os.path.join(self.export_dir, f'{job.id}{FORMATOS[job.formato][0]}')
+        temporal = ruta + '.part'
+
+        stmt = consulta_exportacion(condiciones)
+        resultado = db.session.execute(
+            stmt.execution_options(stream_results=True, yield_per=self.chunk_size)
+        )
+        writer = None
+        try:
+            writer = _WRITERS[job.formato](temporal, list(stmt.selected_columns))
+            for bloque in resultado.partitions():
+                writer.write_rows(bloque)
+                job.procesados += len(bloque)
+                self._guardar(job)
+            writer.close()
+            writer = None
+            # Renombrado atómico: el archivo solo aparece completo
+            os.replace(temporal, ruta)
+        except Exception:
+            if writer is not None:
+                try:
+                    writer.close()
+                except Exception:
+                    pass
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        finally:
+            resultado.close()
+
+        job.ruta = ruta
+        job.estado = 'completado'
+        return job
+
+
+export_manager = ExportManager()
@@ -0,0 +1,470 @@
+"""
+MiloTalent - Importación masiva de prestadores
+Lee CSV/XLSX fila a fila, resuelve nombres de entidades con un mapa en
+memoria, valida unicidad con una consulta por lote e inserta prestadores
+y auditoría en bloque, con reporte de errores por fila
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+
+import click
+from sqlalchemy.exc import IntegrityError
+
+from catalog_cache import catalog_cache
+from models import db
+from utils import fold_accents
+from .models import PrestadorServicio, AuditoriaPS, RELACIONES_ENTIDAD
+from .stats import stats_engine
+
+DEFAULT_BATCH_SIZE = 500
+
+EXTENSIONES = ('.csv', '.xlsx')
+
+# Mismos obligatorios que el formulario de registro (crear_ps)
+CAMPOS_REQUERIDOS = (
+    'cedula_ps', 'expedida_id', 'nombre_1', 'apellido_1', 'sexo',
+    'codigo_sap', 'fecha_nacimiento', 'ciudad_nacimiento_id', 'direccion',
+    'municipio_residencia_id', 'telefono', 'mail', 'profesion_id',
+    'estado_civil', 'rh', 'identidad_genero', 'raza', 'banco_id',
+    'cuenta_bancaria', 'tipo_cuenta', 'regimen_iva', 'eps_id', 'afp_id',
+    'arl_id', 'tipo_riesgo', 'operador_ss_id', 'nuevo_viejo', 'area_personal_id',
+)
+
+# Prefijo de la relación -> tipo de TalentEntidad (por defecto el prefijo)
+TIPO_RELACION = {
+    'expedida': 'municipio',
+    'ciudad_nacimiento': 'municipio',
+    'municipio_residencia': 'municipio',
+}
+
+VALORES_POR_DEFECTO = {
+    'nombre_2': '',
+    'apellido_2': '',
+    'pais_nacimiento': 'CO',
+    'pais_residencia': 'CO',
+    'no_hijos': 0,
+    'discapacidad': 'NINGUNA',
+    'caja_compensacion_id': None,
+}
+
+# Columnas que se leen del archivo (sin id ni metadatos del sistema)
+_OMITIDAS = {'id', 'fecha_registro', 'usuario_registro', 'fecha_actualizacion'}
+COLUMNAS_IMPORTABLES = tuple(
+    c.name for c in PrestadorServicio.__table__.columns if c.name not in _OMITIDAS
+)
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d', '%d-%m-%Y')
+
+
+class ImportacionError(ValueError):
+    """El archivo no se puede importar (formato o encabezados)"""
+
+
+# ========================================
+# LECTURA EN STREAMING
+# ========================================
+
+def _leer_csv(stream):
+    texto = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.reader(texto, dialecto)
+    encabezados = next(lector, None)
+    if not encabezados:
+        raise ImportacionError('El archivo está vacío')
+    yield [h.strip() for h in encabezados]
+    yield from lector
+
+
+def _leer_xlsx(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportacionError('El formato xlsx requiere openpyxl') from e
+    # read_only: las filas se leen del zip bajo demanda
+    libro = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezados = next(filas, None)
+        if not encabezados:
+            raise ImportacionError('El archivo está vacío')
+        yield ['' if h is None else str(h).strip() for h in encabezados]
+        yield from filas
+    finally:
+        libro.close()
+
+
+def leer_filas(stream, nombre_archivo):
+    """Genera (número de fila, dict) sin cargar el archivo completo"""
+    extension = os.path.splitext(nombre_archivo or '')[1].lower()
+    if extension == '.csv':
+        filas = _leer_csv(stream)
+    elif extension == '.xlsx':
+        filas = _leer_xlsx(stream)
+    else:
+        raise ImportacionError(
+            f"Formato no soportado: {extension or 'sin extensión'} "
+            f"(use {', '.join(EXTENSIONES)})"
+        )
+    encabezados = next(filas)
+    # La fila 1 es el encabezado, como la ve el usuario en Excel
+    for numero, valores in enumerate(filas, start=2):
+        if not any(v not in (None, '') for v in valores):
+            continue
+        yield numero, dict(zip(encabezados, valores))
+
+
+# ========================================
+# CONVERSIÓN Y VALIDACIÓN
+# ========================================
+
+class MapaEntidades:
+    """Nombre, código o código DANE normalizado -> id, por tipo.
+
+    Se construye con los catálogos de catalog_cache (una consulta por tipo
+    como máximo), así que resolver una fila no consulta la base de datos.
+    """
+
+    def __init__(self):
+        self._mapas = {}
+        self._ids = {}
+
+    def _mapa(self, tipo):
+        mapa = self._mapas.get(tipo)
+        if mapa is None:
+            mapa = {}
+            data = catalog_cache.get(tipo).data
+            self._ids[tipo] = {entidad['id'] for entidad in data}
+            for entidad in data:
+                for clave in ('nombre', 'codigo', 'codigo_dane'):
+                    valor = fold_accents(entidad.get(clave))
+                    if not valor:
+                        continue
+                    previo = mapa.get(valor)
+                    # Una clave compartida por dos entidades es ambigua
+                    mapa[valor] = entidad['id'] if previo in (None, entidad['id']) else False
+            self._mapas[tipo] = mapa
+        return mapa
+
+    def ids(self, tipo):
+        self._mapa(tipo)
+        return self._ids[tipo]
+
+    def resolver(self, tipo, valor):
+        """id de la entidad o None; lanza ValueError si es ambiguo"""
+        resultado = self._mapa(tipo).get(fold_accents(valor))
+        if resultado is False:
+            raise ValueError('ambiguo, use el código')
+        return resultado
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        # Excel guarda cédulas y teléfonos como números
+        valor = int(valor)
+    if isinstance(valor, datetime):
+        valor = valor.date()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor).strip()
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    valor = str(valor).strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f'fecha inválida: {valor}')
+
+
+def _entero(valor):
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        raise ValueError(f'número inválido: {valor}')
+
+
+def convertir_fila(datos, entidades):
+    """Fila del archivo -> (valores para INSERT, lista de errores)"""
+    valores = {}
+    errores = []
+    invalidos = set()
+
+    for columna_fk, prefijo in RELACIONES_ENTIDAD:
+        tipo = TIPO_RELACION.get(prefijo, prefijo)
+        id_texto = _texto(datos.get(columna_fk))
+        nombre = _texto(datos.get(f'{prefijo}_nombre') or datos.get(prefijo))
+        try:
+            if id_texto:
+                entidad_id = _entero(id_texto)
+                if entidad_id not in entidades.ids(tipo):
+                    raise ValueError(f'no existe la entidad {entidad_id}')
+            elif nombre:
+                entidad_id = entidades.resolver(tipo, nombre)
+                if entidad_id is None:
+                    raise ValueError(f'"{nombre}" no existe en {tipo}')
+            else:
+                continue
+        except ValueError as e:
+            errores.append(f'{columna_fk}: {e}')
+            invalidos.add(columna_fk)
+            continue
+        valores[columna_fk] = entidad_id
+
+    tabla = PrestadorServicio.__table__
+    for nombre in COLUMNAS_IMPORTABLES:
+        if nombre in valores or nombre not in datos:
+            continue
+        texto = _texto(datos[nombre])
+        if not texto:
+            continue
+        try:
+            if nombre == 'fecha_nacimiento':
+                valores[nombre] = _fecha(datos[nombre])
+            elif nombre == 'no_hijos':
+                valores[nombre] = _entero(texto)
+            else:
+                longitud = getattr(tabla.c[nombre].type, 'length', None)
+                if longitud and len(texto) > longitud:
+                    raise ValueError(f'máximo {longitud} caracteres')
+                valores[nombre] = texto
+        except ValueError as e:
+            errores.append(f'{nombre}: {e}')
+            invalidos.add(nombre)
+
+    faltantes = [
+        c for c in CAMPOS_REQUERIDOS if c not in valores and c not in invalidos
+    ]
+    if faltantes:
+        errores.append(f"Faltan campos obligatorios: {', '.join(faltantes)}")
+
+    for campo, defecto in VALORES_POR_DEFECTO.items():
+        valores.setdefault(campo, defecto)
+    return valores, errores
+
+
+# ========================================
+# IMPORTACIÓN POR LOTES
+# ========================================
+
+class ResultadoImportacion:
+    """Resumen y errores por fila de una importación"""
+
+    def __init__(self, simulacion=False):
+        self.simulacion = simulacion
+        self.total = 0
+        self.insertados = 0
+        self.errores = []
+
+    def error(self, fila, datos, mensajes):
+        self.errores.append({
+            'fila': fila,
+            'cedula_ps': _texto(datos.get('cedula_ps')) or None,
+            'errores': list(mensajes),
+        })
+
+    def to_dict(self):
+        return {
+            'simulacion': self.simulacion,
+            'total': self.total,
+            'insertados': self.insertados,
+            'con_errores': len(self.errores),
+            'errores': sorted(self.errores, key=lambda e: e['fila']),
+        }
+
+
+class ImportadorPrestadores:
+    """Importa prestadores por lotes de batch_size filas.
+
+    Por lote: una consulta IN para cédulas/códigos SAP ya registrados, un
+    INSERT múltiple de prestadores, uno de auditoría y un commit. Un lote
+    que falla en la base de datos se revierte completo y sus filas quedan
+    en el reporte.
+    """
+
+    def __init__(self, usuario='SYSTEM', batch_size=DEFAULT_BATCH_SIZE,
+                 simulacion=False, ip_usuario=None, user_agent=None):
+        self.usuario = usuario
+        self.batch_size = batch_size
+        self.simulacion = simulacion
+        self.ip_usuario = ip_usuario
+        self.user_agent = user_agent
+        self.entidades = MapaEntidades()
+        self._cedulas = set()
+        self._codigos = set()
+
+    def importar(self, stream, nombre_archivo):
+        resultado = ResultadoImportacion(self.simulacion)
+        lote = []
+        for fila, datos in leer_filas(stream, nombre_archivo):
+            resultado.total += 1
+            valores, errores = convertir_fila(datos, self.entidades)
+            errores += self._duplicados_en_archivo(valores)
+            if errores:
+                resultado.error(fila, datos, errores)
+                continue
+            self._registrar_claves(valores)
+            lote.append((fila, datos, valores))
+            if len(lote) >= self.batch_size:
+                self._procesar_lote(lote, resultado)
+                lote = []
+        if lote:
+            self._procesar_lote(lote, resultado)
+
+        if resultado.insertados:
+            stats_engine.invalidar()
+        return resultado
+
+    def _duplicados_en_archivo(self, valores):
+        """Cédula/código SAP ya usados por una fila válida anterior
+        (los valores vacíos no cuentan)"""
+        errores = []
+        cedula = valores.get('cedula_ps')
+        codigo = valores.get('codigo_sap')
+        if cedula is not None and cedula in self._cedulas:
+            errores.append(f'cedula_ps {cedula} repetida en el archivo')
+        if codigo is not None and codigo in self._codigos:
+            errores.append(f'codigo_sap {codigo} repetido en el archivo')
+        return errores
+
+    def _registrar_claves(self, valores):
+        """Solo las filas válidas reservan su cédula y código SAP"""
+        if valores.get('cedula_ps') is not None:
+            self._cedulas.add(valores['cedula_ps'])
+        if valores.get('codigo_sap') is not None:
+            self._codigos.add(valores['codigo_sap'])
+
+    def _existentes(self, lote):
+        cedulas = [v['cedula_ps'] for _, _, v in lote]
+        codigos = [v['codigo_sap'] for _, _, v in lote]
+        filas = db.session.execute(
+            db.select(PrestadorServicio.cedula_ps, PrestadorServicio.codigo_sap).where(
+                PrestadorServicio.cedula_ps.in_(cedulas)
+                | PrestadorServicio.codigo_sap.in_(codigos)
+            )
+        ).all()
+        return (
+            {f.cedula_ps for f in filas},
+            {f.codigo_sap for f in filas if f.codigo_sap is not None},
+        )
+
+    def _procesar_lote(self, lote, resultado):
+        cedulas, codigos = self._existentes(lote)
+        validas = []
+        for fila, datos, valores in lote:
+            errores = []
+            if valores['cedula_ps'] in cedulas:
+                errores.append('Ya existe un PS registrado con esta cédula')
+            if valores['codigo_sap'] in codigos:
+                errores.append('Ya existe un PS registrado con este código SAP')
+            if errores:
+                resultado.error(fila, datos, errores)
+            else:
+                validas.append((fila, datos, valores))
+
+        if self.simulacion:
+            resultado.insertados += len(validas)
+            return
+        if not validas:
+            return
+
+        ahora = datetime.utcnow()
+        registros = []
+        for _, _, valores in validas:
+            registro = dict(valores)
+            registro.update(
+                usuario_registro=self.usuario,
+                fecha_registro=ahora,
+                fecha_actualizacion=ahora,
+            )
+            registros.append(registro)
+
+        try:
+            ids = dict(db.session.execute(
+                db.insert(PrestadorServicio).returning(
+                    PrestadorServicio.cedula_ps, PrestadorServicio.id
+                ),
+                registros,
+            ).all())
+            db.session.execute(
+                db.insert(AuditoriaPS),
+                [self._auditoria(ids[r['cedula_ps']], r, ahora) for r in registros],
+            )
+            db.session.commit()
+        except IntegrityError as e:
+            # Otro proceso registró alguna cédula/código entre la
+            # verificación y el INSERT: el lote completo se revierte
+            db.session.rollback()
+            for fila, datos, _ in validas:
+                resultado.error(fila, datos, [f'Conflicto al guardar el lote: {e.orig}'])
+            return
+        resultado.insertados += len(registros)
+
+    def _auditoria(self, ps_id, registro, fecha):
+        return {
+            'ps_id': ps_id,
+            'usuario_id': self.usuario,
+            'accion': 'importacion_ps',
+            'modulo': 'importacion',
+            'descripcion': (
+                f"Importación de PS: {registro['nombre_1']} {registro['apellido_1']} "
+                f"({registro['cedula_ps']})"
+            ),
+            'fecha_hora': fecha,
+            'ip_usuario': self.ip_usuario,
+            'user_agent': self.user_agent,
+            'valores_nuevos': json.dumps(registro, default=str),
+        }
+
+
+# ========================================
+# CLI
+# ========================================
+
+def init_importacion(app):
+    """Registra el comando `flask importar-ps`"""
+
+    @app.cli.command('importar-ps')
+    @click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--lote', 'batch_size', type=int, default=None, help='Filas por lote')
+    @click.option('--usuario', default='SYSTEM', help='Usuario registrado en la auditoría')
+    @click.option('--simular', is_flag=True, help='Solo validar, sin insertar')
+    @click.option('--reporte', default=None, help='Guardar el reporte de errores (JSON)')
+    def importar_ps_command(archivo, batch_size, usuario, simular, reporte):
+        """Importa prestadores desde un archivo CSV o XLSX."""
+        importador = ImportadorPrestadores(
+            usuario=usuario,
+            batch_size=batch_size or app.config.get('IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+            simulacion=simular,
+        )
+        with open(archivo, 'rb') as stream:
+            try:
+                resultado = importador.importar(stream, archivo)
+            except ImportacionError as e:
+                raise click.ClickException(str(e))
+        datos = resultado.to_dict()
+        click.echo(
+            f"{datos['total']} filas, {datos['insertados']} "
+            f"{'válidas' if simular else 'insertadas'}, {datos['con_errores']} con errores"
+        )
+        for error in datos['errores']:
+            click.echo(f"  fila {error['fila']}: {'; '.join(error['errores'])}")
+        if reporte:
+            with open(reporte, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, ensure_ascii=False, indent=2)
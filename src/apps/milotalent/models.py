@@ -12,7 +12,9 @@ from datetime import datetime, date
 from enum import Enum
 import uuid
 
-from models import db
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import db, TalentEntidad
 
 
 
@@ -107,6 +109,10 @@ class PrestadorServicio(db.Model):
     """
 
     __tablename__ = "talent_prestadores_new"
+    __table_args__ = (
+        # Orden del listado y paginación por keyset de /api/prestadores
+        db.Index('idx_ps_fecha_registro_id', 'fecha_registro', 'id'),
+    )
 
     # Clave primaria
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -268,9 +274,13 @@ class PrestadorServicio(db.Model):
             )
         return 0
 
-    def to_dict(self):
-        """Convierte el objeto a diccionario para serialización, solo IDs y datos simples"""
-        return {
+    def to_dict(self, resolved=False):
+        """Convierte el objeto a diccionario para serialización.
+
+        Con resolved=True agrega <relación>_nombre para cada entidad; usar
+        precargar_entidades() antes para no consultar una vez por relación.
+        """
+        data = {
             'id': self.id,
             'cedula_ps': self.cedula_ps,
             'expedida_id': self.expedida_id,
@@ -311,6 +321,54 @@ class PrestadorServicio(db.Model):
             'fecha_registro': self.fecha_registro.isoformat() if self.fecha_registro else None,
             'fecha_actualizacion': self.fecha_actualizacion.isoformat() if self.fecha_actualizacion else None
         }
+        if resolved:
+            for _, relacion in RELACIONES_ENTIDAD:
+                entidad = getattr(self, relacion)
+                data[f'{relacion}_nombre'] = entidad.nombre if entidad else None
+        return data
+
+
+# Columna FK -> relación con TalentEntidad
+RELACIONES_ENTIDAD = (
+    ('expedida_id', 'expedida'),
+    ('ciudad_nacimiento_id', 'ciudad_nacimiento'),
+    ('municipio_residencia_id', 'municipio_residencia'),
+    ('profesion_id', 'profesion'),
+    ('banco_id', 'banco'),
+    ('eps_id', 'eps'),
+    ('afp_id', 'afp'),
+    ('arl_id', 'arl'),
+    ('caja_compensacion_id', 'caja_compensacion'),
+    ('operador_ss_id', 'operador_ss'),
+    ('area_personal_id', 'area_personal'),
+)
+
+
+def precargar_entidades(prestadores):
+    """Carga las entidades de todos los PS con una sola consulta.
+
+    Asigna las relaciones sin marcar cambios, así que las plantillas y
+    to_dict(resolved=True) no disparan el lazy load de cada una.
+    """
+    prestadores = list(prestadores)
+    ids = {
+        getattr(ps, columna)
+        for ps in prestadores
+        for columna, _ in RELACIONES_ENTIDAD
+    }
+    ids.discard(None)
+    entidades = {}
+    if ids:
+        entidades = {
+            e.id: e
+            for e in db.session.execute(
+                db.select(TalentEntidad).where(TalentEntidad.id.in_(ids))
+            ).scalars()
+        }
+    for ps in prestadores:
+        for columna, relacion in RELACIONES_ENTIDAD:
+            set_committed_value(ps, relacion, entidades.get(getattr(ps, columna)))
+    return prestadores
 
 
 # ========================================
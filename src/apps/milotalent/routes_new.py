@@ -4,19 +4,36 @@ MiloTalent - Rutas actualizadas para nueva estructura
 Sistema de Registro de Prestadores de Servicios
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context, send_file, abort
 from flask_login import login_required, current_user
 from datetime import datetime
 import json
 
 from models import db
+from structured_logging import get_logger
+from http_cache import conditional_response, make_etag
+from .stats import DIMENSIONES, stats_engine
+from .busqueda import DEFAULT_LIMITE as BUSCAR_LIMITE, buscar
+from .exportacion import FORMATOS, ExportError, export_manager
+from .importacion import DEFAULT_BATCH_SIZE, ImportacionError, ImportadorPrestadores
+from .consultas import (
+    StreamPrestadores,
+    decode_cursor,
+    filtros_listado,
+    resolver_campos,
+)
 from .models import (
     PrestadorServicio, 
     AuditoriaPS,
-
+    precargar_entidades,
 )
 
 
+# Máximo de filas por página en /api/prestadores (sin limit = todo, en streaming)
+API_PRESTADORES_MAX_LIMIT = 5000
+
+logger = get_logger("milotalent")
+
 # Blueprint
 milotalent_bp = Blueprint('milotalent', __name__, 
                           url_prefix='/milotalent')
@@ -29,6 +46,7 @@ milotalent_bp = Blueprint('milotalent', __name__,
 @login_required
 def ver_ps(ps_id):
     ps = PrestadorServicio.query.get_or_404(ps_id)
+    precargar_entidades([ps])
     return render_template('milotalent/registro/ver_ps.html', ps=ps)
 
 @milotalent_bp.route('/ps/<int:ps_id>/editar', methods=['GET', 'POST'])
@@ -37,6 +55,7 @@ def editar_ps(ps_id):
     ps = PrestadorServicio.query.get_or_404(ps_id)
     if request.method == 'POST':
         data = request.form
+        stats_antes = stats_engine.capturar(ps)
         ps.cedula_ps = data.get('cedula_ps', ps.cedula_ps)
         ps.nombre_1 = data.get('nombre_1', ps.nombre_1)
         ps.nombre_2 = data.get('nombre_2', ps.nombre_2)
@@ -68,16 +87,107 @@ def editar_ps(ps_id):
         # Guardar cambios
         from models import db
         db.session.commit()
+        stats_engine.registrar_cambio(stats_antes, ps)
         flash('Cambios guardados correctamente.', 'success')
         return redirect(url_for('milotalent.ver_ps', ps_id=ps.id))
+    precargar_entidades([ps])
     return render_template('milotalent/registro/editar_ps.html', ps=ps)
 
 @milotalent_bp.route('/ps/<int:ps_id>/exportar')
 @login_required
 def exportar_ps(ps_id):
     ps = PrestadorServicio.query.get_or_404(ps_id)
-    # Exportar como JSON simple
-    return jsonify(ps.to_dict())
+    # Exportar como JSON simple, con los nombres de las entidades
+    precargar_entidades([ps])
+    return jsonify(ps.to_dict(resolved=True))
+
+
+# ========================================
+# EXPORTACIÓN MASIVA (TRABAJOS EN SEGUNDO PLANO)
+# ========================================
+
+@milotalent_bp.route('/exportaciones', methods=['POST'])
+@login_required
+def crear_exportacion():
+    """Encola la exportación del registro completo (csv, xlsx o parquet).
+
+    Acepta los mismos filtros que el listado; responde 202 con la URL
+    para consultar el progreso.
+    """
+    datos = request.get_json(silent=True) or request.form
+    formato = datos.get('formato', 'csv')
+    filtros = {k: datos.get(k, '') for k in ('cedula', 'nombre', 'q', 'sexo', 'estado', 'area')}
+    try:
+        job = export_manager.submit(formato, filtros, user_id=current_user.get_id())
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    respuesta = job.to_dict()
+    respuesta['estado_url'] = url_for('milotalent.estado_exportacion', job_id=job.id)
+    return jsonify(respuesta), 202
+
+
+def _job_del_usuario(job_id):
+    job = export_manager.get(job_id)
+    if job is None or job.user_id != current_user.get_id():
+        abort(404)
+    return job
+
+
+@milotalent_bp.route('/exportaciones/<job_id>')
+@login_required
+def estado_exportacion(job_id):
+    """Progreso de una exportación"""
+    job = _job_del_usuario(job_id)
+    respuesta = job.to_dict()
+    if job.estado == 'completado':
+        respuesta['descarga_url'] = url_for('milotalent.descargar_exportacion', job_id=job.id)
+    return jsonify(respuesta)
+
+
+@milotalent_bp.route('/exportaciones/<job_id>/descargar')
+@login_required
+def descargar_exportacion(job_id):
+    """Descarga el archivo generado por una exportación completada"""
+    job = _job_del_usuario(job_id)
+    if job.estado != 'completado':
+        return jsonify({'error': 'La exportación aún no ha terminado'}), 409
+    return send_file(
+        job.ruta,
+        mimetype=FORMATOS[job.formato][1],
+        as_attachment=True,
+        download_name=job.nombre_archivo,
+    )
+
+
+# ========================================
+# IMPORTACIÓN MASIVA
+# ========================================
+
+@milotalent_bp.route('/importaciones', methods=['POST'])
+@login_required
+def importar_prestadores():
+    """Importa prestadores desde un archivo CSV o XLSX (campo `archivo`).
+
+    Las entidades se pueden indicar por id (<campo>_id) o por nombre/código
+    (<prefijo>_nombre, como en la exportación). Con simular=1 solo valida.
+    Responde con el resumen y los errores por fila.
+    """
+    from flask import current_app
+    archivo = request.files.get('archivo')
+    if archivo is None or not archivo.filename:
+        return jsonify({'error': 'Debe adjuntar un archivo CSV o XLSX'}), 400
+    importador = ImportadorPrestadores(
+        usuario=str(current_user.id) if current_user.is_authenticated else 'SYSTEM',
+        batch_size=current_app.config.get('IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+        simulacion=request.form.get('simular') in ('1', 'true', 'on'),
+        ip_usuario=request.remote_addr,
+        user_agent=request.headers.get('User-Agent'),
+    )
+    try:
+        resultado = importador.importar(archivo.stream, archivo.filename)
+    except ImportacionError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(resultado.to_dict())
 
 
 # ========================================
@@ -114,16 +224,14 @@ def verificar_cedula():
 def dashboard():
     """Dashboard principal con nueva estructura"""
     
-    # Estadísticas simples
-    total_ps = PrestadorServicio.query.count()
-    ps_nuevos = PrestadorServicio.query.filter_by(nuevo_viejo='N').count()
-    ps_viejos = PrestadorServicio.query.filter_by(nuevo_viejo='V').count()
+    # Estadísticas desde el motor cacheado (una sola consulta al vencer)
+    stats, _ = stats_engine.resumen()
     
     return render_template(
         'milotalent/dashboard_new.html',
-        total_ps=total_ps,
-        ps_nuevos=ps_nuevos,
-        ps_viejos=ps_viejos,
+        total_ps=stats['total_ps'],
+        ps_nuevos=stats['ps_nuevos'],
+        ps_viejos=stats['ps_viejos'],
         cdp_disponible=0
     )
 
@@ -136,16 +244,12 @@ def dashboard():
 @login_required
 def crear_ps():
     """Crear nuevo PS con nueva estructura"""
-    # Usar app.logger en lugar de print
-    from flask import current_app
     try:
         if request.method == 'POST':
             # Obtener datos del formulario
             data = request.form.to_dict()
-            print("=== DEBUG: Datos recibidos del formulario ===")
-            for key, value in data.items():
-                print(f"{key}: {value}")
-            print("=" * 50)
+            # Solo los nombres de campo: los valores son datos personales
+            logger.debug("Registro de PS recibido", extra={"form_fields": sorted(data)})
 
             # VALIDACIÓN DE CAMPOS OBLIGATORIOS
             campos_requeridos = [
@@ -229,9 +333,12 @@ def crear_ps():
         # Guardar en base de datos
         cedula_ps_val = nuevo_ps.cedula_ps
         db.session.add(nuevo_ps)
+        stats_marca = stats_engine.marca()
         db.session.commit()
         # Recuperar el objeto recién insertado
         nuevo_ps_db = PrestadorServicio.query.filter_by(cedula_ps=cedula_ps_val).first()
+        if nuevo_ps_db:
+            stats_engine.registrar_alta(nuevo_ps_db, stats_marca)
         # Registrar auditoría
         auditoria = AuditoriaPS(
             ps_id=nuevo_ps_db.id if nuevo_ps_db else None,
@@ -249,7 +356,7 @@ def crear_ps():
         return redirect(url_for('milotalent.dashboard'))
     except Exception as e:
         db.session.rollback()
-        print(f"Error al registrar PS: {e}")
+        logger.exception("Error al registrar PS: %s", e)
         flash(f"Error al registrar PS: {e}", 'error')
         return render_template('milotalent/registro/formulario_new.html')
     # ...existing code...
@@ -267,22 +374,10 @@ def listado():
     filtro_estado = request.args.get('estado', '')
     filtro_area = request.args.get('area', '')
 
-    query = PrestadorServicio.query
-    if filtro_cedula:
-        query = query.filter(PrestadorServicio.cedula_ps.like(f'%{filtro_cedula}%'))
-    if filtro_nombre:
-        query = query.filter(
-            (PrestadorServicio.nombre_1.like(f'%{filtro_nombre}%')) |
-            (PrestadorServicio.apellido_1.like(f'%{filtro_nombre}%'))
-        )
-    if filtro_sexo:
-        query = query.filter_by(sexo=filtro_sexo)
-    if filtro_estado:
-        query = query.filter_by(nuevo_viejo=filtro_estado)
-    if filtro_area:
-        query = query.filter_by(area_personal_id=filtro_area)
-
+    query = PrestadorServicio.query.filter(*filtros_listado(request.args))
     prestadores = query.order_by(PrestadorServicio.fecha_registro.desc()).paginate(page=page, per_page=20)
+    # Nombres de expedida/profesión/área de toda la página en una consulta
+    precargar_entidades(prestadores.items)
 
     return render_template(
         'milotalent/listado/prestadores_nuevo.html',
@@ -301,23 +396,100 @@ def listado():
 @milotalent_bp.route('/api/stats')
 @login_required
 def api_stats():
-    """API con estadísticas actualizadas"""
-    stats = {
-        'total_ps': PrestadorServicio.query.count(),
-        'ps_nuevos': PrestadorServicio.query.filter_by(nuevo_viejo='N').count(),
-        'ps_viejos': PrestadorServicio.query.filter_by(nuevo_viejo='V').count(),
-        'hombres': PrestadorServicio.query.filter_by(sexo='M').count(),
-        'mujeres': PrestadorServicio.query.filter_by(sexo='F').count(),
-    }
-    return jsonify(stats)
+    """API con estadísticas actualizadas.
+
+    ?desglose=eps,edad agrega conteos por dimensión (area_personal, eps,
+    municipio, edad)
+    """
+    dimensiones = [
+        d for d in request.args.get('desglose', '').split(',') if d
+    ]
+    invalidas = [d for d in dimensiones if d not in DIMENSIONES]
+    if invalidas:
+        return jsonify({'error': f"Desglose no soportado: {', '.join(invalidas)}"}), 400
+
+    # Contadores cacheados: el ETag sale de los propios valores, así que
+    # la revalidación (304) no consulta la base de datos mientras el TTL
+    # esté vigente. Sin Last-Modified: max(fecha_actualizacion) no cambia
+    # al borrar un PS y If-Modified-Since daría un 304 desactualizado
+    stats, _ = stats_engine.resumen()
+    desgloses = {d: stats_engine.desglose(d) for d in dimensiones}
+    etag = make_etag(
+        'stats', sorted(stats.items()),
+        sorted((d, sorted(c.items(), key=str)) for d, c in desgloses.items())
+    )
+
+    def build():
+        payload = dict(stats)
+        if desgloses:
+            payload['desgloses'] = {
+                d: _desglose_con_nombres(d, conteos)
+                for d, conteos in desgloses.items()
+            }
+        return jsonify(payload)
+
+    return conditional_response(etag, None, 'stats', build)
+
+
+def _desglose_con_nombres(dimension, conteos):
+    """Lista ordenada de {clave, nombre, total} usando el catálogo cacheado"""
+    tipo = DIMENSIONES[dimension].tipo_entidad
+    nombres = {}
+    if tipo:
+        from catalog_cache import catalog_cache
+        nombres = {k: v['nombre'] for k, v in catalog_cache.get(tipo).index.items()}
+    return [
+        {'clave': clave, 'nombre': nombres.get(clave, clave), 'total': total}
+        for clave, total in sorted(conteos.items(), key=lambda kv: -kv[1])
+    ]
+
+
+@milotalent_bp.route('/api/buscar')
+@login_required
+def api_buscar():
+    """Autocompletado de prestadores por cédula, código SAP o nombre.
+
+    Ignora acentos, trata cada palabra como prefijo y ordena por
+    relevancia (?q=texto&limit=N, máximo 50).
+    """
+    limite = max(1, min(request.args.get('limit', BUSCAR_LIMITE, type=int), 50))
+    return jsonify({'resultados': buscar(request.args.get('q', ''), limite)})
 
 
 @milotalent_bp.route('/api/prestadores')
 @login_required
 def api_prestadores():
-    """API para obtener lista de prestadores"""
-    prestadores = PrestadorServicio.query.all()
-    return jsonify({
-        'prestadores': [ps.to_dict() for ps in prestadores],
-        'total': len(prestadores)
-    })
+    """API de prestadores en streaming.
+
+    - format=json (por defecto, JSON por bloques) o ndjson
+    - fields=a,b,c para proyectar columnas
+    - limit=N y cursor=<token> para paginar por (fecha_registro, id)
+    - mismos filtros que el listado (cedula, nombre, q, sexo, estado, area)
+    """
+    try:
+        campos = resolver_campos(request.args.get('fields'))
+        token = request.args.get('cursor')
+        cursor = decode_cursor(token) if token else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    limite = request.args.get('limit', type=int)
+    if limite is not None:
+        limite = max(1, min(limite, API_PRESTADORES_MAX_LIMIT))
+    formato = request.args.get('format', 'json')
+    stream = StreamPrestadores(campos, filtros_listado(request.args), cursor, limite)
+
+    def generar_ndjson():
+        for fila in stream:
+            yield json.dumps(fila, ensure_ascii=False) + '\n'
+        yield json.dumps({'_meta': {'total': stream.total, 'next_cursor': stream.siguiente}}) + '\n'
+
+    def generar_json():
+        yield '{"prestadores": ['
+        for fila in stream:
+            yield (', ' if stream.total > 1 else '') + json.dumps(fila, ensure_ascii=False)
+        yield '], "total": %d, "next_cursor": %s}' % (stream.total, json.dumps(stream.siguiente))
+
+    if formato == 'ndjson':
+        return Response(stream_with_context(generar_ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(generar_json()), mimetype='application/json')
@@ -0,0 +1,263 @@
+"""
+MiloTalent - Motor de estadísticas de prestadores
+Todos los contadores del dashboard en una sola pasada (agregación
+condicional), desgloses por dimensión con un GROUP BY, caché con TTL
+corto y mantenimiento incremental opcional desde crear/editar PS
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+
+from models import db
+from .models import PrestadorServicio
+
+DEFAULT_STATS_TTL = 30  # s
+
+# contador -> (atributo, valor); cada uno es un SUM(CASE ...) de la
+# misma consulta, así que agregar uno no añade escaneos
+CONTADORES = {
+    'ps_nuevos': ('nuevo_viejo', 'N'),
+    'ps_viejos': ('nuevo_viejo', 'V'),
+    'hombres': ('sexo', 'M'),
+    'mujeres': ('sexo', 'F'),
+}
+
+# Rangos de edad: (etiqueta, edad mínima); el último es abierto
+RANGOS_EDAD = (
+    ('18-24', 18),
+    ('25-34', 25),
+    ('35-44', 35),
+    ('45-54', 45),
+    ('55+', 55),
+)
+
+Dimension = namedtuple('Dimension', ['columna', 'clave', 'tipo_entidad'])
+
+
+def _fecha_limite(edad, hoy):
+    """Fecha de nacimiento más reciente para tener `edad` años hoy"""
+    try:
+        return hoy.replace(year=hoy.year - edad)
+    except ValueError:  # 29 de febrero
+        return hoy.replace(year=hoy.year - edad, day=28)
+
+
+def rango_edad(fecha_nacimiento, hoy=None):
+    """Etiqueta del rango de edad (misma regla que la expresión SQL)"""
+    hoy = hoy or date.today()
+    etiqueta = 'menor'
+    for nombre, minimo in RANGOS_EDAD:
+        if fecha_nacimiento and fecha_nacimiento <= _fecha_limite(minimo, hoy):
+            etiqueta = nombre
+    return etiqueta
+
+
+def _columna_rango_edad(hoy=None):
+    hoy = hoy or date.today()
+    casos = [
+        (PrestadorServicio.fecha_nacimiento <= _fecha_limite(minimo, hoy), nombre)
+        for nombre, minimo in reversed(RANGOS_EDAD)
+    ]
+    return db.case(*casos, else_='menor')
+
+
+# dimensión -> cómo agrupar en SQL y cómo clasificar un PS en Python
+DIMENSIONES = {
+    'area_personal': Dimension(
+        lambda: PrestadorServicio.area_personal_id,
+        lambda ps: ps.area_personal_id,
+        'area_personal',
+    ),
+    'eps': Dimension(
+        lambda: PrestadorServicio.eps_id,
+        lambda ps: ps.eps_id,
+        'eps',
+    ),
+    'municipio': Dimension(
+        lambda: PrestadorServicio.municipio_residencia_id,
+        lambda ps: ps.municipio_residencia_id,
+        'municipio',
+    ),
+    'edad': Dimension(
+        _columna_rango_edad,
+        lambda ps: rango_edad(ps.fecha_nacimiento),
+        None,
+    ),
+}
+
+
+def calcular_resumen():
+    """Total, contadores y última actualización en una sola consulta"""
+    columnas = [
+        db.func.count(PrestadorServicio.id),
+        db.func.max(PrestadorServicio.fecha_actualizacion),
+    ]
+    for atributo, valor in CONTADORES.values():
+        columnas.append(
+            db.func.coalesce(
+                db.func.sum(
+                    db.case(
+                        (getattr(PrestadorServicio, atributo) == valor, 1),
+                        else_=0,
+                    )
+                ),
+                0,
+            )
+        )
+    fila = db.session.execute(db.select(*columnas)).one()
+    resumen = {'total_ps': fila[0]}
+    resumen.update(zip(CONTADORES, fila[2:]))
+    return resumen, fila[1]
+
+
+def calcular_desglose(dimension):
+    """Conteo por valor de la dimensión con un único GROUP BY"""
+    columna = DIMENSIONES[dimension].columna().label('clave')
+    filas = db.session.execute(
+        db.select(columna, db.func.count(PrestadorServicio.id)).group_by(
+            columna
+        )
+    ).all()
+    return {clave: total for clave, total in filas}
+
+
+def _valores_contadores(ps):
+    return {
+        nombre: getattr(ps, atributo) == valor
+        for nombre, (atributo, valor) in CONTADORES.items()
+    }
+
+
+def _claves_dimensiones(ps):
+    return {nombre: dim.clave(ps) for nombre, dim in DIMENSIONES.items()}
+
+
+class StatsEngine:
+    """Caché de estadísticas de MiloTalent.
+
+    - ttl: segundos que un resumen o desglose se considera vigente
+    - incremental: si está activo, crear/editar PS ajusta los contadores
+      cacheados en lugar de invalidarlos, y el dashboard no consulta la
+      base de datos mientras el TTL no venza
+
+    Cada entrada guarda cuándo terminó de calcularse; un alta o cambio
+    solo ajusta las entradas calculadas antes de su marca (tomada antes
+    del commit). Las posteriores pueden incluir ya la fila y se descartan
+    para no contarla dos veces.
+    """
+
+    def __init__(self, ttl=DEFAULT_STATS_TTL, incremental=True):
+        self.ttl = ttl
+        self.incremental = incremental
+        self._resumen = None
+        self._desgloses = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('MILOTALENT_STATS_TTL', self.ttl)
+        self.incremental = app.config.get(
+            'MILOTALENT_STATS_INCREMENTAL', self.incremental
+        )
+        app.extensions['milotalent_stats'] = self
+
+    def _vigente(self, entrada):
+        return entrada is not None and (
+            time.monotonic() - entrada['calculado'] < self.ttl
+        )
+
+    def resumen(self):
+        """Contadores del dashboard/api_stats (copia) y última actualización"""
+        entrada = self._resumen
+        if not self._vigente(entrada):
+            datos, ultima = calcular_resumen()
+            entrada = {
+                'datos': datos,
+                'ultima': ultima,
+                'calculado': time.monotonic(),
+            }
+            with self._lock:
+                self._resumen = entrada
+        with self._lock:
+            return dict(entrada['datos']), entrada['ultima']
+
+    def desglose(self, dimension):
+        """Conteos por dimensión (area_personal, eps, municipio, edad)"""
+        if dimension not in DIMENSIONES:
+            raise ValueError(f'Dimensión no soportada: {dimension}')
+        entrada = self._desgloses.get(dimension)
+        if not self._vigente(entrada):
+            entrada = {
+                'datos': calcular_desglose(dimension),
+                'calculado': time.monotonic(),
+            }
+            with self._lock:
+                self._desgloses[dimension] = entrada
+        with self._lock:
+            return dict(entrada['datos'])
+
+    def invalidar(self):
+        with self._lock:
+            self._resumen = None
+            self._desgloses.clear()
+
+    # ---- Mantenimiento incremental ----
+
+    def marca(self):
+        """Instante previo al commit de un alta (ver registrar_alta)"""
+        return time.monotonic()
+
+    def capturar(self, ps):
+        """Foto de los valores relevantes de un PS antes de editarlo
+        (incluye la marca: debe tomarse antes del commit)"""
+        return _valores_contadores(ps), _claves_dimensiones(ps), self.marca()
+
+    def registrar_alta(self, ps, desde=None):
+        """Aplica un PS recién creado (llamar después del commit con la
+        marca() tomada antes de él; sin marca se invalida la caché)"""
+        self._aplicar(None, self.capturar(ps), ps.fecha_actualizacion, desde)
+
+    def registrar_cambio(self, antes, ps):
+        """Aplica la edición de un PS dada la foto previa a los cambios"""
+        self._aplicar(antes, self.capturar(ps), ps.fecha_actualizacion, antes[2])
+
+    def _aplicar(self, antes, despues, fecha, desde):
+        if not self.incremental or desde is None:
+            self.invalidar()
+            return
+
+        def previa(entrada):
+            # Calculada después de la marca: puede incluir ya la fila
+            return entrada is not None and entrada['calculado'] < desde
+
+        with self._lock:
+            if not previa(self._resumen):
+                self._resumen = None
+            for nombre, entrada in list(self._desgloses.items()):
+                if not previa(entrada):
+                    del self._desgloses[nombre]
+            if self._resumen is not None:
+                datos = self._resumen['datos']
+                if antes is None:
+                    datos['total_ps'] += 1
+                for nombre, activo in despues[0].items():
+                    previo = antes[0][nombre] if antes else False
+                    datos[nombre] += int(activo) - int(previo)
+                if fecha and (
+                    self._resumen['ultima'] is None
+                    or fecha > self._resumen['ultima']
+                ):
+                    self._resumen['ultima'] = fecha
+            for nombre, entrada in self._desgloses.items():
+                conteos = entrada['datos']
+                if antes is not None:
+                    clave = antes[1][nombre]
+                    conteos[clave] = conteos.get(clave, 0) - 1
+                    if not conteos[clave]:
+                        del conteos[clave]
+                clave = despues[1][nombre]
+                conteos[clave] = conteos.get(clave, 0) + 1
+
+
+stats_engine = StatsEngine()
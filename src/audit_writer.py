@@ -0,0 +1,223 @@
+"""
+MiloApps - Escritor asíncrono de auditoría
+Cola acotada + hilo de fondo que inserta los eventos de AuditLog por
+lotes (executemany), fuera del ciclo de la petición
+"""
+
+import atexit
+import queue
+import threading
+import time
+
+from models import db, AuditLog
+from structured_logging import get_logger
+from utils import parse_user_agent
+
+logger = get_logger("audit")
+
+
+class AuditWriter:
+    """Encola eventos de auditoría y los persiste por lotes.
+
+    Política de contrapresión cuando la cola está llena:
+    - "sync": el evento se escribe en el hilo que lo generó (sin pérdida)
+    - "block": espera hasta block_timeout segundos y luego lo descarta
+    - "drop": lo descarta de inmediato
+    """
+
+    POLICIES = ("sync", "block", "drop")
+
+    def __init__(
+        self,
+        max_queue=10000,
+        batch_size=200,
+        flush_interval=1.0,
+        policy="sync",
+        block_timeout=0.05,
+    ):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._app = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._last_batch_ms = 0.0
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+            "sync_writes": 0,
+        }
+
+    def init_app(self, app):
+        """Configura el escritor y arranca el hilo si AUDIT_ASYNC está activo"""
+        self._app = app
+        self.batch_size = app.config.get("AUDIT_BATCH_SIZE", self.batch_size)
+        self.flush_interval = app.config.get(
+            "AUDIT_FLUSH_INTERVAL", self.flush_interval
+        )
+        self.block_timeout = app.config.get(
+            "AUDIT_BLOCK_TIMEOUT", self.block_timeout
+        )
+        policy = app.config.get("AUDIT_BACKPRESSURE", self.policy)
+        if policy not in self.POLICIES:
+            raise ValueError(f"Política de auditoría no válida: {policy}")
+        self.policy = policy
+        max_queue = app.config.get("AUDIT_QUEUE_SIZE", self.max_queue)
+        if max_queue != self.max_queue:
+            self.max_queue = max_queue
+            self._queue = queue.Queue(maxsize=max_queue)
+        app.extensions["audit_writer"] = self
+
+        if app.config.get("AUDIT_ASYNC", True):
+            self.start()
+            atexit.register(self.shutdown)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="audit-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, event):
+        """Encola un evento (dict con columnas de AuditLog).
+        Sin hilo activo el evento se escribe de forma síncrona.
+        """
+        if not self.running:
+            return self._write_sync([event])
+
+        try:
+            if self.policy == "block":
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            if self.policy == "sync":
+                return self._write_sync([event])
+            self._incr("dropped")
+            return False
+
+        self._incr("enqueued")
+        return True
+
+    def flush(self):
+        """Escribe en el hilo actual todo lo que esté en cola"""
+        written = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return written
+            if self._app is not None:
+                with self._app.app_context():
+                    written += self._write_batch(batch)
+            else:
+                written += self._write_batch(batch)
+
+    def shutdown(self, timeout=5.0):
+        """Detiene el hilo y vacía la cola (hook de cierre)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        """Métricas del pipeline: profundidad de cola, escritos, descartes"""
+        with self._stats_lock:
+            data = dict(self._stats)
+        data["queue_depth"] = self._queue.qsize()
+        data["queue_max"] = self.max_queue
+        data["policy"] = self.policy
+        data["running"] = self.running
+        data["last_batch_ms"] = round(self._last_batch_ms, 2)
+        return data
+
+    # ---- internos ----
+    def _incr(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first] + self._drain(self.batch_size - 1)
+            with self._app.app_context():
+                self._write_batch(batch)
+
+    def _write_sync(self, events):
+        self._incr("sync_writes")
+        return self._write_batch(events) > 0
+
+    def _write_batch(self, events):
+        rows = [_build_row(event) for event in events]
+        started = time.perf_counter()
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(AuditLog.__table__.insert(), rows)
+        except Exception as e:
+            logger.exception(
+                "❌ Error escribiendo lote de auditoría: %s", e,
+                extra={"count": len(rows)},
+            )
+            self._incr("failed", len(rows))
+            return 0
+        self._incr("written", len(rows))
+        self._incr("batches")
+        self._last_batch_ms = (time.perf_counter() - started) * 1000
+        return len(rows)
+
+
+def _build_row(event):
+    """Convierte un evento en fila de audit_logs (parseo de UA incluido)"""
+    row = {
+        "user_id": event.get("user_id"),
+        "event_type": event["event_type"],
+        "event_description": event.get("description"),
+        "resource_type": event.get("resource_type"),
+        "resource_id": event.get("resource_id"),
+        "ip_address": event.get("ip_address"),
+        "user_agent": event.get("user_agent"),
+        "browser": None,
+        "operating_system": None,
+        "location": None,
+        "additional_data": event.get("additional_data"),
+        "success": event.get("success", True),
+        "created_at": event["created_at"],
+    }
+
+    if row["user_agent"]:
+        try:
+            ua = parse_user_agent(row["user_agent"])
+            row["browser"] = ua.browser
+            row["operating_system"] = ua.os
+        except Exception:
+            pass
+    return row
+
+
+audit_writer = AuditWriter()
@@ -38,6 +38,7 @@ from models import (
     db,
     log_audit_event,
     AuditEvents,
+    invalidate_permission_cache,
 )
 from forms import (
     LoginForm,
@@ -64,7 +65,14 @@ from email_service import (
     send_login_alert_email,
 )
 from decorators import admin_required
-from utils import get_client_info, is_suspicious_login
+from activity_tracker import activity_tracker
+from audit_writer import audit_writer
+from image_pipeline import (
+    ImageTooLarge,
+    ImageUploadError,
+    image_pipeline,
+)
+from utils import get_client_info, is_suspicious_login, user_agent_cache_stats
 
 
 def load_app_config():
@@ -192,7 +200,6 @@ def login():
             session["session_start"] = datetime.utcnow().isoformat()
 
             # Log de auditoría
-            client_info = get_client_info(request)
             log_audit_event(
                 user.id,
                 AuditEvents.LOGIN_SUCCESS,
@@ -267,6 +274,8 @@ def logout():
         current_user.id, AuditEvents.LOGOUT, "Usuario cerró sesión", request=request
     )
 
+    # La marca de actividad pendiente no debe persistirse tras el cierre
+    activity_tracker.discard(current_user.id)
     logout_user()
     flash("Has cerrado sesión exitosamente.", "info")
     return redirect(url_for("index"))
@@ -413,11 +422,14 @@ def reset_password(token):
 @auth.route("/upload-profile-picture", methods=["POST"])
 @login_required
 def upload_profile_picture():
-    """Subir foto de perfil"""
-    import os
-    import secrets
-    from werkzeug.utils import secure_filename
-    from PIL import Image
+    """Subir foto de perfil (las variantes se generan en segundo plano)"""
+    # Validar tamaño por Content-Length antes de leer el cuerpo
+    max_mb = image_pipeline.max_bytes // (1024 * 1024)
+    if (request.content_length or 0) > image_pipeline.max_bytes + 64 * 1024:
+        return (
+            jsonify({"success": False, "message": f"Archivo muy grande (max {max_mb}MB)"}),
+            413,
+        )
 
     if "profile_picture" not in request.files:
         return jsonify({"success": False, "message": "No se seleccionó archivo"})
@@ -434,41 +446,25 @@ def upload_profile_picture():
     ):
         return jsonify({"success": False, "message": "Tipo de archivo no permitido"})
 
-    # Validar tamaño (max 5MB)
-    if len(file.read()) > 5 * 1024 * 1024:
-        return jsonify({"success": False, "message": "Archivo muy grande (max 5MB)"})
-    file.seek(0)
+    try:
+        # Copia por bloques con límite de tamaño y validación de cabecera
+        key, ruta = image_pipeline.save_upload(file)
+    except ImageTooLarge:
+        return (
+            jsonify({"success": False, "message": f"Archivo muy grande (max {max_mb}MB)"}),
+            413,
+        )
+    except ImageUploadError as e:
+        return jsonify({"success": False, "message": str(e)})
 
     try:
-        # Generar nombre único
-        filename = secrets.token_hex(16) + "." + file.filename.rsplit(".", 1)[1].lower()
+        anterior = current_user.profile_picture
 
-        # Crear directorio si no existe
-        upload_dir = os.path.join(
-            current_app.root_path, "static", "uploads", "profiles"
-        )
-        os.makedirs(upload_dir, exist_ok=True)
-
-        # Guardar archivo temporal
-        filepath = os.path.join(upload_dir, filename)
-        file.save(filepath)
-
-        # Redimensionar imagen
-        with Image.open(filepath) as img:
-            img = img.convert("RGB")
-            # Redimensionar manteniendo proporción, max 300x300
-            img.thumbnail((300, 300), Image.Resampling.LANCZOS)
-            img.save(filepath, "JPEG", quality=90)
-
-        # Eliminar foto anterior si existe
-        if current_user.profile_picture:
-            old_path = os.path.join(upload_dir, current_user.profile_picture)
-            if os.path.exists(old_path):
-                os.remove(old_path)
-
-        # Actualizar usuario
-        current_user.profile_picture = filename
+        # Actualizar usuario: hasta que terminen las variantes se muestra
+        # el marcador; si fallan, el pipeline restaura la foto anterior
+        current_user.profile_picture = key
         db.session.commit()
+        image_pipeline.submit(key, ruta, anterior=anterior, user_id=current_user.id)
 
         # Log de auditoría
         log_audit_event(
@@ -482,11 +478,16 @@ def upload_profile_picture():
             {
                 "success": True,
                 "message": "Foto de perfil actualizada exitosamente",
+                "processing": not image_pipeline.is_ready(key),
                 "profile_picture_url": current_user.get_profile_picture_url(),
+                "profile_picture_final_url": image_pipeline.final_url(key),
             }
         )
 
     except Exception as e:
+        db.session.rollback()
+        if os.path.exists(ruta):
+            os.remove(ruta)
         current_app.logger.error(f"Error subiendo foto: {e}")
         return jsonify({"success": False, "message": "Error al subir la foto"})
 
@@ -809,6 +810,8 @@ def admin_assign_user_roles(user_id):
                 db.session.add(UserRole(user_id=user.id, role_id=role_id))
 
             db.session.commit()
+            # El delete masivo no dispara eventos del ORM
+            invalidate_permission_cache(user.id)
             flash("Roles adicionales actualizados.", "success")
         except Exception as e:
             db.session.rollback()
@@ -877,6 +880,8 @@ def admin_role_permissions(role_id):
                         )
 
             db.session.commit()
+            # Afecta a todos los usuarios con este rol
+            invalidate_permission_cache()
             flash("Permisos actualizados.", "success")
             return redirect(url_for("auth.admin_role_permissions", role_id=role.id))
         except Exception as e:
@@ -967,6 +972,16 @@ def admin_functionalities():
     )
 
 
+@auth.route("/admin/api/audit-queue")
+@login_required
+@admin_required
+def admin_audit_queue_stats():
+    """Métricas del escritor de auditoría (cola, lotes, descartes)"""
+    stats = audit_writer.stats()
+    stats["user_agent_cache"] = user_agent_cache_stats()
+    return jsonify(stats)
+
+
 # Rutas API para AJAX
 @auth.route("/api/check-email")
 def api_check_email():
@@ -0,0 +1,183 @@
+"""
+MiloApps - Caché de catálogos de Talent
+Payloads JSON precalculados de TalentEntidad por tipo (municipios,
+bancos, EPS, AFP, ARL...), invalidados por un contador de versión que
+se incrementa al confirmar cambios sobre la tabla talent_entidades
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from http_cache import body_etag, make_etag
+from models import db, TalentEntidad, get_entidades_por_tipo
+
+DEFAULT_CATALOG_TTL = 300  # s; acota la desactualización entre procesos
+
+# Entrada inmutable: los datos se comparten entre peticiones.
+# etag es el hash del cuerpo (igual en todos los procesos) e index
+# permite resolver el detalle de una entidad activa sin consultar
+CatalogEntry = namedtuple(
+    "CatalogEntry",
+    [
+        "tipo",
+        "version",
+        "data",
+        "body",
+        "total",
+        "etag",
+        "last_modified",
+        "index",
+        "built_at",
+    ],
+)
+
+
+class CatalogCache:
+    """Caché en proceso de catálogos serializados, indexada por tipo.
+
+    Cada tipo tiene un contador de versión; crear, editar o desactivar una
+    entidad lo incrementa al hacer commit y la siguiente lectura reconstruye
+    el payload. El TTL cubre los cambios hechos por otros procesos.
+    """
+
+    def __init__(self, ttl=DEFAULT_CATALOG_TTL):
+        self.ttl = ttl
+        self._versions = {}
+        self._entries = {}
+        self._all = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get("CATALOG_CACHE_TTL", self.ttl)
+        app.extensions["catalog_cache"] = self
+
+    def version(self, tipo):
+        return self._versions.get(tipo, 0)
+
+    def bump(self, *tipos):
+        """Incrementa la versión de los tipos y descarta sus payloads"""
+        with self._lock:
+            for tipo in tipos:
+                self._versions[tipo] = self._versions.get(tipo, 0) + 1
+                self._entries.pop(tipo, None)
+            self._all = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._all = None
+
+    def _is_fresh(self, entry, version):
+        if entry is None or entry.version != version:
+            return False
+        return not self.ttl or time.monotonic() - entry.built_at < self.ttl
+
+    def get(self, tipo):
+        """Payload de las entidades activas de un tipo (JSON en bytes)"""
+        version = self.version(tipo)
+        entry = self._entries.get(tipo)
+        if self._is_fresh(entry, version):
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        entidades = get_entidades_por_tipo(tipo, activos_solo=True)
+        data = [entidad.to_dict() for entidad in entidades]
+        body = _dumps(
+            {"success": True, "data": data, "tipo": tipo, "total": len(data)}
+        )
+        # Incluye inactivas: desactivar también cambia la fecha
+        last_modified = (
+            db.session.query(func.max(TalentEntidad.updated_at))
+            .filter(TalentEntidad.tipo_entidad == tipo)
+            .scalar()
+        )
+        entry = CatalogEntry(
+            tipo,
+            version,
+            data,
+            body,
+            len(data),
+            body_etag(body),
+            last_modified,
+            {item["id"]: item for item in data},
+            time.monotonic(),
+        )
+        with self._lock:
+            # Si hubo un commit durante la consulta, no se guarda
+            if self.version(tipo) == version:
+                self._entries[tipo] = entry
+        return entry
+
+    def get_all(self, tipos):
+        """Payload de /api/all compuesto a partir de las entradas por tipo"""
+        entries = [self.get(tipo) for tipo in tipos]
+        key = tuple((e.tipo, e.version, e.built_at) for e in entries)
+        cached = self._all
+        if cached is not None and cached.version == key:
+            return cached
+
+        data = {e.tipo: e.data for e in entries}
+        body = _dumps({"success": True, "data": data, "tipos": list(tipos)})
+        fechas = [e.last_modified for e in entries if e.last_modified]
+        entry = CatalogEntry(
+            "all",
+            key,
+            data,
+            body,
+            sum(e.total for e in entries),
+            make_etag(*(e.etag for e in entries)),
+            max(fechas) if fechas else None,
+            {},
+            time.monotonic(),
+        )
+        self._all = entry
+        return entry
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "tipos": sorted(self._entries),
+            "versions": dict(self._versions),
+        }
+
+
+def _dumps(payload):
+    return current_app.json.dumps(payload).encode("utf-8")
+
+
+catalog_cache = CatalogCache()
+
+
+# ==========================
+# INVALIDACIÓN POR COMMIT
+# ==========================
+
+@event.listens_for(Session, "after_flush")
+def _collect_catalog_changes(session, flush_context):
+    """Anota los tipos de entidad modificados en esta transacción"""
+    tipos = session.info.setdefault("catalog_tipos", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, TalentEntidad):
+            tipos.add(obj.tipo_entidad)
+            tipos.update(inspect(obj).attrs.tipo_entidad.history.deleted)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_catalog_versions(session):
+    tipos = session.info.pop("catalog_tipos", None)
+    if tipos:
+        catalog_cache.bump(*tipos)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_changes(session):
+    session.info.pop("catalog_tipos", None)
@@ -0,0 +1,136 @@
+"""
+MiloApps - Autocompletado de catálogos de Talent
+Índice de prefijos en memoria (arreglo ordenado + bisect) sobre los
+catálogos cacheados, sin acentos, por nombre, departamento y código;
+se reconstruye cuando cambia la versión del catálogo
+"""
+
+import bisect
+import heapq
+import threading
+
+from catalog_cache import catalog_cache
+from utils import search_terms
+
+DEFAULT_LIMIT = 10
+
+# Prioridad de la coincidencia (menor = más relevante)
+INICIO_NOMBRE = 0
+CODIGO = 1
+PALABRA_NOMBRE = 2
+DEPARTAMENTO = 3
+
+
+def fold(texto):
+    """Texto sin acentos, en minúsculas, solo letras/dígitos y espacios"""
+    return " ".join(search_terms(texto))
+
+
+class PrefixIndex:
+    """Claves ordenadas -> (prioridad, id); buscar es un bisect + recorrido
+    del rango de claves que empiezan con el texto.
+
+    Cada entidad aporta una clave por palabra de "nombre departamento"
+    (sufijos desde cada palabra), de modo que "bog", "bogota cund" o
+    "cundinamarca" encuentran a Bogotá, más sus códigos.
+    """
+
+    def __init__(self, entidades):
+        self.entidades = {e["id"]: e for e in entidades}
+        self._orden = {}
+        self._palabras = {}
+        pares = []
+        for entidad in entidades:
+            nombre = fold(entidad.get("nombre")).split()
+            departamento = fold(entidad.get("departamento")).split()
+            palabras = nombre + departamento
+            self._orden[entidad["id"]] = " ".join(nombre)
+            self._palabras[entidad["id"]] = palabras
+            for i in range(len(palabras)):
+                if i == 0:
+                    prioridad = INICIO_NOMBRE
+                elif i < len(nombre):
+                    prioridad = PALABRA_NOMBRE
+                else:
+                    prioridad = DEPARTAMENTO
+                pares.append((" ".join(palabras[i:]), prioridad, entidad["id"]))
+            for campo in ("codigo_dane", "codigo"):
+                codigo = fold(entidad.get(campo))
+                if codigo:
+                    pares.append((codigo, CODIGO, entidad["id"]))
+        pares.sort()
+        self._claves = [p[0] for p in pares]
+        self._valores = [(p[1], p[2]) for p in pares]
+
+    def __len__(self):
+        return len(self.entidades)
+
+    def search(self, texto, limit=DEFAULT_LIMIT):
+        """Las `limit` entidades más relevantes para `texto`.
+
+        El texto completo se busca como prefijo; si no hay coincidencias
+        contiguas, cada palabra adicional debe ser prefijo de alguna
+        palabra del nombre o departamento ("bogota cund").
+        """
+        prefijo = fold(texto)
+        if not prefijo:
+            return []
+        mejores = self._rango(prefijo)
+        if not mejores and " " in prefijo:
+            primera, *resto = prefijo.split()
+            mejores = {
+                entidad_id: prioridad
+                for entidad_id, prioridad in self._rango(primera).items()
+                if all(
+                    any(p.startswith(r) for p in self._palabras.get(entidad_id, ()))
+                    for r in resto
+                )
+            }
+        top = heapq.nsmallest(
+            limit,
+            mejores.items(),
+            key=lambda par: (par[1], self._orden[par[0]]),
+        )
+        return [self.entidades[entidad_id] for entidad_id, _ in top]
+
+    def _rango(self, prefijo):
+        """id -> mejor prioridad de las claves que empiezan con prefijo"""
+        mejores = {}
+        inicio = bisect.bisect_left(self._claves, prefijo)
+        for i in range(inicio, len(self._claves)):
+            if not self._claves[i].startswith(prefijo):
+                break
+            prioridad, entidad_id = self._valores[i]
+            if prioridad < mejores.get(entidad_id, DEPARTAMENTO + 1):
+                mejores[entidad_id] = prioridad
+        return mejores
+
+
+class CatalogSearch:
+    """Índices de prefijos por tipo, ligados a la entrada de catalog_cache
+    con la que se construyeron; si el catálogo cambia, se reconstruyen."""
+
+    def __init__(self, cache=catalog_cache):
+        self.cache = cache
+        self._indices = {}
+        self._lock = threading.Lock()
+
+    def index(self, tipo):
+        entry = self.cache.get(tipo)
+        actual = self._indices.get(tipo)
+        if actual is not None and actual[0] is entry:
+            return actual[1]
+        index = PrefixIndex(entry.data)
+        with self._lock:
+            self._indices[tipo] = (entry, index)
+        return index
+
+    def search(self, tipo, texto, limit=DEFAULT_LIMIT):
+        return self.index(tipo).search(texto, limit)
+
+    def clear(self):
+        with self._lock:
+            self._indices.clear()
+
+
+catalog_search = CatalogSearch()
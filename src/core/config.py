@@ -2,6 +2,8 @@
 import os
 from datetime import timedelta
 
+from database import build_engine_options, get_database_uri
+
 
 class Config:
     """Configuración base para todas las aplicaciones de MiloApps"""
@@ -9,10 +11,9 @@ class Config:
     # Configuración básica de Flask
     SECRET_KEY = os.environ.get("SECRET_KEY") or "miloapps-secret-key-2024"
 
-    # Base de datos central
-    SQLALCHEMY_DATABASE_URI = (
-        os.environ.get("DATABASE_URL") or "sqlite:///data/miloapps.db"
-    )
+    # Base de datos central (DATABASE_URL o SQLite local) y pool del motor
+    SQLALCHEMY_DATABASE_URI = get_database_uri()
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     # Configuración de email (compartida)
@@ -107,6 +108,7 @@ class TestingConfig(Config):
 
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_ENGINE_OPTIONS = {}
     WTF_CSRF_ENABLED = False
 
 
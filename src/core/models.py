@@ -51,7 +51,12 @@ class User(UserMixin, db.Model):
 
     # Relaciones con aplicaciones
     audit_logs = db.relationship("AuditLog", backref="user_ref", lazy=True)
-    user_apps = db.relationship("UserAppPermission", backref="user_ref", lazy=True)
+    user_apps = db.relationship(
+        "UserAppPermission",
+        backref="user_ref",
+        lazy=True,
+        foreign_keys="UserAppPermission.user_id",
+    )
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
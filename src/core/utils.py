@@ -4,7 +4,7 @@ from functools import wraps
 from .models import AuditLog, UserAppPermission, db
 import json
 from datetime import datetime
-from user_agents import parse
+from utils import parse_user_agent
 
 
 def log_audit(
@@ -111,7 +111,7 @@ def get_user_info():
         return None
 
     user_agent = request.headers.get("User-Agent", "")
-    parsed_ua = parse(user_agent)
+    parsed_ua = parse_user_agent(user_agent)
 
     return {
         "id": current_user.id,
@@ -123,9 +123,9 @@ def get_user_info():
             current_user.last_login.isoformat() if current_user.last_login else None
         ),
         "browser_info": {
-            "browser": f"{parsed_ua.browser.family} {parsed_ua.browser.version_string}",
-            "os": f"{parsed_ua.os.family} {parsed_ua.os.version_string}",
-            "device": parsed_ua.device.family,
+            "browser": parsed_ua.browser,
+            "os": parsed_ua.os,
+            "device": parsed_ua.device,
             "is_mobile": parsed_ua.is_mobile,
             "is_tablet": parsed_ua.is_tablet,
             "is_pc": parsed_ua.is_pc,
@@ -0,0 +1,253 @@
+"""
+MiloApps - Perfil del motor de base de datos
+URI y opciones de pool (DATABASE_URL / DB_POOL_*), motor compartido para
+scripts fuera de Flask, PRAGMAs de SQLite aplicados en cada conexión
+(WAL, busy_timeout, mmap, caché...), migraciones ligeras independientes
+del dialecto y tarea periódica de mantenimiento (wal_checkpoint/optimize)
+"""
+
+import os
+import threading
+
+import sqlalchemy as sa
+from sqlalchemy import event
+
+from structured_logging import get_logger
+
+logger = get_logger("database")
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_DATABASE_PATH = os.path.join(PROJECT_ROOT, "data", "miloapps.db")
+
+# Pool para motores servidor (PostgreSQL, MySQL...) y SQLite en archivo;
+# cada valor puede sobrescribirse con DB_POOL_SIZE, DB_MAX_OVERFLOW, ...
+DEFAULT_POOL_OPTIONS = {
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_timeout": 30,  # s
+    "pool_recycle": 1800,  # s
+    "pool_pre_ping": True,
+}
+
+_POOL_ENV = {
+    "pool_size": "DB_POOL_SIZE",
+    "max_overflow": "DB_MAX_OVERFLOW",
+    "pool_timeout": "DB_POOL_TIMEOUT",
+    "pool_recycle": "DB_POOL_RECYCLE",
+    "pool_pre_ping": "DB_POOL_PRE_PING",
+}
+
+# Perfil de producción por defecto; cada entorno puede sobrescribirlo
+# desde config/<entorno>.json -> database.sqlite_pragmas
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,  # ms
+    "mmap_size": 268435456,  # 256 MB
+    "cache_size": -65536,  # negativo = KiB (64 MB)
+    "temp_store": "MEMORY",
+    "foreign_keys": True,
+}
+
+DEFAULT_MAINTENANCE_MINUTES = 60
+
+# journal_mode va primero: no puede cambiarse dentro de una transacción
+_PRAGMA_ORDER = ("journal_mode", "busy_timeout")
+
+
+def get_database_uri(default_path=DEFAULT_DATABASE_PATH):
+    """URI de la base de datos: DATABASE_URL o el SQLite local del proyecto"""
+    uri = os.environ.get("DATABASE_URL")
+    if uri:
+        # Heroku y otros proveedores aún entregan el esquema postgres://
+        if uri.startswith("postgres://"):
+            uri = "postgresql://" + uri[len("postgres://"):]
+        return uri
+    os.makedirs(os.path.dirname(default_path), exist_ok=True)
+    return f"sqlite:///{default_path}"
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == "sqlite" and url.database in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def _env_value(name, default):
+    raw = os.environ.get(name)
+    if raw is None or raw == "":
+        return default
+    if isinstance(default, bool):
+        return raw.lower() in ("true", "on", "1", "yes")
+    return int(raw)
+
+
+def build_engine_options(uri, settings=None):
+    """Opciones del motor (pool) para SQLALCHEMY_ENGINE_OPTIONS.
+
+    Orden de precedencia: valores por defecto < config/<entorno>.json
+    (database.pool) < variables de entorno DB_POOL_*. SQLite en memoria
+    usa StaticPool, por lo que no recibe opciones de tamaño de pool.
+    """
+    if _is_memory_sqlite(sa.engine.make_url(uri)):
+        return {}
+
+    options = dict(DEFAULT_POOL_OPTIONS)
+    options.update((settings or {}).get("pool", {}))
+    for key, env_name in _POOL_ENV.items():
+        options[key] = _env_value(env_name, options.get(key))
+    return {k: v for k, v in options.items() if v is not None}
+
+
+def _pragma_value(value):
+    if isinstance(value, bool):
+        return "ON" if value else "OFF"
+    return str(value)
+
+
+def build_pragma_statements(pragmas):
+    """Genera las sentencias PRAGMA en orden seguro"""
+    keys = [k for k in _PRAGMA_ORDER if k in pragmas]
+    keys += [k for k in pragmas if k not in _PRAGMA_ORDER]
+    return [f"PRAGMA {key}={_pragma_value(pragmas[key])}" for key in keys]
+
+
+def get_sqlite_pragmas(settings):
+    """Combina el perfil por defecto con la sección database del entorno"""
+    pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+    pragmas.update((settings or {}).get("sqlite_pragmas", {}))
+    return {k: v for k, v in pragmas.items() if v is not None}
+
+
+def apply_sqlite_profile(engine, pragmas):
+    """Registra los PRAGMAs en cada conexión nueva del motor SQLite"""
+    statements = build_pragma_statements(pragmas)
+
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    # Conexiones abiertas antes del listener (pool) se descartan
+    engine.dispose()
+
+
+def configure_engine(app, engine):
+    """Aplica el perfil del motor según el dialecto y la configuración"""
+    if engine.dialect.name != "sqlite":
+        return
+
+    apply_sqlite_profile(
+        engine, app.config.get("SQLITE_PRAGMAS", DEFAULT_SQLITE_PRAGMAS)
+    )
+
+    minutes = app.config.get(
+        "SQLITE_MAINTENANCE_MINUTES", DEFAULT_MAINTENANCE_MINUTES
+    )
+    if minutes:
+        maintenance = SQLiteMaintenance(engine, minutes * 60)
+        maintenance.start()
+        app.extensions["sqlite_maintenance"] = maintenance
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(uri=None):
+    """Motor compartido para scripts y utilidades fuera de Flask.
+
+    Reutiliza la misma URI, opciones de pool y perfil SQLite que la
+    aplicación; se crea una sola vez por URI dentro del proceso.
+    """
+    uri = uri or get_database_uri()
+    with _engines_lock:
+        engine = _engines.get(uri)
+        if engine is None:
+            engine = sa.create_engine(uri, **build_engine_options(uri))
+            if engine.dialect.name == "sqlite":
+                apply_sqlite_profile(engine, DEFAULT_SQLITE_PRAGMAS)
+            _engines[uri] = engine
+        return engine
+
+
+def add_column_if_missing(connection, table_name, column_name, ddl):
+    """Migración ligera: ALTER TABLE ... ADD COLUMN si la columna no existe.
+
+    Usa el inspector de SQLAlchemy en lugar de PRAGMA table_info para
+    funcionar igual en SQLite, PostgreSQL o MySQL. Retorna True si se
+    agregó la columna.
+    """
+    inspector = sa.inspect(connection)
+    if not inspector.has_table(table_name):
+        return False
+    columns = {col["name"] for col in inspector.get_columns(table_name)}
+    if column_name in columns:
+        return False
+    connection.execute(
+        sa.text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}")
+    )
+    return True
+
+
+def ensure_indexes(engine, metadata):
+    """Crea los índices declarados en los modelos que aún no existan.
+
+    create_all no agrega índices a tablas ya creadas; esto cubre las
+    bases existentes sin depender de CREATE INDEX IF NOT EXISTS.
+    """
+    inspector = sa.inspect(engine)
+    creados = []
+    for table in metadata.sorted_tables:
+        if not table.indexes or not inspector.has_table(table.name):
+            continue
+        existentes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existentes:
+                index.create(engine)
+                creados.append(index.name)
+    return creados
+
+
+def sql_false(dialect):
+    """Literal booleano falso en la sintaxis del dialecto (0 / false)"""
+    return str(sa.false().compile(dialect=dialect))
+
+
+class SQLiteMaintenance:
+    """Hilo de fondo: checkpoint del WAL y PRAGMA optimize periódicos"""
+
+    def __init__(self, engine, interval_seconds):
+        self.engine = engine
+        self.interval = interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="sqlite-maintenance", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        """Trunca el WAL y actualiza estadísticas del planificador"""
+        with self.engine.connect() as conn:
+            driver = conn.connection.driver_connection
+            driver.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            driver.execute("PRAGMA optimize")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("⚠️ Error en mantenimiento SQLite: %s", e)
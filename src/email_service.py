@@ -3,20 +3,26 @@ MiloApps - Servicio de Email
 Configuración y funciones para envío de emails con Gmail SMTP
 """
 
-from flask import current_app, render_template, url_for
+from flask import current_app, url_for
 from flask_mail import Mail, Message
 import os
 from datetime import datetime
 
+from email_templates import email_templates
+from mail_queue import mail_queue
+from structured_logging import get_logger
+
+logger = get_logger("email")
 mail = Mail()
 
 
 def init_mail(app):
     """Inicializa el servicio de email"""
-    # Configuración Gmail SMTP
-    app.config["MAIL_SERVER"] = "smtp.gmail.com"
-    app.config["MAIL_PORT"] = 587
-    app.config["MAIL_USE_TLS"] = True
+    # Configuración Gmail SMTP (MAIL_SERVER/MAIL_PORT permiten apuntar a un
+    # servidor SMTP local de pruebas)
+    app.config["MAIL_SERVER"] = os.environ.get("MAIL_SERVER", "smtp.gmail.com")
+    app.config["MAIL_PORT"] = int(os.environ.get("MAIL_PORT", 587))
+    app.config["MAIL_USE_TLS"] = os.environ.get("MAIL_USE_TLS", "true").lower() == "true"
     app.config["MAIL_USE_SSL"] = False
 
     # Configuración desde variables de entorno
@@ -30,15 +36,32 @@ def init_mail(app):
         "INFOMILO_ADMIN", app.config["MAIL_USERNAME"]
     )
 
+    # Cola de envío: los emails se guardan en email_outbox y un hilo los
+    # envía por lotes sobre una sola conexión SMTP
+    app.config.setdefault(
+        "MAIL_QUEUE_ENABLED",
+        os.environ.get("MAIL_QUEUE_ENABLED", "true").lower() == "true",
+    )
+
     mail.init_app(app)
+    mail_queue.init_app(app, mail)
+    email_templates.init_app(app)
 
     # Verificar configuración
     if not app.config["MAIL_USERNAME"]:
-        print("⚠️  GMAIL_USERNAME no configurado en variables de entorno")
+        logger.warning("⚠️  GMAIL_USERNAME no configurado en variables de entorno")
     if not app.config["MAIL_PASSWORD"]:
-        print("⚠️  GMAIL_PASSWORD no configurado en variables de entorno")
+        logger.warning("⚠️  GMAIL_PASSWORD no configurado en variables de entorno")
     else:
-        print("✅ Servicio de email configurado con Gmail SMTP")
+        logger.info("✅ Servicio de email configurado con Gmail SMTP")
+
+
+def deliver(msg, template=None):
+    """Encola el mensaje si la cola está activa; si no, lo envía ya"""
+    if mail_queue.enabled:
+        mail_queue.enqueue(msg, template=template)
+    else:
+        mail.send(msg)
 
 
 def send_email(to, subject, template, **kwargs):
@@ -60,29 +83,65 @@ def send_email(to, subject, template, **kwargs):
             recipients=[to],
         )
 
-        # Renderizar plantilla HTML
-        msg.html = render_template(f"MiloMail/{template}.html", **kwargs)
-
-        # Renderizar plantilla de texto plano (opcional)
-        try:
-            msg.body = render_template(f"MiloMail/{template}.txt", **kwargs)
-        except Exception:
-            # Si no existe plantilla .txt, crear versión básica
-            msg.body = f"InfoMilo - {subject}\n\n"
-            msg.body += (
-                "Este es un email de InfoMilo. Por favor, usa un cliente de "
-                "email que soporte HTML para ver el contenido completo.\n\n"
-            )
-            msg.body += "Si tienes problemas, contacta con el administrador."
+        # Plantillas HTML y de texto (.txt opcional) desde la caché
+        msg.html, msg.body = email_templates.render(template, subject, **kwargs)
 
-        mail.send(msg)
+        deliver(msg, template=template)
         return True
 
     except Exception as e:
-        print(f"❌ Error enviando email a {to}: {e}")
+        logger.error("❌ Error enviando email: %s", e, extra={"email": to, "template": template})
         return False
 
 
+def send_bulk_email(recipients, subject, template, **kwargs):
+    """
+    Envía la misma plantilla a muchos destinatarios en una sola pasada
+
+    Args:
+        recipients: Lista de (email, variables propias del destinatario)
+        subject: Asunto del email
+        template: Nombre de la plantilla HTML (sin extensión)
+        **kwargs: Variables comunes a todos los destinatarios
+
+    Returns:
+        Número de emails enviados o encolados
+    """
+    if not recipients:
+        return 0
+    try:
+        app = current_app._get_current_object()
+
+        rendered = email_templates.render_many(
+            template, subject, [context for _, context in recipients], **kwargs
+        )
+        messages = [
+            Message(
+                subject=app.config["MAIL_SUBJECT_PREFIX"] + subject,
+                sender=app.config["MAIL_DEFAULT_SENDER"],
+                recipients=[to],
+                html=html,
+                body=body,
+            )
+            for (to, _), (html, body) in zip(recipients, rendered)
+        ]
+
+        if mail_queue.enabled:
+            mail_queue.enqueue_many(messages, template=template)
+        else:
+            with mail.connect() as conn:
+                for msg in messages:
+                    conn.send(msg)
+        return len(messages)
+
+    except Exception as e:
+        logger.error(
+            "❌ Error enviando emails masivos: %s", e,
+            extra={"count": len(recipients), "template": template},
+        )
+        return 0
+
+
 def send_password_reset_email(user):
     """Envía email de recuperación de contraseña"""
     token = user.generate_reset_token()
@@ -183,7 +242,7 @@ def send_admin_notification_email(subject, message, details=None):
     admin_email = current_app.config["INFOMILO_ADMIN"]
 
     if not admin_email:
-        print("⚠️  No hay email de administrador configurado")
+        logger.warning("⚠️  No hay email de administrador configurado")
         return False
 
     return send_email(
@@ -247,7 +306,7 @@ def email_required(func):
 
     def wrapper(*args, **kwargs):
         if not current_app.config.get("MAIL_USERNAME"):
-            print("⚠️  Email no configurado - función omitida")
+            logger.warning("⚠️  Email no configurado - función omitida", extra={"function": func.__name__})
             return False
         return func(*args, **kwargs)
 
@@ -309,9 +368,9 @@ def send_simple_email(to, subject, body):
             body=body,
         )
 
-        mail.send(msg)
+        deliver(msg)
         return True
 
     except Exception as e:
-        print(f"❌ Error enviando email simple a {to}: {e}")
+        logger.error("❌ Error enviando email simple: %s", e, extra={"email": to})
         return False
@@ -0,0 +1,97 @@
+"""
+MiloApps - Renderizado de plantillas de email
+Resuelve al arranque qué plantillas MiloMail existen (.html y .txt),
+guarda el par compilado por plantilla y permite renderizar muchos
+destinatarios de una vez para notificaciones masivas
+"""
+
+from flask import current_app
+
+from structured_logging import get_logger
+
+logger = get_logger("email.templates")
+
+TEMPLATE_DIR = "MiloMail"
+
+FALLBACK_BODY = (
+    "InfoMilo - {subject}\n\n"
+    "Este es un email de InfoMilo. Por favor, usa un cliente de "
+    "email que soporte HTML para ver el contenido completo.\n\n"
+    "Si tienes problemas, contacta con el administrador."
+)
+
+
+class EmailTemplates:
+    """Caché de plantillas MiloMail compiladas.
+
+    Al arrancar se listan las plantillas disponibles una sola vez, de modo
+    que una plantilla .txt ausente no cuesta un TemplateNotFound por email.
+    Con TEMPLATES_AUTO_RELOAD las plantillas modificadas se recompilan.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._disponibles = set()
+        self._compiladas = {}
+
+    def init_app(self, app):
+        self._app = app
+        app.extensions["email_templates"] = self
+        self.scan()
+
+    def scan(self):
+        """Lista las plantillas MiloMail del loader de Jinja"""
+        prefijo = TEMPLATE_DIR + "/"
+        self._disponibles = {
+            nombre
+            for nombre in self._app.jinja_env.list_templates(extensions=("html", "txt"))
+            if nombre.startswith(prefijo)
+        }
+        self._compiladas.clear()
+        logger.info(
+            "✅ Plantillas de email disponibles", extra={"count": len(self._disponibles)}
+        )
+
+    def has(self, template, extension="html"):
+        return f"{TEMPLATE_DIR}/{template}.{extension}" in self._disponibles
+
+    def _compilada(self, nombre):
+        if nombre not in self._disponibles:
+            return None
+        env = self._app.jinja_env
+        plantilla = self._compiladas.get(nombre)
+        if plantilla is None or (env.auto_reload and not plantilla.is_up_to_date):
+            plantilla = env.get_template(nombre)
+            self._compiladas[nombre] = plantilla
+        return plantilla
+
+    def pair(self, template):
+        """(html, txt) compilados; txt es None si no hay plantilla de texto"""
+        html = self._compilada(f"{TEMPLATE_DIR}/{template}.html")
+        if html is None:
+            raise LookupError(f"Plantilla de email no encontrada: {template}")
+        return html, self._compilada(f"{TEMPLATE_DIR}/{template}.txt")
+
+    def render(self, template, subject, **context):
+        """Renderiza (html, body) para un destinatario"""
+        return self.render_many(template, subject, [context])[0]
+
+    def render_many(self, template, subject, contexts, **common):
+        """Renderiza (html, body) para cada contexto en una sola pasada.
+
+        Las plantillas y el contexto de Flask (context processors) se
+        resuelven una vez; `common` se comparte y cada contexto lo completa.
+        """
+        html, txt = self.pair(template)
+        base = dict(common)
+        current_app.update_template_context(base)
+        fallback = FALLBACK_BODY.format(subject=subject)
+        resultado = []
+        for context in contexts:
+            variables = {**base, **context}
+            body = txt.render(variables) if txt is not None else fallback
+            resultado.append((html.render(variables), body))
+        return resultado
+
+
+email_templates = EmailTemplates()
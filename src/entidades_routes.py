@@ -3,11 +3,14 @@ Rutas para gestión de entidades administrativas genéricas
 Sistema CRUD completo para todas las entidades de Talent
 """
 
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
 import json
 from datetime import datetime
 from models import db, TalentEntidad, get_entidades_por_tipo
+from catalog_cache import catalog_cache
+from catalog_search import DEFAULT_LIMIT, catalog_search
+from http_cache import conditional_response, make_etag
 
 # Blueprint para entidades
 entidades_bp = Blueprint('entidades', __name__, url_prefix='/admin/entidades')
@@ -279,6 +282,10 @@ def eliminar_entidad(tipo, entidad_id):
 # APIs PÚBLICAS PARA EL FRONT
 # ===========================
 
+def _json_response(body):
+    """Respuesta JSON a partir de bytes ya serializados"""
+    return current_app.response_class(body, mimetype='application/json')
+
 @entidades_bp.route('/api/<tipo>')
 def api_entidades(tipo):
     """API pública para obtener entidades por tipo"""
@@ -286,53 +293,58 @@ def api_entidades(tipo):
         return jsonify({'error': 'Tipo de entidad no válido'}), 400
     
     try:
-        entidades = get_entidades_por_tipo(tipo, activos_solo=True)
-        
-        return jsonify({
-            'success': True,
-            'data': [entidad.to_dict() for entidad in entidades],
-            'tipo': tipo,
-            'total': len(entidades)
-        })
+        # Payload precalculado; se reconstruye solo si cambió el catálogo
+        entry = catalog_cache.get(tipo)
+        return conditional_response(
+            entry.etag, entry.last_modified, 'catalogos',
+            lambda: _json_response(entry.body)
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@entidades_bp.route('/api/<tipo>/buscar')
+def api_buscar_entidades(tipo):
+    """Autocompletado por prefijo (sin acentos) sobre nombre, departamento
+    y códigos: ?q=texto&limit=N (máximo 50)"""
+    if tipo not in TIPOS_ENTIDAD:
+        return jsonify({'error': 'Tipo de entidad no válido'}), 400
+
+    limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), 50))
+    data = catalog_search.search(tipo, request.args.get('q', ''), limit)
+    return jsonify({'success': True, 'data': data, 'tipo': tipo, 'total': len(data)})
+
 @entidades_bp.route('/api/<tipo>/<int:entidad_id>')
 def api_entidad_detalle(tipo, entidad_id):
     """API para obtener detalle de una entidad específica"""
     if tipo not in TIPOS_ENTIDAD:
         return jsonify({'error': 'Tipo de entidad no válido'}), 400
     
-    entidad = TalentEntidad.query.filter_by(
-        id=entidad_id, 
-        tipo_entidad=tipo, 
-        activo=True
-    ).first()
+    # Las entidades activas ya están en el catálogo cacheado
+    entidad = catalog_cache.get(tipo).index.get(entidad_id)
     
     if not entidad:
         return jsonify({'error': 'Entidad no encontrada'}), 404
     
-    return jsonify({
-        'success': True,
-        'data': entidad.to_dict()
-    })
+    etag = make_etag(tipo, entidad['id'], entidad['updated_at'])
+    last_modified = (
+        datetime.fromisoformat(entidad['updated_at'])
+        if entidad['updated_at'] else None
+    )
+    return conditional_response(
+        etag, last_modified, 'entidad',
+        lambda: jsonify({'success': True, 'data': entidad})
+    )
 
 @entidades_bp.route('/api/all')
 def api_todas_entidades():
     """API para obtener todas las entidades agrupadas por tipo"""
     try:
-        resultado = {}
-        
-        for tipo in TIPOS_ENTIDAD.keys():
-            entidades = get_entidades_por_tipo(tipo, activos_solo=True)
-            resultado[tipo] = [entidad.to_dict() for entidad in entidades]
-        
-        return jsonify({
-            'success': True,
-            'data': resultado,
-            'tipos': list(TIPOS_ENTIDAD.keys())
-        })
+        entry = catalog_cache.get_all(list(TIPOS_ENTIDAD.keys()))
+        return conditional_response(
+            entry.etag, entry.last_modified, 'catalogos',
+            lambda: _json_response(entry.body)
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
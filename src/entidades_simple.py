@@ -3,16 +3,42 @@ Rutas simplificadas para entidades - versión de emergencia
 """
 
 from flask import Blueprint, jsonify
-import sqlite3
-import os
+from models import db
 
 # Blueprint simple para entidades
 entidades_simple_bp = Blueprint('entidades_simple', __name__, url_prefix='/admin/entidades')
 
+ENTIDADES_SQL = db.text("""
+    SELECT id, codigo, nombre, descripcion, departamento, codigo_dane,
+           nit, telefono, email, direccion, es_obligatorio, permite_otros, 
+           orden, activo
+    FROM talent_entidades 
+    WHERE tipo_entidad = :tipo AND activo = :activo 
+    ORDER BY orden, nombre
+""")
+
 def get_db_connection():
-    """Obtener conexión a la base de datos"""
-    db_path = os.path.join('data', 'miloapps.db')
-    return sqlite3.connect(db_path)
+    """Obtener conexión del motor compartido (mismo pool que el ORM)"""
+    return db.session.connection()
+
+def _entidad_dict(row):
+    """Convierte una fila de talent_entidades en diccionario"""
+    return {
+        'id': row.id,
+        'codigo': row.codigo,
+        'nombre': row.nombre,
+        'descripcion': row.descripcion,
+        'departamento': row.departamento,
+        'codigo_dane': row.codigo_dane,
+        'nit': row.nit,
+        'telefono': row.telefono,
+        'email': row.email,
+        'direccion': row.direccion,
+        'es_obligatorio': bool(row.es_obligatorio),
+        'permite_otros': bool(row.permite_otros),
+        'orden': row.orden,
+        'activo': bool(row.activo)
+    }
 
 @entidades_simple_bp.route('/api/<tipo>')
 def api_entidades_simple(tipo):
@@ -28,39 +54,8 @@ def api_entidades_simple(tipo):
     
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, codigo, nombre, descripcion, departamento, codigo_dane,
-                   nit, telefono, email, direccion, es_obligatorio, permite_otros, 
-                   orden, activo
-            FROM talent_entidades 
-            WHERE tipo_entidad = ? AND activo = 1 
-            ORDER BY orden, nombre
-        """, (tipo,))
-        
-        resultados = cursor.fetchall()
-        
-        entidades = []
-        for resultado in resultados:
-            entidades.append({
-                'id': resultado[0],
-                'codigo': resultado[1],
-                'nombre': resultado[2],
-                'descripcion': resultado[3],
-                'departamento': resultado[4],
-                'codigo_dane': resultado[5],
-                'nit': resultado[6],
-                'telefono': resultado[7],
-                'email': resultado[8],
-                'direccion': resultado[9],
-                'es_obligatorio': bool(resultado[10]),
-                'permite_otros': bool(resultado[11]),
-                'orden': resultado[12],
-                'activo': bool(resultado[13])
-            })
-        
-        conn.close()
+        resultados = conn.execute(ENTIDADES_SQL, {'tipo': tipo, 'activo': True})
+        entidades = [_entidad_dict(row) for row in resultados]
         
         return jsonify({
             'success': True,
@@ -83,42 +78,12 @@ def api_todas_entidades_simple():
     
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         resultado = {}
         
         for tipo in tipos:
-            cursor.execute("""
-                SELECT id, codigo, nombre, descripcion, departamento, codigo_dane,
-                       nit, telefono, email, direccion, es_obligatorio, permite_otros, 
-                       orden, activo
-                FROM talent_entidades 
-                WHERE tipo_entidad = ? AND activo = 1 
-                ORDER BY orden, nombre
-            """, (tipo,))
-            
-            entidades = []
-            for row in cursor.fetchall():
-                entidades.append({
-                    'id': row[0],
-                    'codigo': row[1],
-                    'nombre': row[2],
-                    'descripcion': row[3],
-                    'departamento': row[4],
-                    'codigo_dane': row[5],
-                    'nit': row[6],
-                    'telefono': row[7],
-                    'email': row[8],
-                    'direccion': row[9],
-                    'es_obligatorio': bool(row[10]),
-                    'permite_otros': bool(row[11]),
-                    'orden': row[12],
-                    'activo': bool(row[13])
-                })
-            
-            resultado[tipo] = entidades
-        
-        conn.close()
+            filas = conn.execute(ENTIDADES_SQL, {'tipo': tipo, 'activo': True})
+            resultado[tipo] = [_entidad_dict(row) for row in filas]
         
         return jsonify({
             'success': True,
@@ -134,21 +99,18 @@ def test_entidades():
     """Endpoint de prueba para verificar que el blueprint funciona"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("SELECT COUNT(*) FROM talent_entidades WHERE activo = 1")
-        total = cursor.fetchone()[0]
+        total = conn.execute(
+            db.text("SELECT COUNT(*) FROM talent_entidades WHERE activo = :activo"),
+            {'activo': True}
+        ).scalar()
         
-        cursor.execute("""
+        por_tipo = dict(conn.execute(db.text("""
             SELECT tipo_entidad, COUNT(*) 
             FROM talent_entidades 
-            WHERE activo = 1 
+            WHERE activo = :activo 
             GROUP BY tipo_entidad
-        """)
-        
-        por_tipo = dict(cursor.fetchall())
-        
-        conn.close()
+        """), {'activo': True}).all())
         
         return jsonify({
             'success': True,
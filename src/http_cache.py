@@ -0,0 +1,71 @@
+"""
+MiloApps - Caché HTTP condicional
+ETag fuerte, Last-Modified y respuestas 304 Not Modified para las APIs
+de solo lectura, con política Cache-Control configurable por endpoint
+(HTTP_CACHE_CONTROL)
+"""
+
+import hashlib
+from datetime import timezone
+
+from flask import current_app, request
+
+# Política por defecto de cada grupo de endpoints; se puede sobrescribir
+# con app.config["HTTP_CACHE_CONTROL"] = {"catalogos": "...", ...}
+DEFAULT_CACHE_CONTROL = {
+    "catalogos": "public, max-age=60, must-revalidate",
+    "entidad": "public, max-age=60, must-revalidate",
+    "stats": "private, no-cache",
+}
+
+
+def make_etag(*parts):
+    """ETag fuerte a partir de valores que identifican la versión"""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def body_etag(body):
+    """ETag fuerte a partir del contenido ya serializado"""
+    return hashlib.sha1(body).hexdigest()
+
+
+def cache_control_for(policy):
+    policies = current_app.config.get("HTTP_CACHE_CONTROL", {})
+    return policies.get(policy, DEFAULT_CACHE_CONTROL.get(policy, "no-cache"))
+
+
+def _as_http_date(value):
+    # HTTP solo tiene precisión de segundos; las fechas del ORM son UTC naive
+    value = value.replace(microsecond=0)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def is_not_modified(etag, last_modified=None):
+    """Evalúa If-None-Match (prioritario) o If-Modified-Since"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since:
+        return _as_http_date(last_modified) <= request.if_modified_since
+    return False
+
+
+def conditional_response(etag, last_modified, policy, build):
+    """Retorna 304 si el cliente ya tiene la versión; si no, build().
+
+    build solo se invoca cuando hay que enviar el cuerpo, de modo que el
+    trabajo costoso (consultas, serialización) se omite en el 304.
+    """
+    if request.method in ("GET", "HEAD") and is_not_modified(
+        etag, last_modified
+    ):
+        response = current_app.response_class(status=304)
+    else:
+        response = build()
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _as_http_date(last_modified)
+    response.headers["Cache-Control"] = cache_control_for(policy)
+    return response
@@ -0,0 +1,229 @@
+"""
+MiloApps - Procesamiento de fotos de perfil
+La subida se copia por bloques con límite de tamaño (sin leerla entera en
+memoria) y un pool de hilos genera las variantes (48/96/300 px en JPEG y
+WebP). Mientras se procesan, la URL de la foto apunta a un marcador
+"""
+
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from PIL import Image, UnidentifiedImageError
+
+from structured_logging import get_logger
+
+logger = get_logger("images")
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_SIZES = (48, 96, 300)
+FORMATOS = {"JPEG", "PNG", "GIF", "WEBP"}
+SALIDAS = (("jpg", "JPEG", {"quality": 90, "optimize": True}), ("webp", "WEBP", {"quality": 85}))
+CHUNK_SIZE = 64 * 1024
+
+URL_BASE = "/static/uploads/profiles"
+PLACEHOLDER_URL = "/static/img/profile-placeholder.svg"
+
+
+class ImageUploadError(ValueError):
+    """Archivo rechazado (tamaño o formato)"""
+
+
+class ImageTooLarge(ImageUploadError):
+    pass
+
+
+def is_legacy(nombre):
+    """Fotos anteriores al pipeline: un único archivo con extensión"""
+    return "." in nombre
+
+
+def variant_name(key, size, ext="jpg"):
+    return f"{key}_{size}.{ext}"
+
+
+def profile_picture_url(nombre, size=300, ext="jpg"):
+    """URL de la variante pedida, o del marcador si aún se procesa"""
+    if not nombre:
+        return None
+    if is_legacy(nombre):
+        return f"{URL_BASE}/{nombre}"
+    if not image_pipeline.is_ready(nombre):
+        return PLACEHOLDER_URL
+    return f"{URL_BASE}/{variant_name(nombre, size, ext)}"
+
+
+class ImagePipeline:
+    """Pool de procesamiento de fotos de perfil.
+
+    - PROFILE_PICTURE_MAX_BYTES: tamaño máximo de la subida
+    - PROFILE_PICTURE_SIZES: lados (px) de las variantes generadas
+    - IMAGE_WORKERS: imágenes procesadas en paralelo (Pillow libera el
+      GIL al decodificar y redimensionar)
+    """
+
+    def __init__(self):
+        self.upload_dir = None
+        self.max_bytes = DEFAULT_MAX_BYTES
+        self.sizes = DEFAULT_SIZES
+        self._app = None
+        self._executor = None
+        self._pendientes = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        self.upload_dir = app.config.get("PROFILE_PICTURE_DIR") or os.path.join(
+            app.root_path, "static", "uploads", "profiles"
+        )
+        self.max_bytes = app.config.get("PROFILE_PICTURE_MAX_BYTES", self.max_bytes)
+        self.sizes = tuple(sorted(app.config.get("PROFILE_PICTURE_SIZES", self.sizes)))
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get("IMAGE_WORKERS", 2),
+            thread_name_prefix="image-pipeline",
+        )
+        os.makedirs(self.upload_dir, exist_ok=True)
+        app.extensions["image_pipeline"] = self
+
+    def _dir(self):
+        if self.upload_dir is None:
+            return os.path.join(current_app.root_path, "static", "uploads", "profiles")
+        return self.upload_dir
+
+    def final_variant(self, key):
+        """La variante más grande se escribe al final: marca que terminó"""
+        return variant_name(key, max(self.sizes))
+
+    def final_url(self, key):
+        return f"{URL_BASE}/{self.final_variant(key)}"
+
+    def is_ready(self, key):
+        return os.path.exists(os.path.join(self._dir(), self.final_variant(key)))
+
+    # ---- Recepción ----
+
+    def save_upload(self, file):
+        """Copia la subida por bloques a un archivo temporal y valida la
+        cabecera de la imagen; retorna (key, ruta)"""
+        if self._executor is None:
+            raise ImageUploadError("El procesamiento de imágenes no está inicializado")
+        key = secrets.token_hex(16)
+        ruta = os.path.join(self.upload_dir, f"{key}.upload")
+        total = 0
+        try:
+            with open(ruta, "wb") as destino:
+                while True:
+                    bloque = file.stream.read(CHUNK_SIZE)
+                    if not bloque:
+                        break
+                    total += len(bloque)
+                    if total > self.max_bytes:
+                        raise ImageTooLarge("Archivo muy grande")
+                    destino.write(bloque)
+            # Image.open solo lee la cabecera
+            with Image.open(ruta) as img:
+                if img.format not in FORMATOS:
+                    raise ImageUploadError("Tipo de archivo no permitido")
+        except UnidentifiedImageError:
+            os.remove(ruta)
+            raise ImageUploadError("El archivo no es una imagen válida")
+        except Exception:
+            if os.path.exists(ruta):
+                os.remove(ruta)
+            raise
+        return key, ruta
+
+    def submit(self, key, ruta, anterior=None, user_id=None):
+        """Encola la generación de variantes; `anterior` se borra al terminar.
+
+        Si el procesamiento falla, la foto del usuario `user_id` vuelve a
+        ser `anterior`"""
+        futuro = self._executor.submit(self._procesar, key, ruta, anterior, user_id)
+        with self._lock:
+            self._pendientes[key] = futuro
+        futuro.add_done_callback(lambda _: self._pendientes.pop(key, None))
+        return futuro
+
+    # ---- Procesamiento ----
+
+    def _procesar(self, key, ruta, anterior, user_id):
+        try:
+            self.process(key, ruta)
+            if anterior:
+                self.remove(anterior)
+            logger.info("🖼️ Foto de perfil procesada", extra={"key": key})
+        except Exception as e:
+            logger.exception("❌ Error procesando foto de perfil: %s", e, extra={"key": key})
+            self.remove(key)
+            if user_id is not None:
+                self._restaurar(user_id, key, anterior)
+            raise
+        finally:
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    def _restaurar(self, user_id, key, anterior):
+        """Devuelve al usuario su foto anterior, salvo que entretanto haya
+        subido otra"""
+        from models import db, User
+
+        with self._app.app_context():
+            try:
+                db.session.execute(
+                    db.update(User)
+                    .where(User.id == user_id, User.profile_picture == key)
+                    .values(profile_picture=anterior)
+                )
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.exception(
+                    "❌ Error restaurando foto de perfil: %s", e, extra={"user_id": user_id}
+                )
+
+    def process(self, key, ruta):
+        """Genera las variantes de mayor a menor; cada una parte de la
+        anterior en lugar de la imagen original"""
+        mayor = max(self.sizes)
+        with Image.open(ruta) as img:
+            # JPEG: decodifica directamente a una escala reducida (1/2..1/8)
+            img.draft("RGB", (mayor, mayor))
+            img = img.convert("RGB")
+        variantes = []
+        for size in sorted(self.sizes, reverse=True):
+            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+            variantes.append((size, img.copy()))
+        # La variante más grande (marca de listo) se escribe de última
+        for size, variante in reversed(variantes):
+            for ext, formato, opciones in reversed(SALIDAS):
+                destino = os.path.join(self.upload_dir, variant_name(key, size, ext))
+                temporal = destino + ".tmp"
+                variante.save(temporal, formato, **opciones)
+                os.replace(temporal, destino)
+
+    def remove(self, nombre):
+        """Borra una foto anterior (archivo único o todas sus variantes)"""
+        if is_legacy(nombre):
+            archivos = [nombre]
+        else:
+            archivos = [
+                variant_name(nombre, size, ext)
+                for size in self.sizes
+                for ext, _, _ in SALIDAS
+            ]
+        for archivo in archivos:
+            ruta = os.path.join(self._dir(), archivo)
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    def wait(self, timeout=None):
+        """Espera a que terminen las imágenes en proceso (pruebas, apagado)"""
+        with self._lock:
+            futuros = list(self._pendientes.values())
+        for futuro in futuros:
+            futuro.exception(timeout)
+
+
+image_pipeline = ImagePipeline()
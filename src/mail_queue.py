@@ -0,0 +1,305 @@
+"""
+MiloApps - Cola de envío de emails
+Los emails se guardan en la bandeja email_outbox dentro de la petición y
+un hilo de fondo los envía por lotes reutilizando una sola conexión SMTP
+(mail.connect()), con reintentos y backoff exponencial
+"""
+
+import atexit
+import json
+import random
+import smtplib
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import click
+import sqlalchemy as sa
+from flask_mail import Message
+
+from models import db, EmailOutbox
+from structured_logging import get_logger
+
+logger = get_logger("email.queue")
+
+outbox = EmailOutbox.__table__
+
+
+def backoff_delay(attempts, base, maximum):
+    """Segundos hasta el siguiente intento: base * 2^(n-1), con tope y
+    un 10% de variación para no reintentar todos a la vez"""
+    delay = min(base * 2 ** max(attempts - 1, 0), maximum)
+    return delay * random.uniform(1.0, 1.1)
+
+
+def is_permanent(error):
+    """Rechazos 5xx del servidor: reintentar no cambiará el resultado"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(500 <= code < 600 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+class MailQueue:
+    """Bandeja de salida persistente con un hilo que la vacía.
+
+    - MAIL_QUEUE_ENABLED: send_email encola en lugar de enviar en línea
+    - MAIL_QUEUE_WORKER: arrancar el hilo de envío en este proceso
+    - MAIL_QUEUE_BATCH_SIZE: mensajes por conexión SMTP
+    - MAIL_QUEUE_INTERVAL: segundos entre revisiones de la bandeja
+    - MAIL_QUEUE_MAX_ATTEMPTS: intentos antes de marcar como failed
+    - MAIL_QUEUE_BACKOFF_BASE / MAIL_QUEUE_BACKOFF_MAX: backoff (s)
+    - MAIL_QUEUE_LOCK_TIMEOUT: segundos tras los que un lote "sending"
+      de un proceso caído vuelve a estar disponible
+    """
+
+    def __init__(self):
+        self.mail = None
+        self.enabled = False
+        self.batch_size = 50
+        self.interval = 5.0
+        self.max_attempts = 5
+        self.backoff_base = 30
+        self.backoff_max = 3600
+        self.lock_timeout = 600
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def init_app(self, app, mail):
+        self._app = app
+        self.mail = mail
+        config = app.config
+        self.enabled = config.get("MAIL_QUEUE_ENABLED", True)
+        self.batch_size = config.get("MAIL_QUEUE_BATCH_SIZE", self.batch_size)
+        self.interval = config.get("MAIL_QUEUE_INTERVAL", self.interval)
+        self.max_attempts = config.get("MAIL_QUEUE_MAX_ATTEMPTS", self.max_attempts)
+        self.backoff_base = config.get("MAIL_QUEUE_BACKOFF_BASE", self.backoff_base)
+        self.backoff_max = config.get("MAIL_QUEUE_BACKOFF_MAX", self.backoff_max)
+        self.lock_timeout = config.get("MAIL_QUEUE_LOCK_TIMEOUT", self.lock_timeout)
+        app.extensions["mail_queue"] = self
+
+        @app.cli.command("send-mail-queue")
+        def send_mail_queue_command():
+            """Envía los emails pendientes de la bandeja de salida."""
+            result = self.drain()
+            click.echo(
+                f"{result['sent']} enviados, {result['retried']} reprogramados, "
+                f"{result['failed']} fallidos"
+            )
+
+        if self.enabled and config.get("MAIL_QUEUE_WORKER", True):
+            self.start()
+            atexit.register(self.shutdown)
+
+    # ---- Encolado ----
+
+    def enqueue(self, msg, template=None):
+        """Guarda un Message en la bandeja y despierta al hilo.
+
+        Usa su propia transacción: no confirma ni depende de la sesión de
+        la petición.
+        """
+        with db.engine.begin() as conn:
+            result = conn.execute(outbox.insert().values(**self._row(msg, template)))
+        self._wake.set()
+        return result.inserted_primary_key[0]
+
+    def enqueue_many(self, messages, template=None):
+        """Guarda varios mensajes con un solo INSERT"""
+        if not messages:
+            return 0
+        with db.engine.begin() as conn:
+            conn.execute(outbox.insert(), [self._row(msg, template) for msg in messages])
+        self._wake.set()
+        return len(messages)
+
+    @staticmethod
+    def _row(msg, template):
+        now = datetime.utcnow()
+        return {
+            "recipients": json.dumps(list(msg.recipients)),
+            "subject": msg.subject,
+            "html": msg.html,
+            "body": msg.body,
+            "template": template,
+            "status": EmailOutbox.PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        }
+
+    # ---- Hilo ----
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mail-queue", daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                with self._app.app_context():
+                    self.drain()
+            except Exception as e:
+                logger.exception("❌ Error vaciando la bandeja de emails: %s", e)
+
+    # ---- Envío ----
+
+    def drain(self):
+        """Envía lotes hasta que no queden mensajes listos (requiere app_context)"""
+        totals = {"sent": 0, "retried": 0, "failed": 0}
+        while True:
+            rows = self._claim()
+            if not rows:
+                return totals
+            for key, value in self._send_batch(rows).items():
+                totals[key] += value
+
+    def _claim(self):
+        """Marca como "sending" hasta batch_size mensajes listos y los retorna.
+
+        Cada toma lleva un claim_id propio y se relee por él (no por
+        locked_at, que algunos motores guardan sin fracciones de segundo):
+        dos workers nunca se quedan con la misma fila"""
+        now = datetime.utcnow()
+        claim_id = uuid.uuid4().hex
+        ready = sa.or_(
+            sa.and_(
+                outbox.c.status == EmailOutbox.PENDING,
+                outbox.c.next_attempt_at <= now,
+            ),
+            sa.and_(
+                outbox.c.status == EmailOutbox.SENDING,
+                outbox.c.locked_at < now - timedelta(seconds=self.lock_timeout),
+            ),
+        )
+        with db.engine.begin() as conn:
+            ids = conn.execute(
+                sa.select(outbox.c.id).where(ready).order_by(outbox.c.id).limit(self.batch_size)
+            ).scalars().all()
+            if not ids:
+                return []
+            # La condición se repite: otro proceso pudo tomarlos antes
+            conn.execute(
+                outbox.update()
+                .where(outbox.c.id.in_(ids), ready)
+                .values(status=EmailOutbox.SENDING, locked_at=now, claim_id=claim_id)
+            )
+            return conn.execute(
+                sa.select(outbox)
+                .where(outbox.c.claim_id == claim_id)
+                .order_by(outbox.c.id)
+            ).mappings().all()
+
+    def _message(self, row):
+        config = self._app.config
+        return Message(
+            subject=row["subject"],
+            sender=config.get("MAIL_DEFAULT_SENDER"),
+            recipients=json.loads(row["recipients"]),
+            html=row["html"],
+            body=row["body"],
+        )
+
+    def _send_batch(self, rows):
+        """Una conexión SMTP para todo el lote; cada resultado se registra"""
+        sent, errors = [], {}
+        pending = list(rows)
+        try:
+            with self.mail.connect() as conn:
+                while pending:
+                    row = pending[0]
+                    try:
+                        conn.send(self._message(row))
+                        sent.append(row["id"])
+                    except smtplib.SMTPServerDisconnected:
+                        # Se perdió la conexión: el resto del lote se reintenta
+                        raise
+                    except Exception as e:
+                        errors[row["id"]] = e
+                    pending.pop(0)
+        except Exception as e:
+            # Falla al conectar o conexión perdida a mitad del lote
+            for row in pending:
+                errors[row["id"]] = e
+        return self._record(rows, sent, errors)
+
+    def _record(self, rows, sent, errors):
+        now = datetime.utcnow()
+        result = {"sent": len(sent), "retried": 0, "failed": 0}
+        updates = []
+        for row in rows:
+            error = errors.get(row["id"])
+            if error is None:
+                continue
+            attempts = row["attempts"] + 1
+            if attempts >= self.max_attempts or is_permanent(error):
+                status, next_at = EmailOutbox.FAILED, row["next_attempt_at"]
+                result["failed"] += 1
+                logger.error(
+                    "❌ Email descartado tras %s intentos: %s", attempts, error,
+                    extra={"outbox_id": row["id"], "template": row["template"]},
+                )
+            else:
+                status = EmailOutbox.PENDING
+                next_at = now + timedelta(
+                    seconds=backoff_delay(attempts, self.backoff_base, self.backoff_max)
+                )
+                result["retried"] += 1
+            updates.append({
+                "b_id": row["id"],
+                "status": status,
+                "attempts": attempts,
+                "next_attempt_at": next_at,
+                "last_error": str(error)[:1000],
+            })
+
+        # Solo se registran las filas que siguen siendo de esta toma (si el
+        # lote tardó más que lock_timeout, otro worker pudo reclamarlas)
+        claim_id = rows[0]["claim_id"]
+        with db.engine.begin() as conn:
+            if sent:
+                conn.execute(
+                    outbox.update()
+                    .where(outbox.c.id.in_(sent), outbox.c.claim_id == claim_id)
+                    .values(
+                        status=EmailOutbox.SENT, sent_at=now, locked_at=None, claim_id=None
+                    )
+                )
+            if updates:
+                conn.execute(
+                    outbox.update()
+                    .where(
+                        outbox.c.id == sa.bindparam("b_id"),
+                        outbox.c.claim_id == claim_id,
+                    )
+                    .values(locked_at=None, claim_id=None),
+                    updates,
+                )
+        if sent:
+            logger.info("📧 Emails enviados", extra={"count": len(sent)})
+        return result
+
+
+mail_queue = MailQueue()
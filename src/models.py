@@ -4,8 +4,11 @@ Sistema de autenticación con usuarios, roles y auditoría
 Sistema de entidades administrativas genéricas para Talent
 """
 
+from collections import namedtuple
 from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 import pyotp
@@ -14,8 +17,14 @@ from io import BytesIO
 import base64
 import secrets
 import json
+import threading
+import time
+
+from image_pipeline import profile_picture_url
+from structured_logging import get_logger
 
 db = SQLAlchemy()
+logger = get_logger("models")
 
 
 """Tablas y modelos de dominio
@@ -258,10 +267,13 @@ class User(UserMixin, db.Model):
 
     def clear_session(self):
         """Limpia datos de sesión actual"""
+        from activity_tracker import activity_tracker
+
         self.current_session_id = None
         self.session_ip = None
         self.session_user_agent = None
         self.last_activity = None
+        activity_tracker.discard(self.id)
 
     def has_active_session(self, session_id):
         """Verifica si el session_id coincide con el activo"""
@@ -281,46 +293,24 @@ class User(UserMixin, db.Model):
         return r.name if r else None
 
     def has_role(self, role_name: str) -> bool:
-        if (self.role and self.role.name == role_name) or (
-            self.roles.filter_by(name=role_name).first()
-        ):
-            return True
-        return False
+        return role_name in self.get_permission_snapshot().role_names
 
     def has_allmilo(self) -> bool:
         """Retorna True si el usuario tiene el rol ALLMILO"""
         return self.has_role("ALLMILO")
 
+    def get_permission_snapshot(self):
+        """Snapshot compilado de permisos (cacheado por usuario)"""
+        return get_permission_snapshot(self.id)
+
     def has_app_access(self, app_key: str) -> bool:
         """Verifica acceso a una aplicación determinada.
         - Si tiene ALLMILO => True
         - Si algún rol tiene acceso total a esa app => True
         - Si tiene alguna funcionalidad en esa app => True
         """
-        if self.has_allmilo():
-            return True
-    # roles asignados (incluye rol primario implícitamente
-    # vía relationship roles)
-        user_roles = list(self.roles)
-        if self.role and self.role not in user_roles:
-            user_roles.append(self.role)
-
-        for r in user_roles:
-            if r.is_allmilo:
-                return True
-            # acceso total por app
-            for ra in r.app_access:
-                if ra.app and ra.app.key == app_key and ra.full_access:
-                    return True
-            # permisos granulares
-            for rf in r.functionalities:
-                if (
-                    rf.functionality
-                    and rf.functionality.application
-                    and rf.functionality.application.key == app_key
-                ):
-                    return True
-        return False
+        snapshot = self.get_permission_snapshot()
+        return snapshot.allmilo or app_key in snapshot.apps
 
     def has_functionality(self, app_key: str, functionality_key: str) -> bool:
         """Verifica permiso granular sobre una funcionalidad.
@@ -328,32 +318,12 @@ class User(UserMixin, db.Model):
         - full_access de rol sobre la app => True
         - rol con funcionalidad específica => True
         """
-        if self.has_app_access(app_key):
-            # has_app_access ya cubre ALLMILO y full_access
-            # pero debemos validar granular solo si no hubo full_access
-            if self.has_allmilo():
-                return True
-        # roles del usuario
-        user_roles = list(self.roles)
-        if self.role and self.role not in user_roles:
-            user_roles.append(self.role)
-        for r in user_roles:
-            if r.is_allmilo:
-                return True
-            # full access?
-            for ra in r.app_access:
-                if ra.app and ra.app.key == app_key and ra.full_access:
-                    return True
-            # granular
-            for rf in r.functionalities:
-                if (
-                    rf.functionality
-                    and rf.functionality.key == functionality_key
-                    and rf.functionality.application
-                    and rf.functionality.application.key == app_key
-                ):
-                    return True
-        return False
+        snapshot = self.get_permission_snapshot()
+        return (
+            snapshot.allmilo
+            or app_key in snapshot.full_apps
+            or (app_key, functionality_key) in snapshot.functionalities
+        )
 
     def get_last_activity(self):
         """Obtiene la fecha de la última actividad real del usuario"""
@@ -385,12 +355,11 @@ class User(UserMixin, db.Model):
         # Como último recurso, usar la fecha de creación de la cuenta
         return self.created_at
 
-    def get_profile_picture_url(self):
-        """Obtiene la URL de la foto de perfil del usuario"""
+    def get_profile_picture_url(self, size=300, ext="jpg"):
+        """Obtiene la URL de la foto de perfil del usuario (variante de
+        `size` px; marcador mientras se procesa)"""
         try:
-            if self.profile_picture:
-                return f"/static/uploads/profiles/{self.profile_picture}"
-            return None
+            return profile_picture_url(self.profile_picture, size, ext)
         except AttributeError:
             return None
 
@@ -594,6 +563,165 @@ class RoleFunctionality(db.Model):
     )
 
 
+# ====== SNAPSHOT COMPILADO DE PERMISOS ======
+"""Los permisos efectivos de cada usuario se compilan con una sola
+consulta (UNION ALL de roles, accesos totales y funcionalidades) y se
+cachean por usuario. Las verificaciones de has_app_access /
+has_functionality no ejecutan SQL mientras el snapshot esté vigente.
+"""
+
+PermissionSnapshot = namedtuple(
+    "PermissionSnapshot",
+    ["role_names", "allmilo", "full_apps", "apps", "functionalities"],
+)
+
+# Segundos de vigencia del snapshot; acota la desactualización entre
+# procesos (la invalidación explícita solo afecta al proceso actual)
+PERMISSION_CACHE_TTL = 300
+
+_permission_cache = {}
+_permission_cache_lock = threading.Lock()
+
+
+def _load_permission_snapshot(user_id):
+    """Compila los permisos del usuario en una única consulta"""
+    role_ids = db.union(
+        db.select(UserRole.role_id).where(UserRole.user_id == user_id),
+        db.select(User.role_id).where(
+            User.id == user_id, User.role_id.isnot(None)
+        ),
+    )
+    no_key = db.cast(db.null(), db.String)
+    roles_q = db.select(
+        db.literal("role").label("kind"),
+        Role.name,
+        Role.is_allmilo,
+        no_key.label("app_key"),
+        no_key.label("func_key"),
+    ).where(Role.id.in_(role_ids))
+    apps_q = (
+        db.select(
+            db.literal("app"),
+            Role.name,
+            Role.is_allmilo,
+            Application.key,
+            no_key,
+        )
+        .join(RoleAppAccess, RoleAppAccess.role_id == Role.id)
+        .join(Application, Application.id == RoleAppAccess.app_id)
+        .where(Role.id.in_(role_ids), RoleAppAccess.full_access.is_(True))
+    )
+    funcs_q = (
+        db.select(
+            db.literal("func"),
+            Role.name,
+            Role.is_allmilo,
+            Application.key,
+            Functionality.key,
+        )
+        .join(RoleFunctionality, RoleFunctionality.role_id == Role.id)
+        .join(
+            Functionality,
+            Functionality.id == RoleFunctionality.functionality_id,
+        )
+        .join(Application, Application.id == Functionality.application_id)
+        .where(Role.id.in_(role_ids))
+    )
+
+    role_names = set()
+    allmilo = False
+    full_apps = set()
+    functionalities = set()
+    rows = db.session.execute(db.union_all(roles_q, apps_q, funcs_q))
+    for kind, role_name, is_allmilo, app_key, func_key in rows:
+        role_names.add(role_name)
+        allmilo = allmilo or bool(is_allmilo)
+        if kind == "app":
+            full_apps.add(app_key)
+        elif kind == "func":
+            functionalities.add((app_key, func_key))
+
+    full_apps = frozenset(full_apps)
+    functionalities = frozenset(functionalities)
+    return PermissionSnapshot(
+        role_names=frozenset(role_names),
+        allmilo=allmilo or "ALLMILO" in role_names,
+        full_apps=full_apps,
+        apps=full_apps | {app_key for app_key, _ in functionalities},
+        functionalities=functionalities,
+    )
+
+
+def get_permission_snapshot(user_id):
+    """Obtiene el snapshot de permisos del usuario (cacheado)"""
+    now = time.monotonic()
+    entry = _permission_cache.get(user_id)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    snapshot = _load_permission_snapshot(user_id)
+    with _permission_cache_lock:
+        _permission_cache[user_id] = (now + PERMISSION_CACHE_TTL, snapshot)
+    return snapshot
+
+
+def invalidate_permission_cache(user_id=None):
+    """Invalida el snapshot de un usuario, o de todos si no se indica"""
+    with _permission_cache_lock:
+        if user_id is None:
+            _permission_cache.clear()
+        else:
+            _permission_cache.pop(user_id, None)
+
+
+# Marca en session.info["permission_users"]: invalidar a todos los usuarios
+_ALL_USERS = object()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_permission_changes(session, flush_context):
+    """Anota los usuarios cuyos permisos cambian en esta transacción; se
+    invalidan al terminarla (commit o rollback), no en el flush: así un
+    lector concurrente no deja cacheado el estado previo al commit.
+    Los DELETE masivos (query.delete()) no pasan por aquí: quien los use
+    debe llamar a invalidate_permission_cache explícitamente.
+    """
+    users = session.info.setdefault("permission_users", set())
+    if _ALL_USERS in users:
+        return
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    for obj in changed:
+        if isinstance(obj, (Role, RoleAppAccess, RoleFunctionality)):
+            users.add(_ALL_USERS)
+            return
+        if isinstance(obj, UserRole):
+            users.add(obj.user_id)
+        elif isinstance(obj, User):
+            state = inspect(obj)
+            if (
+                obj in session.new
+                or obj in session.deleted
+                or state.attrs.role_id.history.has_changes()
+                or state.attrs.roles.history.has_changes()
+            ):
+                users.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_permissions_on_commit(session):
+    """Al confirmar se invalida el estado anterior; al revertir, el que
+    pudo cachearse desde esta misma sesión antes del rollback"""
+    users = session.info.pop("permission_users", None)
+    if not users:
+        return
+    if _ALL_USERS in users:
+        invalidate_permission_cache()
+        return
+    for user_id in users:
+        invalidate_permission_cache(user_id)
+
+
 class AuditLog(db.Model):
     """Modelo de Log de Auditoría"""
 
@@ -629,15 +757,7 @@ class AuditLog(db.Model):
 
     def set_additional_data(self, data_dict):
         """Establece datos adicionales como JSON, serializando datetimes"""
-        def _default(o):
-            try:
-                if hasattr(o, "isoformat"):
-                    return o.isoformat()
-            except Exception:
-                pass
-            return str(o)
-
-        self.additional_data = json.dumps(data_dict, default=_default)
+        self.additional_data = serialize_additional_data(data_dict)
 
     def get_additional_data(self):
         """Obtiene datos adicionales como diccionario"""
@@ -665,30 +785,85 @@ class AuditLog(db.Model):
         }
 
 
+class EmailOutbox(db.Model):
+    """Bandeja de salida de emails (la vacía mail_queue.MailQueue)"""
+
+    __tablename__ = "email_outbox"
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipients = db.Column(db.Text, nullable=False)  # JSON list
+    subject = db.Column(db.String(255), nullable=False)
+    html = db.Column(db.Text, nullable=True)
+    body = db.Column(db.Text, nullable=True)
+    template = db.Column(db.String(100), nullable=True)
+
+    # Entrega: pending -> sending -> sent | (pending con backoff) | failed
+    status = db.Column(db.String(10), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    claim_id = db.Column(db.String(32), nullable=True)  # lote que lo tomó
+    last_error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Mensajes listos para enviar: status + next_attempt_at
+        db.Index("idx_outbox_status_next", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.id} {self.status} {self.subject}>"
+
+
 def init_db(app):
     """Inicializa la base de datos con datos por defecto"""
     db.init_app(app)
 
     with app.app_context():
+        # Perfil del motor (PRAGMAs SQLite) antes de abrir conexiones
+        from database import configure_engine
+
+        configure_engine(app, db.engine)
+
         # Crear todas las tablas
         db.create_all()
 
-        # Migración ligera para SQLite: agregar columna is_allmilo si no existe
+        # Índices agregados a modelos existentes después de crear la tabla
+        from database import ensure_indexes
+
+        for nombre in ensure_indexes(db.engine, db.metadata):
+            logger.info("✅ Índice creado", extra={"index": nombre})
+
+        # Migración ligera: agregar columna is_allmilo si no existe
+        from database import add_column_if_missing, sql_false
+
         try:
             conn = db.session.connection()
-            res = conn.execute(db.text("PRAGMA table_info(roles)")).fetchall()
-            cols = {row[1] for row in res} if res else set()
-            if "is_allmilo" not in cols:
-                conn.execute(
-                    db.text(
-                        "ALTER TABLE roles ADD COLUMN is_allmilo "
-                        "BOOLEAN NOT NULL DEFAULT 0"
-                    )
-                )
+            if add_column_if_missing(
+                conn,
+                "roles",
+                "is_allmilo",
+                f"BOOLEAN NOT NULL DEFAULT {sql_false(conn.dialect)}",
+            ):
                 db.session.commit()
                 print("✅ Migración aplicada: roles.is_allmilo agregado")
         except Exception:
-            # Continuar sin bloquear si no aplica (otros motores o permisos)
+            # Continuar sin bloquear si no aplica (permisos del motor)
+            db.session.rollback()
+
+        try:
+            conn = db.session.connection()
+            if add_column_if_missing(conn, "email_outbox", "claim_id", "VARCHAR(32)"):
+                db.session.commit()
+                logger.info("✅ Migración aplicada: email_outbox.claim_id agregado")
+        except Exception:
             db.session.rollback()
 
         # Crear roles por defecto si no existen
@@ -837,6 +1012,19 @@ class AuditEvents:
     PERMISSION_DENIED = "permission_denied"
 
 
+def serialize_additional_data(data_dict):
+    """Serializa datos adicionales de auditoría a JSON (datetimes en ISO)"""
+    def _default(o):
+        try:
+            if hasattr(o, "isoformat"):
+                return o.isoformat()
+        except Exception:
+            pass
+        return str(o)
+
+    return json.dumps(data_dict, default=_default)
+
+
 def log_audit_event(
     user_id,
     event_type,
@@ -847,62 +1035,55 @@ def log_audit_event(
     success=True,
     additional_data=None,
 ):
-    """Función para registrar eventos de auditoría"""
+    """Función para registrar eventos de auditoría.
+    El evento se encola en el escritor asíncrono (audit_writer); el
+    parseo del user agent y el INSERT ocurren fuera de la petición y
+    no se confirma la sesión del llamador.
+    """
     try:
-        audit_log = AuditLog(
-            user_id=user_id,
-            event_type=event_type,
-            event_description=description,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            success=success,
-        )
+        event = {
+            "user_id": user_id,
+            "event_type": event_type,
+            "description": description,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "success": success,
+            "created_at": datetime.utcnow(),
+        }
 
         if request:
-            audit_log.ip_address = request.remote_addr
-            audit_log.user_agent = str(request.user_agent)
+            event["ip_address"] = request.remote_addr
+            event["user_agent"] = request.user_agent.string
 
-            # Parsear user agent para obtener browser y OS
-            from user_agents import parse
-
-            ua = parse(request.user_agent.string)
-            audit_log.browser = (
-                f"{ua.browser.family} {ua.browser.version_string}"
-            )
-            audit_log.operating_system = (
-                f"{ua.os.family} {ua.os.version_string}"
+        if additional_data:
+            event["additional_data"] = serialize_additional_data(
+                additional_data
             )
 
-        if additional_data:
-            audit_log.set_additional_data(additional_data)
+        from audit_writer import audit_writer
 
-        db.session.add(audit_log)
-        db.session.commit()
+        return audit_writer.submit(event)
 
     except Exception as e:
         print(f"Error logging audit event: {e}")
-        db.session.rollback()
+        return False
 
 
 def cleanup_old_audit_logs(months=6):
-    """Limpia logs de auditoría antiguos (por defecto 6 meses)"""
+    """Limpia logs de auditoría antiguos (por defecto 6 meses).
+    Borra por bloques con DELETE acotado; ver retention.run_retention
+    para la purga programada de todas las tablas de auditoría.
+    """
+    from retention import purge_table
+
     try:
         cutoff_date = datetime.utcnow() - timedelta(days=months * 30)
-        old_logs = (
-            AuditLog.query.filter(AuditLog.created_at < cutoff_date).all()
-        )
-
-        count = len(old_logs)
-        for log in old_logs:
-            db.session.delete(log)
-
-        db.session.commit()
+        count = purge_table("audit_logs", "created_at", cutoff_date)
         print(f"✅ Eliminados {count} logs de auditoría antiguos")
         return count
 
     except Exception as e:
         print(f"Error cleaning up audit logs: {e}")
-        db.session.rollback()
         return 0
 
 
@@ -0,0 +1,203 @@
+"""
+MiloApps - Perfilado de consultas SQL por petición
+Cuenta consultas y tiempo de base de datos de cada petición con los
+eventos before/after_cursor_execute, agrega la cabecera Server-Timing,
+guarda las sentencias más lentas con su endpoint y calcula percentiles
+por endpoint para /api/admin/perf. Se activa por entorno con la sección
+"profiling" de config/*.json
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_SETTINGS = {
+    "enabled": False,
+    "server_timing": True,
+    "slow_query_ms": 100,  # sentencias a partir de este tiempo se guardan
+    "max_slow_queries": 50,  # las N más lentas desde el arranque
+    "max_samples": 500,  # peticiones recientes por endpoint
+}
+
+PERCENTILES = (50, 90, 95, 99)
+MAX_STATEMENT_LENGTH = 500
+
+
+def percentile(ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not ordenados:
+        return None
+    indice = max(0, -(-p * len(ordenados) // 100) - 1)
+    return ordenados[min(indice, len(ordenados) - 1)]
+
+
+class RequestProfile:
+    """Consultas y tiempo de base de datos de la petición en curso"""
+
+    __slots__ = ("inicio", "consultas", "db_ms")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.db_ms = 0.0
+
+
+class QueryProfiler:
+    """Perfilador de peticiones; inactivo salvo que la configuración lo pida.
+
+    Los eventos se registran sobre la clase Engine, así que cubren todas
+    las conexiones (incluidas las de scripts), pero solo miden dentro de
+    una petición con el perfilador activo.
+    """
+
+    def __init__(self):
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.enabled = False
+        self._muestras = defaultdict(deque)
+        self._lentas = []
+        self._orden = itertools.count()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.settings = {**DEFAULT_SETTINGS, **app.config.get("PERF_PROFILING", {})}
+        self.enabled = bool(self.settings["enabled"])
+        app.extensions["query_profiler"] = self
+        if not self.enabled:
+            return
+        _escuchar_engine()
+        app.before_request(self._antes)
+        app.after_request(self._despues)
+
+    def reset(self):
+        with self._lock:
+            self._muestras.clear()
+            self._lentas = []
+
+    # ---- Ciclo de la petición ----
+
+    def _antes(self):
+        g._query_profile = RequestProfile()
+
+    def _despues(self, response):
+        perfil = g.pop("_query_profile", None)
+        if perfil is None:
+            return response
+        total_ms = (time.perf_counter() - perfil.inicio) * 1000
+        if self.settings["server_timing"]:
+            response.headers.add(
+                "Server-Timing",
+                f'db;dur={perfil.db_ms:.1f};desc="{perfil.consultas} consultas", '
+                f"app;dur={total_ms:.1f}",
+            )
+        endpoint = request.endpoint or "desconocido"
+        with self._lock:
+            muestras = self._muestras[endpoint]
+            muestras.append((total_ms, perfil.db_ms, perfil.consultas))
+            while len(muestras) > self.settings["max_samples"]:
+                muestras.popleft()
+        return response
+
+    # ---- Eventos de SQLAlchemy ----
+
+    def registrar_consulta(self, statement, duracion_ms):
+        perfil = g.get("_query_profile")
+        if perfil is None:
+            return
+        perfil.consultas += 1
+        perfil.db_ms += duracion_ms
+        if duracion_ms >= self.settings["slow_query_ms"]:
+            self._registrar_lenta(statement, duracion_ms)
+
+    def _registrar_lenta(self, statement, duracion_ms):
+        entrada = (
+            duracion_ms,
+            next(self._orden),
+            {
+                "ms": round(duracion_ms, 2),
+                "endpoint": request.endpoint,
+                "method": request.method,
+                "statement": " ".join(statement.split())[:MAX_STATEMENT_LENGTH],
+                "timestamp": datetime.utcnow().isoformat(),
+            },
+        )
+        with self._lock:
+            # Montículo de mínimos: se descarta la más rápida de las guardadas
+            if len(self._lentas) < self.settings["max_slow_queries"]:
+                heapq.heappush(self._lentas, entrada)
+            else:
+                heapq.heappushpop(self._lentas, entrada)
+
+    # ---- Reporte ----
+
+    def snapshot(self):
+        """Percentiles por endpoint y sentencias más lentas"""
+        with self._lock:
+            muestras = {k: list(v) for k, v in self._muestras.items() if v}
+            lentas = sorted(self._lentas, reverse=True)
+        endpoints = {}
+        for endpoint, filas in muestras.items():
+            totales = sorted(f[0] for f in filas)
+            db_ms = sorted(f[1] for f in filas)
+            consultas = [f[2] for f in filas]
+            endpoints[endpoint] = {
+                "peticiones": len(filas),
+                "total_ms": {f"p{p}": round(percentile(totales, p), 2) for p in PERCENTILES},
+                "db_ms": {f"p{p}": round(percentile(db_ms, p), 2) for p in PERCENTILES},
+                "consultas": {
+                    "promedio": round(sum(consultas) / len(consultas), 2),
+                    "max": max(consultas),
+                },
+            }
+        return {
+            "enabled": self.enabled,
+            "slow_query_ms": self.settings["slow_query_ms"],
+            "endpoints": dict(
+                sorted(endpoints.items(), key=lambda kv: -kv[1]["total_ms"]["p95"])
+            ),
+            "slow_queries": [e[2] for e in lentas],
+        }
+
+
+query_profiler = QueryProfiler()
+
+
+_escuchando = False
+
+
+def _escuchar_engine():
+    global _escuchando
+    if _escuchando:
+        return
+    event.listen(Engine, "before_cursor_execute", _antes_de_ejecutar)
+    event.listen(Engine, "after_cursor_execute", _despues_de_ejecutar)
+    event.listen(Engine, "handle_error", _al_fallar)
+    _escuchando = True
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get("_query_start")
+    if not inicios:
+        return
+    duracion_ms = (time.perf_counter() - inicios.pop()) * 1000
+    if has_request_context():
+        profiler = current_app.extensions.get("query_profiler")
+        if profiler is not None and profiler.enabled:
+            profiler.registrar_consulta(statement, duracion_ms)
+
+
+def _al_fallar(context):
+    # Una sentencia fallida no llega a after_cursor_execute
+    conn = context.connection
+    if conn is not None and conn.info.get("_query_start"):
+        conn.info["_query_start"].pop()
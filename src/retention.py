@@ -0,0 +1,233 @@
+"""
+MiloApps - Retención de registros de auditoría
+Purga por lotes (DELETE acotado por bloque) de audit_logs,
+talent_auditoria y milosign_audit, con archivo opcional a JSONL
+comprimido. Se ejecuta desde un hilo programado o por CLI, nunca
+dentro de una petición de usuario.
+"""
+
+import gzip
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+import click
+import sqlalchemy as sa
+
+from models import db, EmailOutbox
+from structured_logging import get_logger
+
+logger = get_logger("retention")
+
+# tabla -> (columna de fecha, meses de retención por defecto)
+DEFAULT_RETENTION_POLICIES = {
+    "audit_logs": ("created_at", 6),
+    "talent_auditoria": ("fecha_hora", 24),
+    "milosign_audit": ("timestamp", 60),
+    "email_outbox": ("created_at", 3),
+}
+
+# tabla -> {columna: valor} que además debe cumplir la fila para purgarse
+# (de la bandeja de salida solo se borran los emails ya enviados; los
+# pendientes y fallidos se conservan para reintento o revisión)
+RETENTION_FILTERS = {
+    "email_outbox": {"status": EmailOutbox.SENT},
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _json_default(o):
+    if hasattr(o, "isoformat"):
+        return o.isoformat()
+    return str(o)
+
+
+class _Archive:
+    """JSONL comprimido de esta ejecución; cada bloque se escribe con
+    flush + fsync para que esté en disco antes de confirmar su DELETE"""
+
+    def __init__(self, archive_dir, table_name):
+        os.makedirs(archive_dir, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(archive_dir, f"{table_name}-{stamp}.jsonl.gz")
+        self._file = open(path, "ab")
+        self._gzip = gzip.GzipFile(fileobj=self._file, mode="ab")
+
+    def write_rows(self, rows):
+        data = "".join(
+            json.dumps(dict(row), default=_json_default) + "\n" for row in rows
+        )
+        self._gzip.write(data.encode("utf-8"))
+        self._gzip.flush()  # Z_SYNC_FLUSH: legible aunque no se cierre
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        try:
+            self._gzip.close()
+        finally:
+            self._file.close()
+
+
+def purge_table(
+    table_name,
+    date_column,
+    cutoff,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    archive_dir=None,
+    engine=None,
+    filters=None,
+):
+    """Elimina filas con date_column < cutoff (y que cumplan `filters`,
+    {columna: valor}) en bloques de chunk_size.
+
+    Cada bloque es una transacción corta: se seleccionan hasta chunk_size
+    ids vencidos, se archivan en disco (si se pidió) y se borran con un
+    único DELETE ... WHERE id IN (...). Si el archivo falla, el bloque no
+    se borra; si el DELETE se revierte, el bloque queda archivado y se
+    volverá a archivar en la siguiente ejecución (duplicados por id que se
+    toleran). Retorna el número de filas eliminadas.
+    """
+    engine = engine or db.engine
+    if not sa.inspect(engine).has_table(table_name):
+        return 0
+
+    filters = filters or {}
+    table = sa.table(
+        table_name,
+        sa.column("id"),
+        sa.column(date_column),
+        *(sa.column(column) for column in filters),
+    )
+    expired = sa.and_(
+        table.c[date_column] < cutoff,
+        *(table.c[column] == value for column, value in filters.items()),
+    )
+
+    archive = None
+    total = 0
+    try:
+        while True:
+            rows = []
+            with engine.begin() as conn:
+                if archive_dir:
+                    rows = (
+                        conn.execute(
+                            sa.select(sa.text("*"))
+                            .select_from(table)
+                            .where(expired)
+                            .order_by(table.c.id)
+                            .limit(chunk_size)
+                        )
+                        .mappings()
+                        .all()
+                    )
+                    ids = [row["id"] for row in rows]
+                else:
+                    ids = (
+                        conn.execute(
+                            sa.select(table.c.id)
+                            .where(expired)
+                            .order_by(table.c.id)
+                            .limit(chunk_size)
+                        )
+                        .scalars()
+                        .all()
+                    )
+                if not ids:
+                    break
+                # Primero a disco, luego el DELETE: nunca se pierde una fila
+                if rows:
+                    if archive is None:
+                        archive = _Archive(archive_dir, table_name)
+                    archive.write_rows(rows)
+                conn.execute(sa.delete(table).where(table.c.id.in_(ids)))
+            total += len(ids)
+            if len(ids) < chunk_size:
+                break
+    finally:
+        if archive is not None:
+            archive.close()
+    return total
+
+
+def get_retention_policies(app):
+    """Políticas efectivas: valores por defecto + RETENTION_MONTHS"""
+    months_override = app.config.get("RETENTION_MONTHS", {})
+    return {
+        table: (column, months_override.get(table, months))
+        for table, (column, months) in DEFAULT_RETENTION_POLICIES.items()
+    }
+
+
+def run_retention(app, tables=None, archive_dir=None, now=None):
+    """Aplica las políticas de retención; retorna {tabla: eliminadas}"""
+    now = now or datetime.utcnow()
+    chunk_size = app.config.get("RETENTION_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    if archive_dir is None:
+        archive_dir = app.config.get("RETENTION_ARCHIVE_DIR")
+
+    results = {}
+    for table, (column, months) in get_retention_policies(app).items():
+        if tables and table not in tables:
+            continue
+        cutoff = now - timedelta(days=months * 30)
+        try:
+            results[table] = purge_table(
+                table, column, cutoff, chunk_size, archive_dir,
+                filters=RETENTION_FILTERS.get(table),
+            )
+        except Exception as e:
+            logger.exception(
+                "❌ Error aplicando retención: %s", e, extra={"table": table}
+            )
+            results[table] = 0
+    return results
+
+
+class RetentionScheduler:
+    """Hilo de fondo que ejecuta run_retention cada N horas"""
+
+    def __init__(self, app, interval_hours=24):
+        self.app = app
+        self.interval = interval_hours * 3600
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="retention", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                results = run_retention(self.app)
+            if any(results.values()):
+                logger.info("🧹 Retención aplicada", extra={"results": results})
+
+
+def init_retention(app):
+    """Registra el comando CLI y, si está habilitado, el hilo programado"""
+
+    @app.cli.command("purge-audit")
+    @click.option("--table", "tables", multiple=True, help="Tabla a purgar")
+    @click.option("--archive-dir", default=None, help="Archivar a JSONL.gz")
+    def purge_audit_command(tables, archive_dir):
+        """Aplica las políticas de retención de auditoría."""
+        results = run_retention(app, tables or None, archive_dir)
+        for table, count in results.items():
+            click.echo(f"{table}: {count} registros eliminados")
+
+    if app.config.get("RETENTION_ENABLED", False):
+        scheduler = RetentionScheduler(
+            app, app.config.get("RETENTION_INTERVAL_HOURS", 24)
+        )
+        scheduler.start()
+        app.extensions["retention_scheduler"] = scheduler
@@ -0,0 +1,230 @@
+"""
+MiloApps - Logging estructurado
+Formato JSON (o texto), niveles por logger, envío no bloqueante con
+QueueHandler/QueueListener, muestreo de logs de alto volumen y
+redacción de campos sensibles (PII, credenciales)
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT_LOGGER = "miloapps"
+REDACTED = "[REDACTED]"
+
+DEFAULT_SETTINGS = {
+    "level": "INFO",
+    "format": "text",  # text | json
+    "loggers": {},  # "miloapps.request": "DEBUG"
+    # Fracción de registros (< WARNING) que se conservan por logger
+    "sampling": {"miloapps.request": 0.1},
+    "redact": [
+        "password",
+        "password_confirm",
+        "csrf_token",
+        "token",
+        "cedula_ps",
+        "mail",
+        "email",
+        "telefono",
+        "direccion",
+        "cuenta_bancaria",
+        "fecha_nacimiento",
+    ],
+    "queue_size": 10000,
+}
+
+# Atributos propios de LogRecord: el resto son campos de `extra`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_EMAIL_RE = re.compile(r"([\w.+-])[\w.+-]*@([\w-]+\.[\w.-]+)")
+
+_listener = None
+
+
+def _extras(record):
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+
+# ========================================
+# FILTROS
+# ========================================
+
+class RedactFilter(logging.Filter):
+    """Reemplaza campos sensibles de `extra` (también anidados) y
+    enmascara correos en el mensaje"""
+
+    def __init__(self, keys):
+        super().__init__()
+        self.keys = {k.lower() for k in keys}
+
+    def _redact(self, value):
+        if isinstance(value, dict):
+            return {
+                k: REDACTED if str(k).lower() in self.keys else self._redact(v)
+                for k, v in value.items()
+            }
+        if isinstance(value, (list, tuple)):
+            return [self._redact(v) for v in value]
+        return value
+
+    def filter(self, record):
+        for key, value in _extras(record).items():
+            if key.lower() in self.keys:
+                setattr(record, key, REDACTED)
+            elif isinstance(value, (dict, list, tuple)):
+                setattr(record, key, self._redact(value))
+        mensaje = record.getMessage()
+        if "@" in mensaje:
+            record.msg = _EMAIL_RE.sub(r"\1***@\2", mensaje)
+            record.args = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Conserva solo una fracción de los registros de los loggers
+    configurados; WARNING o superior siempre pasa"""
+
+    def __init__(self, rates):
+        super().__init__()
+        # El prefijo más largo gana: "miloapps.request.x" usa "miloapps.request"
+        self.rates = sorted(rates.items(), key=lambda kv: -len(kv[0]))
+
+    def rate_for(self, name):
+        for prefijo, rate in self.rates:
+            if name == prefijo or name.startswith(prefijo + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+# ========================================
+# FORMATOS
+# ========================================
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos de `extra`"""
+
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(_extras(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legible para desarrollo; los campos extra van como k=v"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    def format(self, record):
+        texto = super().format(record)
+        extras = _extras(record)
+        if extras:
+            texto += " " + " ".join(f"{k}={v}" for k, v in extras.items())
+        return texto
+
+
+# ========================================
+# COLA NO BLOQUEANTE
+# ========================================
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Encola sin esperar; si la cola está llena el registro se descarta"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+    def prepare(self, record):
+        # El mensaje se resuelve en el hilo que registra; el formato
+        # (JSON o texto) se aplica en el hilo del listener
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(settings=None, stream=None):
+    """Configura el logger raíz de la aplicación (idempotente).
+
+    settings es la sección "logging" de config/*.json; LOG_LEVEL y
+    LOG_FORMAT en el entorno tienen prioridad.
+    """
+    global _listener
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    level = os.environ.get("LOG_LEVEL", settings["level"]).upper()
+    formato = os.environ.get("LOG_FORMAT", settings["format"]).lower()
+
+    _stop_listener()
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    salida = logging.StreamHandler(stream or sys.stdout)
+    salida.setFormatter(JsonFormatter() if formato == "json" else TextFormatter())
+
+    cola = queue.Queue(maxsize=settings["queue_size"])
+    handler = NonBlockingQueueHandler(cola)
+    handler.addFilter(SamplingFilter(settings["sampling"]))
+    handler.addFilter(RedactFilter(settings["redact"]))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    for nombre, nivel in settings["loggers"].items():
+        logging.getLogger(nombre).setLevel(str(nivel).upper())
+
+    _listener = QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def flush_logging():
+    """Vacía la cola (se reinicia el listener)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+
+def get_logger(name):
+    """Logger hijo de la aplicación: get_logger("email") -> miloapps.email"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+atexit.register(_stop_listener)
@@ -3,23 +3,80 @@ InfoMilo - Utilidades de Autenticación
 Funciones auxiliares para seguridad y análisis de sesiones
 """
 
+from collections import namedtuple
 from datetime import datetime
+from functools import lru_cache
 from flask import request
 from user_agents import parse
 import re
 import hashlib
+import unicodedata
+
+# Registro inmutable con lo que la app usa de un user agent parseado
+UserAgentInfo = namedtuple(
+    "UserAgentInfo",
+    ["browser", "os", "device", "is_mobile", "is_tablet", "is_pc", "is_bot"],
+)
+
+# Tamaño del caché LRU de user agents (compartido por todo el proceso)
+USER_AGENT_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=USER_AGENT_CACHE_SIZE)
+def parse_user_agent(ua_string):
+    """Parsea un user agent una sola vez por cadena (caché LRU acotado)"""
+    ua = parse(ua_string or "")
+    return UserAgentInfo(
+        browser=f"{ua.browser.family} {ua.browser.version_string}",
+        os=f"{ua.os.family} {ua.os.version_string}",
+        device=ua.device.family,
+        is_mobile=ua.is_mobile,
+        is_tablet=ua.is_tablet,
+        is_pc=ua.is_pc,
+        is_bot=ua.is_bot,
+    )
+
+
+def user_agent_cache_stats():
+    """Estadísticas de aciertos/fallos del caché de user agents"""
+    info = parse_user_agent.cache_info()
+    total = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_ratio": round(info.hits / total, 4) if total else 0.0,
+    }
+
+
+def fold_accents(texto):
+    """Texto sin acentos, en minúsculas y con espacios simples.
+    Base común de la búsqueda de prestadores, el autocompletado de
+    catálogos y la importación: todos comparan texto igual"""
+    if texto is None:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.casefold().split())
+
+
+def search_terms(texto):
+    """Palabras (letras/dígitos) del texto, sin acentos"""
+    return re.findall(r'\w+', fold_accents(texto))
+
 
 def get_client_info(request_obj):
     """Extrae información del cliente desde la petición"""
     ua_string = request_obj.user_agent.string
-    ua = parse(ua_string)
+    ua = parse_user_agent(ua_string)
     
     return {
         'ip_address': request_obj.remote_addr,
         'user_agent': ua_string,
-        'browser': f"{ua.browser.family} {ua.browser.version_string}",
-        'os': f"{ua.os.family} {ua.os.version_string}",
-        'device': ua.device.family,
+        'browser': ua.browser,
+        'os': ua.os,
+        'device': ua.device,
         'is_mobile': ua.is_mobile,
         'is_tablet': ua.is_tablet,
         'is_pc': ua.is_pc,
@@ -0,0 +1,22 @@
+"""Datos de prueba para los modelos de MiloTalent"""
+
+from datetime import date
+
+from apps.milotalent.models import PrestadorServicio
+
+
+def make_ps(n, **overrides):
+    values = dict(
+        cedula_ps=f"{1000 + n}", expedida_id=1, nombre_1=f"Nombre{n}",
+        apellido_1="Apellido", sexo="M", codigo_sap=f"SAP{n}",
+        fecha_nacimiento=date(1990, 1, 1), ciudad_nacimiento_id=1,
+        direccion="Calle 1", municipio_residencia_id=1, telefono="300",
+        mail=f"ps{n}@example.com", profesion_id=1, estado_civil="SOLTERO",
+        rh="O+", identidad_genero="MASCULINO", raza="MESTIZO", banco_id=1,
+        cuenta_bancaria="123", tipo_cuenta="AHORROS",
+        regimen_iva="SIMPLIFICADO", eps_id=1, afp_id=1, arl_id=1,
+        tipo_riesgo="I", operador_ss_id=1, nuevo_viejo="N",
+        area_personal_id=1,
+    )
+    values.update(overrides)
+    return PrestadorServicio(**values)
@@ -0,0 +1,94 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+
+from models import db, User  # noqa: E402
+from activity_tracker import ActivityTracker  # noqa: E402
+
+
+class ActivityTrackerTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+            users = []
+            for name in ("ana", "luis"):
+                u = User(
+                    email=f"{name}@milo.com",
+                    username=name,
+                    first_name=name,
+                    last_name="Test",
+                )
+                u.set_password("secret123A")
+                users.append(u)
+            db.session.add_all(users)
+            db.session.commit()
+            self.user_ids = [u.id for u in users]
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_records_within_granularity_are_coalesced(self):
+        tracker = ActivityTracker(flush_interval=30, granularity=60)
+        start = datetime(2025, 1, 1, 12, 0, 0)
+        uid = self.user_ids[0]
+        self.assertTrue(tracker.record(uid, start))
+        self.assertFalse(tracker.record(uid, start + timedelta(seconds=10)))
+        self.assertTrue(tracker.record(uid, start + timedelta(seconds=61)))
+        self.assertEqual(tracker.pending_count(), 1)
+
+    def test_flush_writes_all_pending_users(self):
+        tracker = ActivityTracker()
+        stamp = datetime(2025, 1, 1, 12, 0, 0)
+        with self.app.app_context():
+            for uid in self.user_ids:
+                tracker.record(uid, stamp)
+            self.assertEqual(tracker.flush(), 2)
+            self.assertEqual(tracker.pending_count(), 0)
+            for uid in self.user_ids:
+                self.assertEqual(db.session.get(User, uid).last_activity, stamp)
+            self.assertEqual(tracker.flush(), 0)
+
+    def test_flush_prunes_old_marks(self):
+        tracker = ActivityTracker(granularity=60)
+        now = datetime.utcnow()
+        with self.app.app_context():
+            tracker.record(self.user_ids[0], now - timedelta(minutes=10))
+            tracker.record(self.user_ids[1], now)
+            tracker.flush()
+        # Solo queda la marca que aún limita nuevas escrituras
+        self.assertEqual(list(tracker._last_seen), [self.user_ids[1]])
+        self.assertFalse(tracker.record(self.user_ids[1], now + timedelta(seconds=5)))
+        self.assertTrue(tracker.record(self.user_ids[0], now))
+
+    def test_discard_prevents_stale_write_after_logout(self):
+        tracker = ActivityTracker()
+        uid = self.user_ids[0]
+        with self.app.app_context():
+            tracker.record(uid, datetime(2025, 1, 1, 12, 0, 0))
+            tracker.discard(uid)
+            self.assertEqual(tracker.flush(), 0)
+            self.assertIsNone(db.session.get(User, uid).last_activity)
+
+
+if __name__ == "__main__":
+    unittest.main()
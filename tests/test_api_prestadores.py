@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+from flask_login import LoginManager  # noqa: E402
+
+from models import db  # noqa: E402
+from apps.milotalent.routes_new import milotalent_bp  # noqa: E402
+from milotalent_factories import make_ps  # noqa: E402
+
+
+class ApiPrestadoresTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            LOGIN_DISABLED=True,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        LoginManager(self.app)
+        self.app.register_blueprint(milotalent_bp)
+        base = datetime(2025, 1, 1)
+        with self.app.app_context():
+            db.create_all()
+            # Dos PS comparten fecha: el id desempata el orden
+            fechas = [base, base, base + timedelta(days=1),
+                      base + timedelta(days=2), base + timedelta(days=3)]
+            db.session.add_all([
+                make_ps(n, fecha_registro=fecha, sexo="F" if n % 2 else "M")
+                for n, fecha in enumerate(fechas, 1)
+            ])
+            db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_keyset_pages_cover_every_row_once(self):
+        ids, cursor = [], None
+        while True:
+            url = "/milotalent/api/prestadores?limit=2&fields=id,cedula_ps"
+            if cursor:
+                url += f"&cursor={cursor}"
+            data = json.loads(self.client.get(url).data)
+            self.assertTrue(all(set(p) == {"id", "cedula_ps"} for p in data["prestadores"]))
+            ids.extend(p["id"] for p in data["prestadores"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(ids, [5, 4, 3, 2, 1])
+
+    def test_ndjson_with_listado_filters(self):
+        response = self.client.get(
+            "/milotalent/api/prestadores?format=ndjson&sexo=F&fields=cedula_ps"
+        )
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(
+            [line["cedula_ps"] for line in lines[:-1]], ["1005", "1003", "1001"]
+        )
+        self.assertEqual(lines[-1]["_meta"], {"total": 3, "next_cursor": None})
+
+    def test_invalid_fields_and_cursor_are_rejected(self):
+        self.assertEqual(
+            self.client.get("/milotalent/api/prestadores?fields=clave").status_code,
+            400,
+        )
+        self.assertEqual(
+            self.client.get("/milotalent/api/prestadores?cursor=xx!").status_code,
+            400,
+        )
+
+    def test_default_response_keeps_full_rows(self):
+        data = json.loads(self.client.get("/milotalent/api/prestadores").data)
+        self.assertEqual(data["total"], 5)
+        self.assertIn("fecha_nacimiento", data["prestadores"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+
+from models import db, AuditLog, AuditEvents  # noqa: E402
+from audit_writer import AuditWriter  # noqa: E402
+
+CHROME_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+class AuditWriterTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{self.db_path}",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+        os.remove(self.db_path)
+
+    def make_event(self, n):
+        from datetime import datetime
+
+        return {
+            "user_id": None,
+            "event_type": AuditEvents.LOGIN_FAILED,
+            "description": f"evento {n}",
+            "user_agent": CHROME_UA,
+            "created_at": datetime.utcnow(),
+        }
+
+    def test_batches_are_written_by_worker(self):
+        self.app.config.update(AUDIT_ASYNC=True, AUDIT_FLUSH_INTERVAL=0.05)
+        writer = AuditWriter(batch_size=10)
+        writer.init_app(self.app)
+        for n in range(25):
+            self.assertTrue(writer.submit(self.make_event(n)))
+        writer.shutdown()
+
+        with self.app.app_context():
+            self.assertEqual(AuditLog.query.count(), 25)
+            log = AuditLog.query.first()
+            self.assertTrue(log.browser.startswith("Chrome"))
+        stats = writer.stats()
+        self.assertEqual(stats["written"], 25)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertFalse(stats["running"])
+
+    def test_drop_policy_counts_discarded_events(self):
+        self.app.config.update(
+            AUDIT_ASYNC=False, AUDIT_QUEUE_SIZE=2, AUDIT_BACKPRESSURE="drop"
+        )
+        writer = AuditWriter()
+        writer.init_app(self.app)
+        # Simula el hilo ocupado: la cola se llena sin consumirse
+        writer._thread = type("Busy", (), {"is_alive": lambda self: True})()
+        results = [writer.submit(self.make_event(n)) for n in range(5)]
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertEqual(writer.stats()["dropped"], 3)
+        self.assertEqual(writer.stats()["queue_depth"], 2)
+
+        writer._thread = None
+        self.assertEqual(writer.flush(), 2)
+
+    def test_submit_without_worker_writes_synchronously(self):
+        writer = AuditWriter()
+        with self.app.app_context():
+            self.assertTrue(writer.submit(self.make_event(1)))
+            self.assertEqual(AuditLog.query.count(), 1)
+        self.assertEqual(writer.stats()["sync_writes"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
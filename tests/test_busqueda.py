@@ -0,0 +1,116 @@
+import os
+import sys
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+from flask_login import LoginManager  # noqa: E402
+
+from models import db  # noqa: E402
+from apps.milotalent.busqueda import (  # noqa: E402
+    TABLA_FTS,
+    crear_indice_busqueda,
+    expresion_fts,
+)
+from apps.milotalent.consultas import filtros_listado  # noqa: E402
+from apps.milotalent.models import PrestadorServicio  # noqa: E402
+from apps.milotalent.routes_new import milotalent_bp  # noqa: E402
+from milotalent_factories import make_ps  # noqa: E402
+
+
+class BusquedaTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            LOGIN_DISABLED=True,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        LoginManager(self.app)
+        self.app.register_blueprint(milotalent_bp)
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                make_ps(1, nombre_1="José", apellido_1="Muñoz", cedula_ps="52001"),
+                make_ps(2, nombre_1="Josefina", apellido_1="Ramírez",
+                        apellido_2="Muñoz", cedula_ps="52002"),
+                make_ps(3, nombre_1="Andrés", apellido_1="Gómez", cedula_ps="79003"),
+            ])
+            db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def cedulas(self, **args):
+        condiciones = filtros_listado(args)
+        return sorted(
+            db.session.execute(
+                db.select(PrestadorServicio.cedula_ps).where(*condiciones)
+            ).scalars()
+        )
+
+    def test_expression_quotes_prefix_terms(self):
+        self.assertEqual(expresion_fts('  José "x'), '"jose"* AND "x"*')
+        self.assertEqual(
+            expresion_fts("52", ("cedula_ps",)), '{cedula_ps} : ("52"*)'
+        )
+        self.assertIsNone(expresion_fts("  -- "))
+
+    def test_listing_filters_fold_accents_and_match_prefixes(self):
+        with self.app.app_context():
+            self.assertEqual(self.cedulas(nombre="jose"), ["52001", "52002"])
+            self.assertEqual(self.cedulas(nombre="MUNOZ"), ["52001", "52002"])
+            self.assertEqual(self.cedulas(nombre="andres gom"), ["79003"])
+            self.assertEqual(self.cedulas(cedula="520"), ["52001", "52002"])
+            # La cédula no coincide con el nombre y viceversa
+            self.assertEqual(self.cedulas(cedula="jose"), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        with self.app.app_context():
+            ps = db.session.get(PrestadorServicio, 3)
+            ps.apellido_1 = "Núñez"
+            db.session.commit()
+            self.assertEqual(self.cedulas(nombre="gomez"), [])
+            self.assertEqual(self.cedulas(nombre="nunez"), ["79003"])
+            db.session.delete(ps)
+            db.session.commit()
+            self.assertEqual(self.cedulas(nombre="nunez"), [])
+
+    def test_existing_rows_indexed_when_created_later(self):
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql(f"DROP TABLE {TABLA_FTS}")
+                for sufijo in ("ai", "ad", "au"):
+                    conn.exec_driver_sql(f"DROP TRIGGER {TABLA_FTS}_{sufijo}")
+                self.assertTrue(crear_indice_busqueda(conn))
+                self.assertFalse(crear_indice_busqueda(conn))
+            self.assertEqual(self.cedulas(q="ramirez"), ["52002"])
+
+    def test_typeahead_ranks_results(self):
+        data = self.client.get("/milotalent/api/buscar?q=munoz").get_json()
+        # Muñoz como primer apellido pesa más que como segundo
+        self.assertEqual(
+            [r["cedula_ps"] for r in data["resultados"]], ["52001", "52002"]
+        )
+        self.assertEqual(data["resultados"][0]["nombre_completo"], "José Muñoz")
+        data = self.client.get("/milotalent/api/buscar?q=jo&limit=1").get_json()
+        self.assertEqual(len(data["resultados"]), 1)
+        self.assertEqual(
+            self.client.get("/milotalent/api/buscar?q=").get_json(), {"resultados": []}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from models import db, TalentEntidad  # noqa: E402
+from catalog_cache import catalog_cache  # noqa: E402
+from entidades_routes import entidades_bp  # noqa: E402
+
+
+class CatalogCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            CATALOG_CACHE_TTL=0,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        catalog_cache.init_app(self.app)
+        self.app.register_blueprint(entidades_bp)
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                TalentEntidad(tipo_entidad="banco", nombre="Banco B", orden=2),
+                TalentEntidad(tipo_entidad="banco", nombre="Banco A", orden=1),
+                TalentEntidad(tipo_entidad="eps", nombre="EPS Sur"),
+            ])
+            db.session.commit()
+        self.client = self.app.test_client()
+        self.statements = []
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        catalog_cache.clear()
+
+    def count_queries(self):
+        with self.app.app_context():
+            event.listen(db.engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_repeated_requests_are_served_from_cache(self):
+        first = self.client.get("/admin/entidades/api/banco")
+        self.assertEqual(
+            [e["nombre"] for e in first.get_json()["data"]],
+            ["Banco A", "Banco B"],
+        )
+        self.count_queries()
+        second = self.client.get("/admin/entidades/api/banco")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.statements, [])
+
+    def test_commit_bumps_version_and_rebuilds_payload(self):
+        self.client.get("/admin/entidades/api/all")
+        version = catalog_cache.version("eps")
+        banco_version = catalog_cache.version("banco")
+        with self.app.app_context():
+            entidad = TalentEntidad.query.filter_by(nombre="EPS Sur").first()
+            entidad.activo = False
+            db.session.commit()
+        self.assertEqual(catalog_cache.version("eps"), version + 1)
+        self.assertEqual(catalog_cache.version("banco"), banco_version)
+
+        data = json.loads(self.client.get("/admin/entidades/api/all").data)
+        self.assertEqual(data["data"]["eps"], [])
+        self.assertEqual(len(data["data"]["banco"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
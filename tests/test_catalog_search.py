@@ -0,0 +1,104 @@
+import os
+import sys
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+
+from models import db, TalentEntidad  # noqa: E402
+from catalog_cache import catalog_cache  # noqa: E402
+from catalog_search import PrefixIndex, catalog_search, fold  # noqa: E402
+from entidades_routes import entidades_bp  # noqa: E402
+
+MUNICIPIOS = [
+    {"id": 1, "nombre": "Bogotá, D.C.", "departamento": "Cundinamarca", "codigo_dane": "11001"},
+    {"id": 2, "nombre": "Medellín", "departamento": "Antioquia", "codigo_dane": "05001"},
+    {"id": 3, "nombre": "San Andrés", "departamento": "San Andrés y Providencia", "codigo_dane": "88001"},
+    {"id": 4, "nombre": "Santa Marta", "departamento": "Magdalena", "codigo_dane": "47001"},
+    {"id": 5, "nombre": "Soacha", "departamento": "Cundinamarca", "codigo_dane": "25754"},
+]
+
+
+class PrefixIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = PrefixIndex(MUNICIPIOS)
+
+    def ids(self, texto, limit=10):
+        return [m["id"] for m in self.index.search(texto, limit)]
+
+    def test_fold_removes_accents_and_punctuation(self):
+        self.assertEqual(fold("  Bogotá, D.C. "), "bogota d c")
+
+    def test_prefix_is_accent_insensitive(self):
+        self.assertEqual(self.ids("MEDELLIN"), [2])
+        self.assertEqual(self.ids("andrés"), [3])
+        self.assertEqual(self.ids("bogota cund"), [1])
+
+    def test_ranks_name_start_before_department(self):
+        # Soacha por nombre, Bogotá por departamento
+        self.assertEqual(self.ids("cund"), [1, 5])
+        self.assertEqual(self.ids("san"), [3, 4])
+        self.assertEqual(self.ids("s"), [3, 4, 5])
+        self.assertEqual(self.ids("s", limit=1), [3])
+
+    def test_matches_codigo_dane(self):
+        self.assertEqual(self.ids("470"), [4])
+        self.assertEqual(self.ids(""), [])
+
+
+class CatalogSearchTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            CATALOG_CACHE_TTL=0,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        catalog_cache.init_app(self.app)
+        self.app.register_blueprint(entidades_bp)
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(TalentEntidad(
+                tipo_entidad="municipio", nombre="Medellín",
+                departamento="Antioquia", codigo_dane="05001",
+            ))
+            db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        catalog_cache.clear()
+        catalog_search.clear()
+
+    def test_endpoint_rebuilds_after_catalog_change(self):
+        data = self.client.get("/admin/entidades/api/municipio/buscar?q=ant").get_json()
+        self.assertEqual([m["nombre"] for m in data["data"]], ["Medellín"])
+        with self.app.app_context():
+            index = catalog_search.index("municipio")
+            self.assertIs(catalog_search.index("municipio"), index)
+            db.session.add(TalentEntidad(
+                tipo_entidad="municipio", nombre="Envigado",
+                departamento="Antioquia", codigo_dane="05266",
+            ))
+            db.session.commit()
+            self.assertIsNot(catalog_search.index("municipio"), index)
+        data = self.client.get("/admin/entidades/api/municipio/buscar?q=ANT").get_json()
+        self.assertEqual([m["nombre"] for m in data["data"]], ["Envigado", "Medellín"])
+        self.assertEqual(
+            self.client.get("/admin/entidades/api/otro/buscar?q=a").status_code, 400
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
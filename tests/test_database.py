@@ -0,0 +1,128 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from unittest import mock  # noqa: E402
+
+import sqlalchemy as sa  # noqa: E402
+from flask import Flask  # noqa: E402
+
+from models import db  # noqa: E402
+from database import (  # noqa: E402
+    add_column_if_missing,
+    build_engine_options,
+    build_pragma_statements,
+    configure_engine,
+    get_database_uri,
+    get_engine,
+    get_sqlite_pragmas,
+    sql_false,
+)
+
+
+class SQLiteProfileTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SQLALCHEMY_DATABASE_URI=(
+                f"sqlite:///{os.path.join(self.tmp_dir, 'profile.db')}"
+            ),
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            SQLITE_MAINTENANCE_MINUTES=0,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_environment_settings_override_defaults(self):
+        pragmas = get_sqlite_pragmas(
+            {"sqlite_pragmas": {"busy_timeout": 10000, "mmap_size": None}}
+        )
+        self.assertEqual(pragmas["busy_timeout"], 10000)
+        self.assertNotIn("mmap_size", pragmas)
+        statements = build_pragma_statements(pragmas)
+        self.assertEqual(statements[0], "PRAGMA journal_mode=WAL")
+        self.assertIn("PRAGMA foreign_keys=ON", statements)
+
+    def test_pragmas_applied_on_connect(self):
+        self.app.config["SQLITE_PRAGMAS"] = get_sqlite_pragmas({})
+        with self.app.app_context():
+            configure_engine(self.app, db.engine)
+
+            def pragma(name):
+                return db.session.execute(
+                    db.text(f"PRAGMA {name}")
+                ).scalar()
+
+            self.assertEqual(pragma("journal_mode"), "wal")
+            self.assertEqual(pragma("busy_timeout"), 5000)
+            self.assertEqual(pragma("foreign_keys"), 1)
+            self.assertEqual(pragma("synchronous"), 1)  # NORMAL
+
+
+class EngineBackendTests(unittest.TestCase):
+    def test_pool_options_from_settings_and_env(self):
+        with mock.patch.dict(
+            os.environ, {"DB_POOL_SIZE": "5", "DB_POOL_PRE_PING": "false"}
+        ):
+            options = build_engine_options(
+                "postgresql://u:p@db/miloapps",
+                {"pool": {"max_overflow": 2, "pool_recycle": None}},
+            )
+        self.assertEqual(options["pool_size"], 5)
+        self.assertEqual(options["max_overflow"], 2)
+        self.assertFalse(options["pool_pre_ping"])
+        self.assertNotIn("pool_recycle", options)
+        # SQLite en memoria usa StaticPool: sin opciones de tamaño
+        self.assertEqual(build_engine_options("sqlite:///:memory:"), {})
+
+    def test_database_url_overrides_local_sqlite(self):
+        with mock.patch.dict(
+            os.environ, {"DATABASE_URL": "postgres://u:p@db/miloapps"}
+        ):
+            self.assertEqual(
+                get_database_uri(), "postgresql://u:p@db/miloapps"
+            )
+
+    def test_shared_engine_and_dialect_aware_migration(self):
+        tmp_dir = tempfile.mkdtemp()
+        uri = f"sqlite:///{os.path.join(tmp_dir, 'scripts.db')}"
+        try:
+            engine = get_engine(uri)
+            self.assertIs(get_engine(uri), engine)
+            with engine.begin() as conn:
+                conn.execute(sa.text("CREATE TABLE roles (id INTEGER)"))
+                ddl = f"BOOLEAN NOT NULL DEFAULT {sql_false(conn.dialect)}"
+                self.assertTrue(
+                    add_column_if_missing(conn, "roles", "is_allmilo", ddl)
+                )
+                self.assertFalse(
+                    add_column_if_missing(conn, "roles", "is_allmilo", ddl)
+                )
+                cols = [c["name"] for c in sa.inspect(conn).get_columns("roles")]
+                self.assertIn("is_allmilo", cols)
+                self.assertEqual(
+                    conn.execute(sa.text("PRAGMA foreign_keys")).scalar(), 1
+                )
+            engine.dispose()
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
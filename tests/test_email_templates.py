@@ -0,0 +1,125 @@
+import json
+import os
+import sys
+import unittest
+
+from jinja2 import DictLoader
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+
+from models import db, EmailOutbox  # noqa: E402
+from email_templates import EmailTemplates  # noqa: E402
+from email_service import init_mail, send_bulk_email, send_email  # noqa: E402
+from mail_queue import mail_queue  # noqa: E402
+
+TEMPLATES = {
+    "MiloMail/welcome.html": "<p>Hola {{ name }} - {{ company }} - {{ brand }}</p>",
+    "MiloMail/welcome.txt": "Hola {{ name }}",
+    "MiloMail/login_alert.html": "<p>Acceso desde {{ ip }}</p>",
+}
+
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.jinja_loader = DictLoader(TEMPLATES)
+    app.config.update(config)
+
+    @app.context_processor
+    def brand():
+        return {"brand": "MiloApps"}
+
+    return app
+
+
+class EmailTemplatesTests(unittest.TestCase):
+    def setUp(self):
+        self.app = make_app()
+        self.templates = EmailTemplates()
+        self.templates.init_app(self.app)
+        self.loads = []
+        get_template = self.app.jinja_env.get_template
+
+        def counting(name, *args, **kwargs):
+            self.loads.append(name)
+            return get_template(name, *args, **kwargs)
+
+        self.app.jinja_env.get_template = counting
+
+    def test_availability_resolved_at_startup(self):
+        self.assertTrue(self.templates.has("welcome"))
+        self.assertTrue(self.templates.has("welcome", "txt"))
+        self.assertFalse(self.templates.has("login_alert", "txt"))
+        with self.app.app_context(), self.assertRaises(LookupError):
+            self.templates.render("no_existe", "Asunto")
+
+    def test_missing_text_template_uses_fallback_without_lookup(self):
+        with self.app.app_context():
+            for _ in range(3):
+                html, body = self.templates.render("login_alert", "Alerta", ip="10.0.0.1")
+        self.assertEqual(html, "<p>Acceso desde 10.0.0.1</p>")
+        self.assertIn("InfoMilo - Alerta", body)
+        # Compilada una sola vez y nunca se busca el .txt
+        self.assertEqual(self.loads, ["MiloMail/login_alert.html"])
+
+    def test_render_many_shares_common_context(self):
+        with self.app.app_context():
+            pares = self.templates.render_many(
+                "welcome", "Bienvenido",
+                [{"name": "Ana"}, {"name": "Luis"}],
+                company="Milo",
+            )
+        self.assertEqual(pares, [
+            ("<p>Hola Ana - Milo - MiloApps</p>", "Hola Ana"),
+            ("<p>Hola Luis - Milo - MiloApps</p>", "Hola Luis"),
+        ])
+        self.assertEqual(sorted(self.loads), ["MiloMail/welcome.html", "MiloMail/welcome.txt"])
+
+
+class BulkEmailTests(unittest.TestCase):
+    def setUp(self):
+        self.app = make_app(
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            MAIL_QUEUE_ENABLED=True,
+            MAIL_QUEUE_WORKER=False,
+        )
+        db.init_app(self.app)
+        init_mail(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        mail_queue.enabled = False
+
+    def test_bulk_email_enqueues_one_row_per_recipient(self):
+        enviados = send_bulk_email(
+            [("ana@example.com", {"name": "Ana"}), ("luis@example.com", {"name": "Luis"})],
+            "Bienvenido", "welcome", company="Milo",
+        )
+        self.assertEqual(enviados, 2)
+        self.assertTrue(send_email("eva@example.com", "Hola", "welcome", name="Eva"))
+        rows = db.session.execute(
+            db.select(EmailOutbox).order_by(EmailOutbox.id)
+        ).scalars().all()
+        self.assertEqual(
+            [json.loads(r.recipients) for r in rows],
+            [["ana@example.com"], ["luis@example.com"], ["eva@example.com"]],
+        )
+        self.assertEqual(rows[1].html, "<p>Hola Luis - Milo - MiloApps</p>")
+        self.assertEqual(rows[2].body, "Hola Eva")
+        self.assertEqual(rows[0].subject, "[MiloApps] Bienvenido")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import csv
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+from flask_login import LoginManager  # noqa: E402
+
+from models import db, TalentEntidad  # noqa: E402
+from apps.milotalent.exportacion import ExportManager  # noqa: E402
+from apps.milotalent.models import PrestadorServicio  # noqa: E402
+from milotalent_factories import make_ps  # noqa: E402
+
+
+class ExportacionTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI=(
+                f"sqlite:///{os.path.join(self.tmp_dir, 'export.db')}"
+            ),
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            EXPORT_DIR=os.path.join(self.tmp_dir, "exports"),
+            EXPORT_CHUNK_SIZE=2,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        LoginManager(self.app)
+        self.manager = ExportManager()
+        self.manager.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+            banco = TalentEntidad(tipo_entidad="banco", nombre="Banco Ñandú")
+            eps = TalentEntidad(tipo_entidad="eps", nombre="EPS Sur")
+            db.session.add_all([banco, eps])
+            db.session.flush()
+            db.session.add_all([
+                make_ps(n, banco_id=banco.id, eps_id=eps.id,
+                        sexo="F" if n % 2 else "M")
+                for n in range(1, 6)
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(self.tmp_dir)
+
+    def wait(self, job):
+        for _ in range(200):
+            if job.finalizado:
+                return job
+            time.sleep(0.01)
+        self.fail("La exportación no terminó")
+
+    def test_csv_export_resolves_entity_names(self):
+        job = self.wait(self.manager.submit("csv", {"sexo": "F"}, user_id="1"))
+        self.assertEqual(job.estado, "completado", job.error)
+        self.assertEqual((job.total, job.procesados), (3, 3))
+        self.assertEqual(job.to_dict()["progreso"], 100.0)
+        with open(job.ruta, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["banco_nombre"], "Banco Ñandú")
+        self.assertEqual(rows[0]["eps_nombre"], "EPS Sur")
+        self.assertEqual(rows[0]["caja_compensacion_nombre"], "")
+        self.assertFalse(os.path.exists(job.ruta + ".part"))
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+
+        job = self.wait(self.manager.submit("xlsx", user_id="1"))
+        self.assertEqual(job.estado, "completado", job.error)
+        sheet = load_workbook(job.ruta, read_only=True).active
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(len(rows), 6)  # encabezado + 5 PS
+        self.assertIn("banco_nombre", rows[0])
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow no instalado")
+    def test_parquet_schema_survives_null_first_chunk(self):
+        import pyarrow.parquet as pq
+
+        with self.app.app_context():
+            # Solo el último PS (tercer bloque) tiene segundo nombre
+            db.session.execute(
+                db.update(PrestadorServicio)
+                .where(PrestadorServicio.cedula_ps == "1005")
+                .values(nombre_2="María", caja_compensacion_id=1)
+            )
+            db.session.commit()
+        job = self.wait(self.manager.submit("parquet", user_id="1"))
+        self.assertEqual(job.estado, "completado", job.error)
+        tabla = pq.read_table(job.ruta)
+        self.assertEqual(tabla.num_rows, 5)
+        self.assertEqual(str(tabla.schema.field("nombre_2").type), "string")
+        self.assertEqual(tabla.column("nombre_2").to_pylist()[-1], "María")
+        self.assertEqual(tabla.column("caja_compensacion_id").to_pylist()[-1], 1)
+        self.assertEqual(str(tabla.schema.field("banco_id").type), "int64")
+
+    def test_job_state_is_visible_from_another_worker(self):
+        job = self.manager.submit("csv", user_id="1")
+        # Otro proceso: mismo EXPORT_DIR, sin el trabajo en memoria
+        otro = ExportManager()
+        otro.init_app(self.app)
+        self.assertIsNotNone(otro.get(job.id))
+        for _ in range(200):
+            copia = otro.get(job.id)
+            if copia.finalizado:
+                break
+            time.sleep(0.01)
+        self.assertEqual(copia.estado, "completado", copia.error)
+        self.assertEqual(copia.to_dict(), job.to_dict())
+        self.assertEqual((copia.ruta, copia.user_id), (job.ruta, "1"))
+        self.assertIsNone(otro.get("../export"))
+        self.assertIsNone(otro.get("0" * 32))
+
+    def test_unknown_format_is_rejected(self):
+        from apps.milotalent.exportacion import ExportError
+
+        with self.assertRaises(ExportError):
+            self.manager.submit("pdf")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import sys
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+from flask_login import LoginManager  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from models import db, TalentEntidad  # noqa: E402
+from catalog_cache import catalog_cache  # noqa: E402
+from entidades_routes import entidades_bp  # noqa: E402
+from apps.milotalent.models import PrestadorServicio  # noqa: E402
+from apps.milotalent.routes_new import milotalent_bp  # noqa: E402
+from apps.milotalent.stats import stats_engine  # noqa: E402
+from milotalent_factories import make_ps  # noqa: E402
+
+
+class ConditionalRequestTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            CATALOG_CACHE_TTL=0,
+            LOGIN_DISABLED=True,
+            HTTP_CACHE_CONTROL={"stats": "private, max-age=5"},
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        LoginManager(self.app)
+        catalog_cache.init_app(self.app)
+        self.app.register_blueprint(entidades_bp)
+        self.app.register_blueprint(milotalent_bp)
+        with self.app.app_context():
+            db.create_all()
+            banco = TalentEntidad(tipo_entidad="banco", nombre="Banco A")
+            db.session.add(banco)
+            db.session.commit()
+            self.banco_id = banco.id
+        self.client = self.app.test_client()
+        self.statements = []
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        catalog_cache.clear()
+        stats_engine.invalidar()
+
+    def count_queries(self):
+        with self.app.app_context():
+            event.listen(db.engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_catalog_if_none_match_returns_304_without_queries(self):
+        first = self.client.get("/admin/entidades/api/banco")
+        etag = first.headers["ETag"]
+        self.assertIn("Last-Modified", first.headers)
+        self.assertIn("must-revalidate", first.headers["Cache-Control"])
+
+        self.count_queries()
+        second = self.client.get(
+            "/admin/entidades/api/banco", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b"")
+        self.assertEqual(second.headers["ETag"], etag)
+
+        detail = self.client.get(f"/admin/entidades/api/banco/{self.banco_id}")
+        again = self.client.get(
+            f"/admin/entidades/api/banco/{self.banco_id}",
+            headers={"If-None-Match": detail.headers["ETag"]},
+        )
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.statements, [])
+
+    def test_catalog_change_produces_new_etag(self):
+        etag = self.client.get("/admin/entidades/api/all").headers["ETag"]
+        with self.app.app_context():
+            db.session.add(TalentEntidad(tipo_entidad="banco", nombre="Banco B"))
+            db.session.commit()
+        response = self.client.get(
+            "/admin/entidades/api/all", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_stats_revalidation_is_served_from_cached_counters(self):
+        first = self.client.get("/milotalent/api/stats")
+        self.assertEqual(first.get_json()["total_ps"], 0)
+        self.assertEqual(first.headers["Cache-Control"], "private, max-age=5")
+
+        self.count_queries()
+        second = self.client.get(
+            "/milotalent/api/stats",
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(self.statements, [])
+
+    def test_stats_ignore_if_modified_since(self):
+        # Un agregado no tiene fecha fiable: borrar un PS no cambia
+        # max(fecha_actualizacion), así que solo se revalida por ETag
+        with self.app.app_context():
+            db.session.add_all([make_ps(1), make_ps(2)])
+            db.session.commit()
+        first = self.client.get("/milotalent/api/stats")
+        self.assertEqual(first.get_json()["total_ps"], 2)
+        self.assertNotIn("Last-Modified", first.headers)
+
+        with self.app.app_context():
+            db.session.delete(db.session.get(PrestadorServicio, 1))
+            db.session.commit()
+        stats_engine.invalidar()
+        second = self.client.get(
+            "/milotalent/api/stats",
+            headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"},
+        )
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.get_json()["total_ps"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+from flask_login import LoginManager  # noqa: E402
+
+from models import db, User  # noqa: E402
+from auth_routes import auth  # noqa: E402
+from image_pipeline import (  # noqa: E402
+    PLACEHOLDER_URL,
+    ImageTooLarge,
+    ImageUploadError,
+    image_pipeline,
+)
+
+
+def jpeg_bytes(size=(1200, 900), color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class ImagePipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            PROFILE_PICTURE_DIR=self.upload_dir,
+            PROFILE_PICTURE_MAX_BYTES=200 * 1024,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        login_manager = LoginManager(self.app)
+        login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+        self.app.register_blueprint(auth)
+        image_pipeline.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+            user = User(username="ana", email="ana@example.com", first_name="Ana", last_name="Ruiz")
+            user.set_password("secreto123")
+            user.profile_picture = "legacy.jpg"
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+        open(os.path.join(self.upload_dir, "legacy.jpg"), "wb").close()
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(self.user_id)
+            session["_fresh"] = True
+
+    def tearDown(self):
+        image_pipeline.wait(5)
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def files(self):
+        return sorted(os.listdir(self.upload_dir))
+
+    def test_process_generates_variants_from_draft(self):
+        data = jpeg_bytes()
+        key, ruta = image_pipeline.save_upload(FileStorage(io.BytesIO(data), "foto.jpg"))
+        image_pipeline.process(key, ruta)
+
+        for size in (48, 96, 300):
+            with Image.open(os.path.join(self.upload_dir, f"{key}_{size}.jpg")) as img:
+                self.assertEqual(img.size, (size, size * 3 // 4))
+            with Image.open(os.path.join(self.upload_dir, f"{key}_{size}.webp")) as img:
+                self.assertEqual(img.format, "WEBP")
+        self.assertTrue(image_pipeline.is_ready(key))
+
+    def test_upload_limits_and_validation(self):
+        grande = FileStorage(io.BytesIO(os.urandom(300 * 1024)), "foto.jpg")
+        with self.assertRaises(ImageTooLarge):
+            image_pipeline.save_upload(grande)
+        falso = FileStorage(io.BytesIO(b"no es una imagen"), "foto.jpg")
+        with self.assertRaises(ImageUploadError):
+            image_pipeline.save_upload(falso)
+        # No quedan temporales
+        self.assertEqual(self.files(), ["legacy.jpg"])
+
+    def test_content_length_rejected_before_reading(self):
+        response = self.client.post(
+            "/auth/upload-profile-picture",
+            data={"profile_picture": (io.BytesIO(os.urandom(400 * 1024)), "foto.jpg")},
+        )
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(response.get_json()["success"])
+
+    def test_upload_shows_placeholder_until_processed(self):
+        response = self.client.post(
+            "/auth/upload-profile-picture",
+            data={"profile_picture": (io.BytesIO(jpeg_bytes()), "foto.jpg")},
+        )
+        data = response.get_json()
+        self.assertTrue(data["success"])
+        if data["processing"]:
+            self.assertEqual(data["profile_picture_url"], PLACEHOLDER_URL)
+
+        image_pipeline.wait(5)
+        with self.app.app_context():
+            user = db.session.get(User, self.user_id)
+            key = user.profile_picture
+            self.assertEqual(
+                user.get_profile_picture_url(96, "webp"),
+                f"/static/uploads/profiles/{key}_96.webp",
+            )
+        self.assertEqual(data["profile_picture_final_url"], f"/static/uploads/profiles/{key}_300.jpg")
+        # La foto anterior y el archivo temporal se eliminan
+        self.assertNotIn("legacy.jpg", self.files())
+        self.assertEqual(len(self.files()), 6)
+
+    def test_failed_processing_restores_previous_picture(self):
+        respondido = threading.Event()
+
+        def parcial(key, ruta):
+            # Falla después de responder; una variante alcanza a escribirse
+            respondido.wait(5)
+            open(os.path.join(self.upload_dir, f"{key}_48.jpg"), "wb").close()
+            raise OSError("image file is truncated")
+
+        with mock.patch.object(image_pipeline, "process", side_effect=parcial), \
+                self.assertLogs("miloapps.images", "ERROR"):
+            response = self.client.post(
+                "/auth/upload-profile-picture",
+                data={"profile_picture": (io.BytesIO(jpeg_bytes()), "foto.jpg")},
+            )
+            self.assertTrue(response.get_json()["success"])
+            respondido.set()
+            image_pipeline.wait(5)
+
+        with self.app.app_context():
+            user = db.session.get(User, self.user_id)
+            self.assertEqual(user.profile_picture, "legacy.jpg")
+            self.assertEqual(user.get_profile_picture_url(), "/static/uploads/profiles/legacy.jpg")
+        # Ni variantes parciales ni temporales; la foto anterior se conserva
+        self.assertEqual(self.files(), ["legacy.jpg"])
+
+
+if __name__ == "__main__":
+    unittest.main()
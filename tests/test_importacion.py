@@ -0,0 +1,231 @@
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+from flask_login import LoginManager  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from catalog_cache import catalog_cache  # noqa: E402
+from models import db, TalentEntidad  # noqa: E402
+from apps.milotalent.importacion import (  # noqa: E402
+    ImportadorPrestadores,
+    init_importacion,
+)
+from apps.milotalent.models import AuditoriaPS, PrestadorServicio  # noqa: E402
+from apps.milotalent.routes_new import milotalent_bp  # noqa: E402
+from milotalent_factories import make_ps  # noqa: E402
+
+TIPOS = ("municipio", "profesion", "banco", "eps", "afp", "arl",
+         "caja_compensacion", "operador_ss", "area_personal")
+
+ENCABEZADOS = [
+    "cedula_ps", "nombre_1", "apellido_1", "sexo", "codigo_sap",
+    "fecha_nacimiento", "direccion", "telefono", "mail", "estado_civil",
+    "rh", "identidad_genero", "raza", "cuenta_bancaria", "tipo_cuenta",
+    "regimen_iva", "tipo_riesgo", "nuevo_viejo", "expedida_nombre",
+    "ciudad_nacimiento_nombre", "municipio_residencia_nombre",
+    "profesion_nombre", "banco_nombre", "eps_nombre", "afp_nombre",
+    "arl_nombre", "operador_ss_nombre", "area_personal_nombre",
+]
+
+
+def fila(cedula, sap, **overrides):
+    valores = dict(
+        cedula_ps=cedula, nombre_1="Ana", apellido_1="Pérez", sexo="F",
+        codigo_sap=sap, fecha_nacimiento="15/03/1990", direccion="Calle 1",
+        telefono="300", mail=f"{cedula}@example.com", estado_civil="SOLTERO",
+        rh="O+", identidad_genero="FEMENINO", raza="MESTIZO",
+        cuenta_bancaria="123", tipo_cuenta="AHORROS",
+        regimen_iva="SIMPLIFICADO", tipo_riesgo="I", nuevo_viejo="N",
+        expedida_nombre="bogota", ciudad_nacimiento_nombre="BOGOTÁ",
+        municipio_residencia_nombre="11001", profesion_nombre="profesion",
+        banco_nombre="banco", eps_nombre="eps", afp_nombre="afp",
+        arl_nombre="arl", operador_ss_nombre="operador_ss",
+        area_personal_nombre="area_personal",
+    )
+    valores.update(overrides)
+    return [valores[h] for h in ENCABEZADOS]
+
+
+def csv_bytes(filas, delimiter=","):
+    salida = io.StringIO()
+    writer = csv.writer(salida, delimiter=delimiter)
+    writer.writerow(ENCABEZADOS)
+    writer.writerows(filas)
+    return salida.getvalue().encode("utf-8-sig")
+
+
+class ImportacionTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            LOGIN_DISABLED=True,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        LoginManager(self.app).user_loader(lambda user_id: None)
+        self.app.register_blueprint(milotalent_bp)
+        init_importacion(self.app)
+        with self.app.app_context():
+            db.create_all()
+            for tipo in TIPOS:
+                entidad = TalentEntidad(tipo_entidad=tipo, nombre=tipo)
+                if tipo == "municipio":
+                    entidad.nombre = "Bogotá"
+                    entidad.codigo_dane = "11001"
+                db.session.add(entidad)
+            db.session.flush()
+            db.session.add(make_ps(1))  # cédula 1001, SAP1
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        catalog_cache.clear()
+
+    def importar(self, contenido, nombre="ps.csv", **kwargs):
+        importador = ImportadorPrestadores(**kwargs)
+        return importador.importar(io.BytesIO(contenido), nombre).to_dict()
+
+    def test_csv_import_reports_errors_per_row(self):
+        contenido = csv_bytes([
+            fila("2001", "SAP2001"),
+            fila("1001", "SAP2002"),                      # ya registrada
+            fila("2003", "SAP2003", banco_nombre="Otro"),  # entidad inexistente
+            fila("2001", "SAP2004"),                      # repetida en el archivo
+            fila("2005", "SAP2005", mail=""),             # falta obligatorio
+            fila("2006", "SAP2006", fecha_nacimiento="1991-01-31"),
+        ], delimiter=";")
+        with self.app.app_context():
+            reporte = self.importar(contenido, batch_size=2)
+            self.assertEqual(reporte["total"], 6)
+            self.assertEqual(reporte["insertados"], 2)
+            errores = {e["fila"]: e["errores"] for e in reporte["errores"]}
+            self.assertEqual(sorted(errores), [3, 4, 5, 6])
+            self.assertIn("cédula", errores[3][0])
+            self.assertIn("banco_id", errores[4][0])
+            self.assertIn("repetida", errores[5][0])
+            self.assertIn("mail", errores[6][0])
+
+            ps = db.session.execute(
+                db.select(PrestadorServicio).filter_by(cedula_ps="2001")
+            ).scalar_one()
+            municipio = db.session.execute(
+                db.select(TalentEntidad.id).filter_by(tipo_entidad="municipio")
+            ).scalar()
+            self.assertEqual(ps.expedida_id, municipio)
+            self.assertEqual(ps.municipio_residencia_id, municipio)
+            self.assertEqual(ps.fecha_nacimiento.isoformat(), "1990-03-15")
+            auditoria = db.session.execute(
+                db.select(AuditoriaPS).filter_by(accion="importacion_ps")
+            ).scalars().all()
+            self.assertEqual(len(auditoria), 2)
+            self.assertEqual(auditoria[0].usuario_id, "SYSTEM")
+
+    def test_invalid_rows_do_not_reserve_keys(self):
+        contenido = csv_bytes([
+            fila("2101", "SAP2101", banco_nombre="Otro"),  # inválida
+            fila("2101", "SAP2101"),                      # no es repetida
+            fila("2103", ""),                             # falta código SAP
+            fila("2104", ""),                             # ídem, sin "repetido"
+        ])
+        with self.app.app_context():
+            reporte = self.importar(contenido)
+        self.assertEqual(reporte["insertados"], 1)
+        errores = {e["fila"]: e["errores"] for e in reporte["errores"]}
+        self.assertEqual(sorted(errores), [2, 4, 5])
+        self.assertEqual(len(errores[4]), 1)
+        self.assertEqual(len(errores[5]), 1)
+        self.assertIn("codigo_sap", errores[5][0])
+
+    def test_one_uniqueness_query_per_batch(self):
+        contenido = csv_bytes([fila(f"3{n:03d}", f"SAP3{n:03d}") for n in range(6)])
+        with self.app.app_context():
+            # Calentar el mapa de entidades para contar solo las del lote
+            for tipo in TIPOS:
+                catalog_cache.get(tipo)
+            consultas = []
+
+            def contar(conn, cursor, statement, *args):
+                if "talent_prestadores_new" in statement and statement.startswith("SELECT"):
+                    consultas.append(statement)
+
+            event.listen(db.engine, "before_cursor_execute", contar)
+            try:
+                reporte = self.importar(contenido, batch_size=4)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", contar)
+            self.assertEqual(reporte["insertados"], 6)
+            self.assertEqual(len(consultas), 2)
+
+    def test_simulation_does_not_insert(self):
+        with self.app.app_context():
+            reporte = self.importar(csv_bytes([fila("4001", "SAP4001")]), simulacion=True)
+            self.assertEqual(reporte["insertados"], 1)
+            self.assertEqual(db.session.query(PrestadorServicio).count(), 1)
+
+    def test_xlsx_numeric_cells(self):
+        from openpyxl import Workbook
+
+        libro = Workbook()
+        hoja = libro.active
+        hoja.append(ENCABEZADOS)
+        hoja.append(fila(5001.0, "SAP5001"))
+        contenido = io.BytesIO()
+        libro.save(contenido)
+        with self.app.app_context():
+            reporte = self.importar(contenido.getvalue(), nombre="ps.xlsx")
+            self.assertEqual(reporte["insertados"], 1, reporte["errores"])
+            self.assertEqual(
+                db.session.query(PrestadorServicio).filter_by(cedula_ps="5001").count(), 1
+            )
+
+    def test_endpoint_and_cli(self):
+        client = self.app.test_client()
+        respuesta = client.post(
+            "/milotalent/importaciones",
+            data={"archivo": (io.BytesIO(csv_bytes([fila("6001", "SAP6001")])), "ps.csv")},
+            content_type="multipart/form-data",
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.get_json()["insertados"], 1)
+
+        respuesta = client.post(
+            "/milotalent/importaciones",
+            data={"archivo": (io.BytesIO(b"x"), "ps.txt")},
+            content_type="multipart/form-data",
+        )
+        self.assertEqual(respuesta.status_code, 400)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta = os.path.join(tmp, "ps.csv")
+            with open(ruta, "wb") as f:
+                f.write(csv_bytes([fila("6002", "SAP6002"), fila("6001", "SAP6003")]))
+            reporte = os.path.join(tmp, "reporte.json")
+            resultado = self.app.test_cli_runner().invoke(
+                args=["importar-ps", ruta, "--reporte", reporte]
+            )
+            self.assertEqual(resultado.exit_code, 0, resultado.output)
+            self.assertIn("1 insertadas", resultado.output)
+            with open(reporte, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["errores"][0]["fila"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,209 @@
+import json
+import os
+import socketserver
+import sys
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+from flask_mail import Mail, Message  # noqa: E402
+
+from models import db, EmailOutbox  # noqa: E402
+from mail_queue import MailQueue, backoff_delay  # noqa: E402
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Servidor SMTP mínimo: cuenta conexiones y mensajes y rechaza con
+    550 a los destinatarios que empiezan por "rechazado"."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 sink")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in ("HELO", "EHLO"):
+                self.reply("250 sink")
+            elif command == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                if "rechazado" in line:
+                    self.reply("550 No such user")
+                else:
+                    recipients.append(line.split(":", 1)[1].strip(" <>"))
+                    self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline().rstrip(b"\r\n") != b".":
+                    pass
+                self.server.messages.append(recipients)
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class MailQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.sink = SMTPSink()
+        threading.Thread(target=self.sink.serve_forever, daemon=True).start()
+
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            MAIL_SERVER="127.0.0.1",
+            MAIL_PORT=self.sink.server_address[1],
+            MAIL_USE_TLS=False,
+            MAIL_DEFAULT_SENDER="milo@example.com",
+            MAIL_QUEUE_WORKER=False,
+            MAIL_QUEUE_MAX_ATTEMPTS=3,
+            MAIL_QUEUE_BACKOFF_BASE=30,
+        )
+        db.init_app(self.app)
+        mail = Mail(self.app)
+        self.queue = MailQueue()
+        self.queue.init_app(self.app, mail)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.sink.shutdown()
+        self.sink.server_close()
+
+    def enqueue(self, to):
+        msg = Message(subject="Hola", recipients=[to], body="cuerpo")
+        return self.queue.enqueue(msg, template="welcome")
+
+    def test_batch_reuses_single_connection(self):
+        for i in range(5):
+            self.enqueue(f"user{i}@example.com")
+
+        result = self.queue.drain()
+
+        self.assertEqual(result, {"sent": 5, "retried": 0, "failed": 0})
+        self.assertEqual(self.sink.connections, 1)
+        self.assertEqual(len(self.sink.messages), 5)
+        rows = db.session.execute(db.select(EmailOutbox)).scalars().all()
+        self.assertTrue(all(r.status == EmailOutbox.SENT for r in rows))
+        self.assertEqual(json.loads(rows[0].recipients), ["user0@example.com"])
+        # Nada más por enviar
+        self.assertEqual(self.queue.drain()["sent"], 0)
+
+    def test_rejected_recipient_fails_permanently(self):
+        ok = self.enqueue("ok@example.com")
+        bad = self.enqueue("rechazado@example.com")
+
+        result = self.queue.drain()
+
+        self.assertEqual(result, {"sent": 1, "retried": 0, "failed": 1})
+        self.assertEqual(db.session.get(EmailOutbox, ok).status, EmailOutbox.SENT)
+        row = db.session.get(EmailOutbox, bad)
+        self.assertEqual(row.status, EmailOutbox.FAILED)
+        self.assertEqual(row.attempts, 1)
+        self.assertIn("550", row.last_error)
+
+    def test_connection_failure_retries_with_backoff(self):
+        outbox_id = self.enqueue("user@example.com")
+        self.app.config["MAIL_PORT"] = 1  # nadie escucha
+        self.app.extensions["mail"].port = 1
+
+        before = datetime.utcnow()
+        result = self.queue.drain()
+
+        self.assertEqual(result, {"sent": 0, "retried": 1, "failed": 0})
+        row = db.session.get(EmailOutbox, outbox_id)
+        self.assertEqual(row.status, EmailOutbox.PENDING)
+        self.assertEqual(row.attempts, 1)
+        self.assertGreaterEqual(row.next_attempt_at, before + timedelta(seconds=30))
+        # Aún no toca reintentar
+        self.assertEqual(self.queue.drain()["retried"], 0)
+
+        # Vencido el plazo, el último intento permitido lo marca como fallido
+        db.session.execute(
+            db.update(EmailOutbox).values(attempts=2, next_attempt_at=before)
+        )
+        db.session.commit()
+        self.assertEqual(self.queue.drain()["failed"], 1)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(EmailOutbox, outbox_id).status, EmailOutbox.FAILED)
+
+    def test_stale_sending_rows_are_reclaimed(self):
+        outbox_id = self.enqueue("user@example.com")
+        db.session.execute(
+            db.update(EmailOutbox).values(
+                status=EmailOutbox.SENDING,
+                locked_at=datetime.utcnow() - timedelta(hours=1),
+            )
+        )
+        db.session.commit()
+
+        self.assertEqual(self.queue.drain()["sent"], 1)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(EmailOutbox, outbox_id).status, EmailOutbox.SENT)
+
+    def test_claim_does_not_depend_on_fractional_seconds(self):
+        # Simula un motor que guarda DATETIME sin fracciones de segundo
+        db.session.execute(db.text(
+            "CREATE TRIGGER trunca_locked_at AFTER UPDATE OF locked_at ON email_outbox "
+            "WHEN NEW.locked_at IS NOT NULL BEGIN "
+            "UPDATE email_outbox SET locked_at = substr(NEW.locked_at, 1, 19) "
+            "WHERE id = NEW.id; END"
+        ))
+        db.session.commit()
+        for i in range(3):
+            self.enqueue(f"user{i}@example.com")
+
+        self.assertEqual(self.queue.drain()["sent"], 3)
+        self.assertEqual(len(self.sink.messages), 3)
+
+    def test_concurrent_claims_are_disjoint(self):
+        for i in range(3):
+            self.enqueue(f"user{i}@example.com")
+        self.queue.batch_size = 2
+        primero = self.queue._claim()
+        segundo = self.queue._claim()
+        self.assertEqual([r["id"] for r in primero], [1, 2])
+        self.assertEqual([r["id"] for r in segundo], [3])
+        self.assertNotEqual(primero[0]["claim_id"], segundo[0]["claim_id"])
+        self.assertEqual(self.queue._claim(), [])
+
+    def test_backoff_grows_exponentially_up_to_max(self):
+        self.assertGreaterEqual(backoff_delay(1, 30, 3600), 30)
+        self.assertGreaterEqual(backoff_delay(3, 30, 3600), 120)
+        self.assertLessEqual(backoff_delay(20, 30, 3600), 3600 * 1.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+from sqlalchemy import event
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+
+from core.models import db, User  # noqa: E402
+from apps.milosign import workflow  # noqa: E402
+from apps.milosign.assignment import (  # noqa: E402
+    AssignmentError,
+    BulkAssigner,
+    parse_signers,
+)
+from apps.milosign.models import (  # noqa: E402
+    Document,
+    Signature,
+    SignatureAudit,
+    SignatureTemplate,
+)
+from apps.milosign.routes import milosign_bp  # noqa: E402
+
+
+class BulkAssignerTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            MILOSIGN_EXPIRY_SWEEPER=False,
+            SERVER_NAME="milo.test",
+        )
+        db.init_app(self.app)
+        self.app.register_blueprint(milosign_bp)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        users = [
+            User(username=f"u{i}", email=f"u{i}@example.com", password_hash="x",
+                 first_name=f"Usuario{i}")
+            for i in range(4)
+        ]
+        users.append(User(username="inactivo", email="inactivo@example.com",
+                          password_hash="x", is_active=False))
+        db.session.add_all(users)
+        db.session.commit()
+        self.owner_id = users[0].id
+
+        patcher = mock.patch.object(workflow, "send_bulk_email", side_effect=lambda r, **kw: len(r))
+        self.send_bulk_email = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def make_documents(self, n, status="draft"):
+        documents = [
+            Document(title=f"Contrato {i}", file_path="x", original_filename="x.pdf",
+                     owner_id=self.owner_id, status=status)
+            for i in range(n)
+        ]
+        db.session.add_all(documents)
+        db.session.commit()
+        return [d.id for d in documents]
+
+    def count_queries(self, func):
+        statements = []
+
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+        return result, len(statements)
+
+    def signers(self, *emails):
+        return [{"email": e, "order_index": i} for i, e in enumerate(emails, start=1)]
+
+    def test_assigns_sends_and_notifies_in_one_batch(self):
+        ids = self.make_documents(2) + self.make_documents(1, status="signed")
+        assigner = BulkAssigner(self.owner_id)
+
+        result = assigner.assign(
+            ids,
+            self.signers("u1@example.com", "U2@example.com", "nadie@example.com",
+                         "inactivo@example.com", "u1@example.com"),
+            send=True,
+        ).to_dict()
+
+        self.assertEqual(
+            {k: result[k] for k in ("documents", "created", "skipped", "sent", "notified")},
+            {"documents": 2, "created": 4, "skipped": 0, "sent": 2, "notified": 4},
+        )
+        self.assertEqual(
+            sorted(str(e.get("signer") or e.get("document_id")) for e in result["errors"]),
+            sorted(["nadie@example.com", "inactivo@example.com", str(ids[2])]),
+        )
+        # Un solo envío masivo para todo el lote
+        self.assertEqual(self.send_bulk_email.call_count, 1)
+        statuses = db.session.execute(
+            db.select(Document.status).where(Document.id.in_(ids[:2]))
+        ).scalars().all()
+        self.assertEqual(statuses, ["pending", "pending"])
+        orden = db.session.execute(
+            db.select(Signature.order_index).where(Signature.document_id == ids[0])
+            .order_by(Signature.order_index)
+        ).scalars().all()
+        self.assertEqual(orden, [1, 2])
+        acciones = db.session.execute(
+            db.select(SignatureAudit.action).order_by(SignatureAudit.id)
+        ).scalars().all()
+        self.assertEqual(sorted(acciones), ["assign_signers"] * 2 + ["send"] * 2)
+
+        # Repetir no duplica; solo el firmante nuevo de un documento en firma
+        # recibe aviso
+        again = assigner.assign(
+            ids[:1], self.signers("u1@example.com", "u3@example.com"), send=True
+        ).to_dict()
+        self.assertEqual((again["created"], again["skipped"]), (1, 1))
+        recipients = self.send_bulk_email.call_args.args[0]
+        self.assertEqual([email for email, _ in recipients], ["u3@example.com"])
+
+    def test_query_count_does_not_grow_with_documents(self):
+        signers = self.signers("u1@example.com", "u2@example.com", "u3@example.com")
+        pocos = self.make_documents(3)
+        muchos = self.make_documents(30)
+
+        _, queries_pocos = self.count_queries(
+            lambda: BulkAssigner(self.owner_id).assign(pocos, signers, send=True)
+        )
+        result, queries_muchos = self.count_queries(
+            lambda: BulkAssigner(self.owner_id).assign(muchos, signers, send=True)
+        )
+        self.assertEqual(result.created, 90)
+        self.assertEqual(queries_pocos, queries_muchos)
+
+    def test_batches_and_template_settings(self):
+        template = SignatureTemplate(
+            name="Contrato laboral", template_file="x", created_by=self.owner_id,
+            default_expiration_days=15, signature_order=True,
+        )
+        db.session.add(template)
+        db.session.commit()
+        ids = self.make_documents(5)
+
+        result = BulkAssigner(self.owner_id, batch_size=2).assign(
+            ids, self.signers("u1@example.com", "u2@example.com"),
+            template_id=template.id, send=True,
+        )
+        self.assertEqual((result.documents, result.created), (5, 10))
+        # Un envío por lote; con orden de firma solo el primer firmante
+        self.assertEqual(self.send_bulk_email.call_count, 3)
+        self.assertEqual(result.notified, 5)
+        documents = db.session.execute(
+            db.select(Document).where(Document.id.in_(ids))
+        ).scalars().all()
+        self.assertTrue(all(d.signature_order and d.expires_at for d in documents))
+        detalles = json.loads(db.session.execute(
+            db.select(SignatureAudit.details).where(SignatureAudit.action == "assign_signers")
+        ).scalars().first())
+        self.assertEqual(detalles["template_id"], template.id)
+
+    def test_validation(self):
+        with self.assertRaises(AssignmentError):
+            BulkAssigner(self.owner_id).assign([], self.signers("u1@example.com"))
+        with self.assertRaises(AssignmentError):
+            BulkAssigner(self.owner_id).assign([1], [])
+        self.assertEqual(
+            parse_signers("Ana@Example.com\n\n luis@example.com , 5 \n"),
+            [{"email": "ana@example.com", "order_index": 1},
+             {"email": "luis@example.com", "order_index": 5}],
+        )
+        with self.assertRaises(AssignmentError):
+            parse_signers("ana@example.com, primero")
+
+
+if __name__ == "__main__":
+    unittest.main()
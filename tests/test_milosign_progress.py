@@ -0,0 +1,123 @@
+import os
+import sys
+import unittest
+
+from sqlalchemy import event
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+
+from core.models import db, User  # noqa: E402
+from apps.milosign.models import Document, Signature  # noqa: E402
+from apps.milosign.queries import documents_with_progress, signature_counts  # noqa: E402
+
+
+class SignatureProgressTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        )
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        users = [
+            User(username=f"u{i}", email=f"u{i}@example.com", password_hash="x")
+            for i in range(4)
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+        self.owner, *signers = users
+        estados = {
+            "completo": ["signed", "signed"],
+            "parcial": ["signed", "pending", "declined"],
+            "vacio": [],
+        }
+        for title, lista in estados.items():
+            document = Document(
+                title=title, file_path="x", original_filename="x.pdf",
+                owner_id=self.owner.id,
+            )
+            document.signatures = [
+                Signature(signer_id=signer.id, status=status)
+                for signer, status in zip(signers, lista)
+            ]
+            db.session.add(document)
+        db.session.commit()
+        self.owner_id = self.owner.id
+        db.session.expunge_all()
+
+        self.queries = []
+        event.listen(db.engine, "before_cursor_execute", self._count)
+
+    def _count(self, conn, cursor, statement, *args):
+        self.queries.append(statement)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._count)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_documents_with_progress_is_one_query(self):
+        documents = documents_with_progress(
+            Document.owner_id == self.owner_id, order_by=Document.title
+        )
+        progreso = {
+            d.title: (d.get_signature_progress(), d.is_fully_signed())
+            for d in documents
+        }
+        self.assertEqual(len(self.queries), 1)
+        self.assertEqual(
+            progreso["parcial"][0],
+            {"signed": 1, "pending": 1, "total": 3, "percentage": (1 / 3) * 100},
+        )
+        self.assertEqual(progreso["completo"], (
+            {"signed": 2, "pending": 0, "total": 2, "percentage": 100.0}, True,
+        ))
+        self.assertEqual(progreso["vacio"][0]["total"], 0)
+        self.assertFalse(progreso["vacio"][1])
+        self.assertTrue(all("signatures" not in d.__dict__ for d in documents))
+
+    def test_progress_without_preload_uses_aggregate(self):
+        document = db.session.execute(
+            db.select(Document).where(Document.title == "parcial")
+        ).scalar_one()
+        self.queries.clear()
+        self.assertFalse(document.is_fully_signed())
+        self.assertEqual(len(self.queries), 1)
+        self.assertIn("GROUP BY", self.queries[0])
+        self.assertNotIn("signatures", document.__dict__)
+
+        self.assertEqual(signature_counts([]), {})
+        conteos = signature_counts([document.id, 999])
+        self.assertEqual(conteos[999]["total"], 0)
+
+    def test_commit_discards_precomputed_progress(self):
+        document = documents_with_progress(Document.title == "vacio")[0]
+        self.assertEqual(document.get_signature_progress()["total"], 0)
+
+        db.session.add(Signature(document_id=document.id, signer_id=self.owner_id))
+        db.session.commit()
+        self.assertEqual(document.get_signature_progress()["total"], 1)
+
+        db.session.execute(
+            db.update(Signature)
+            .where(Signature.document_id == document.id)
+            .values(status="signed")
+        )
+        db.session.refresh(document)
+        self.assertTrue(document.is_fully_signed())
+
+
+if __name__ == "__main__":
+    unittest.main()
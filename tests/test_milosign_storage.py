@@ -0,0 +1,128 @@
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+
+from core.models import db, User  # noqa: E402
+from apps.milosign import storage  # noqa: E402
+from apps.milosign.models import Blob, Document  # noqa: E402
+from apps.milosign.storage import BlobStore  # noqa: E402
+
+CONTENT = b"%PDF-1.4 contrato de prueba " * 5000
+
+
+class BlobStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            MILOSIGN_STORAGE_DIR=self.root,
+        )
+        db.init_app(self.app)
+        self.store = BlobStore()
+        self.store.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        owner = User(username="ana", email="ana@example.com", password_hash="x")
+        db.session.add(owner)
+        db.session.commit()
+        self.owner_id = owner.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def add_document(self, content, name="contrato.pdf"):
+        file_hash, size = self.store.put(io.BytesIO(content))
+        document = Document(
+            title=name,
+            file_path=self.store.relative_path(file_hash),
+            original_filename=name,
+            file_hash=file_hash,
+            file_size=size,
+            owner_id=self.owner_id,
+        )
+        db.session.add(document)
+        db.session.commit()
+        return document
+
+    def blob(self, file_hash):
+        db.session.expire_all()
+        return db.session.get(Blob, file_hash)
+
+    def test_put_hashes_and_shards(self):
+        file_hash, size = self.store.put(io.BytesIO(CONTENT))
+        self.assertEqual(file_hash, hashlib.sha256(CONTENT).hexdigest())
+        self.assertEqual(size, len(CONTENT))
+        ruta = os.path.join(self.root, file_hash[:2], file_hash[2:4], file_hash)
+        with open(ruta, "rb") as f:
+            self.assertEqual(f.read(), CONTENT)
+        self.assertEqual(os.listdir(os.path.join(self.root, "tmp")), [])
+
+    def test_same_content_is_stored_once_and_reference_counted(self):
+        primero = self.add_document(CONTENT, "a.pdf")
+        segundo = self.add_document(CONTENT, "b.pdf")
+        self.add_document(b"otro contenido")
+
+        self.assertEqual(primero.file_hash, segundo.file_hash)
+        self.assertEqual(self.blob(primero.file_hash).ref_count, 2)
+        self.assertEqual(self.blob(primero.file_hash).size, len(CONTENT))
+
+        db.session.delete(primero)
+        db.session.commit()
+        self.assertEqual(self.blob(segundo.file_hash).ref_count, 1)
+        # Con referencias vivas no se borra nada
+        with mock.patch.object(storage, "ORPHAN_MIN_AGE", -1):
+            self.assertEqual(self.store.collect(), 0)
+
+        file_hash = segundo.file_hash
+        db.session.delete(segundo)
+        db.session.commit()
+        # Recién tocado: se respeta la edad mínima
+        self.assertEqual(self.store.collect(), 0)
+        with mock.patch.object(storage, "ORPHAN_MIN_AGE", -1):
+            self.assertEqual(self.store.collect(), 1)
+        self.assertIsNone(self.blob(file_hash))
+        self.assertFalse(os.path.exists(self.store.path(file_hash)))
+
+    def test_send_supports_conditional_and_range_requests(self):
+        document = self.add_document(CONTENT)
+        with self.app.test_request_context(headers={"Range": "bytes=0-99"}):
+            response = self.store.send(document.file_hash, "contrato.pdf")
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response.content_length, 100)
+            # Contratos privados: ningún caché compartido debe guardarlos
+            self.assertEqual(response.headers["Cache-Control"], "no-cache, private")
+            self.assertNotIn("Expires", response.headers)
+            response.close()
+
+        with self.app.test_request_context(
+            headers={"If-None-Match": f'"{document.file_hash}"'}
+        ):
+            response = self.store.send(document.file_hash, "contrato.pdf")
+            self.assertEqual(response.status_code, 304)
+            self.assertIn("private", response.headers["Cache-Control"])
+            self.assertNotIn("public", response.headers["Cache-Control"])
+            response.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,236 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+from flask_login import LoginManager  # noqa: E402
+
+from core.models import db, User, UserAppPermission  # noqa: E402
+from apps.milosign import workflow  # noqa: E402
+from apps.milosign.models import Document, Signature, SignatureAudit  # noqa: E402
+from apps.milosign.routes import milosign_bp  # noqa: E402
+from apps.milosign.workflow import (  # noqa: E402
+    WorkflowError,
+    decline,
+    expire_overdue,
+    send_for_signature,
+    sign,
+)
+
+
+class SignatureWorkflowTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            MILOSIGN_EXPIRY_SWEEPER=False,
+            SERVER_NAME="milo.test",
+        )
+        db.init_app(self.app)
+        self.app.register_blueprint(milosign_bp)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.users = [
+            User(username=f"u{i}", email=f"u{i}@example.com", password_hash="x",
+                 first_name=f"Usuario{i}", last_name="Milo")
+            for i in range(4)
+        ]
+        db.session.add_all(self.users)
+        db.session.commit()
+
+        patcher = mock.patch.object(workflow, "send_bulk_email", return_value=1)
+        self.send_bulk_email = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def make_document(self, orden, signature_order=True, requires_all=True, **kwargs):
+        owner, *signers = self.users
+        document = Document(
+            title="Contrato", file_path="x", original_filename="x.pdf",
+            owner_id=owner.id, signature_order=signature_order,
+            requires_all_signatures=requires_all, **kwargs,
+        )
+        document.signatures = [
+            Signature(signer_id=signer.id, order_index=indice)
+            for signer, indice in zip(signers, orden)
+        ]
+        db.session.add(document)
+        db.session.commit()
+        return document
+
+    def notified(self, call):
+        return [email for email, _ in call.args[0]]
+
+    def test_ordered_signing_advances_and_notifies_in_batches(self):
+        document = self.make_document([1, 2, 2])
+        u1, u2, u3 = (u.id for u in self.users[1:])
+
+        send_for_signature(document, user_id=self.users[0].id)
+        self.assertEqual(document.status, "pending")
+        self.assertEqual(self.notified(self.send_bulk_email.call_args), ["u1@example.com"])
+
+        with self.assertRaisesRegex(WorkflowError, "turno"):
+            sign(document, u2, "firma")
+
+        self.assertFalse(sign(document, u1, "firma", ip_address="10.0.0.1"))
+        # El siguiente grupo (order_index 2) se notifica en un solo lote
+        self.assertEqual(self.send_bulk_email.call_count, 2)
+        self.assertEqual(
+            self.notified(self.send_bulk_email.call_args),
+            ["u2@example.com", "u3@example.com"],
+        )
+        sign_url = self.send_bulk_email.call_args.args[0][0][1]["sign_url"]
+        self.assertEqual(sign_url, f"http://milo.test/milosign/sign/{document.id}")
+
+        self.assertFalse(sign(document, u3, "firma"))
+        self.assertEqual(self.send_bulk_email.call_count, 2)
+        self.assertTrue(sign(document, u2, "firma"))
+        self.assertEqual(document.status, "signed")
+        self.assertTrue(document.is_fully_signed())
+
+        with self.assertRaises(WorkflowError):
+            sign(document, u2, "firma")
+        acciones = db.session.execute(
+            db.select(SignatureAudit.action).order_by(SignatureAudit.id)
+        ).scalars().all()
+        self.assertEqual(acciones, ["send", "sign", "sign", "sign", "completed"])
+
+    def test_draft_cannot_be_signed_and_needs_signers(self):
+        document = self.make_document([1])
+        with self.assertRaises(WorkflowError):
+            sign(document, self.users[1].id, "firma")
+        vacio = self.make_document([])
+        with self.assertRaisesRegex(WorkflowError, "firmantes"):
+            send_for_signature(vacio)
+
+    def test_decline_cancels_when_all_signatures_required(self):
+        document = self.make_document([1, 1], signature_order=False)
+        send_for_signature(document)
+        decline(document, self.users[2].id, reason="No estoy de acuerdo")
+        self.assertEqual(document.status, "cancelled")
+
+        opcional = self.make_document([1, 2], requires_all=False)
+        send_for_signature(opcional)
+        decline(opcional, self.users[1].id)
+        self.assertEqual(opcional.status, "pending")
+        # El siguiente firmante queda habilitado y se le notifica
+        self.assertEqual(self.notified(self.send_bulk_email.call_args), ["u2@example.com"])
+        self.assertTrue(sign(opcional, self.users[2].id, "firma"))
+
+    def test_sweeper_expires_overdue_pending_documents(self):
+        ayer = datetime.utcnow() - timedelta(days=1)
+        vencido = self.make_document([1, 2], expires_at=ayer)
+        vigente = self.make_document([1], expires_at=datetime.utcnow() + timedelta(days=5))
+        borrador = self.make_document([1], expires_at=ayer)
+        send_for_signature(vencido)
+        send_for_signature(vigente)
+        sign(vencido, self.users[1].id, "firma")
+
+        self.assertEqual(expire_overdue(), 1)
+        db.session.expire_all()
+        self.assertEqual(vencido.status, "expired")
+        self.assertEqual(
+            sorted(s.status for s in vencido.signatures), ["expired", "signed"]
+        )
+        self.assertEqual(vigente.status, "pending")
+        self.assertEqual(borrador.status, "draft")
+        self.assertEqual(expire_overdue(), 0)
+
+        plan = db.session.execute(db.text(
+            "EXPLAIN QUERY PLAN SELECT id FROM milosign_documents "
+            "WHERE status = 'pending' AND expires_at <= :now"
+        ), {"now": datetime.utcnow()}).all()
+        self.assertIn("idx_milosign_documents_status_expires", str(plan))
+
+    def test_sweeper_skips_documents_changed_after_select(self):
+        ayer = datetime.utcnow() - timedelta(days=1)
+        original = workflow._expirar_documentos
+        dialect = db.session.get_bind().dialect
+        for returning in (True, False):
+            firmado = self.make_document([1, 2], signature_order=False,
+                                         requires_all=False, expires_at=ayer)
+            vencido = self.make_document([1], expires_at=ayer)
+            send_for_signature(firmado)
+            send_for_signature(vencido)
+
+            def firmar_antes(ids, now):
+                # Otro proceso cierra el documento entre el SELECT y el UPDATE
+                db.session.execute(
+                    db.update(Document).where(Document.id == firmado.id)
+                    .values(status="signed")
+                )
+                return original(ids, now)
+
+            with mock.patch.object(workflow, "_expirar_documentos", firmar_antes), \
+                    mock.patch.object(dialect, "update_returning", returning):
+                self.assertEqual(expire_overdue(), 1)
+            db.session.expire_all()
+            self.assertEqual(firmado.status, "signed")
+            self.assertEqual([s.status for s in firmado.signatures], ["pending", "pending"])
+            self.assertEqual(vencido.status, "expired")
+            auditados = db.session.execute(
+                db.select(SignatureAudit.document_id)
+                .where(SignatureAudit.action == "expire")
+            ).scalars().all()
+            self.assertIn(vencido.id, auditados)
+            self.assertNotIn(firmado.id, auditados)
+
+    def test_optional_signatures_close_remaining_pending(self):
+        document = self.make_document([1, 1, 1], signature_order=False,
+                                      requires_all=False)
+        send_for_signature(document)
+        self.assertTrue(sign(document, self.users[1].id, "firma"))
+        self.assertEqual(document.status, "signed")
+        self.assertEqual(
+            sorted(s.status for s in document.signatures),
+            ["expired", "expired", "signed"],
+        )
+        with self.assertRaises(WorkflowError):
+            sign(document, self.users[2].id, "firma")
+
+    def test_sign_page_explains_unavailable_document(self):
+        LoginManager(self.app).user_loader(lambda user_id: db.session.get(User, int(user_id)))
+        firmante = self.users[1]
+        db.session.add(UserAppPermission(user_id=firmante.id, app_name="milosign"))
+        db.session.commit()
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(firmante.id)
+            session["_fresh"] = True
+
+        def mensaje(document):
+            response = client.get(f"/milosign/sign/{document.id}")
+            self.assertEqual(response.status_code, 302)
+            with client.session_transaction() as session:
+                return session.pop("_flashes")[0][1]
+
+        borrador = self.make_document([1])
+        self.assertIn("no ha sido enviado", mensaje(borrador))
+        cancelado = self.make_document([1])
+        send_for_signature(cancelado)
+        workflow.cancel(cancelado)
+        self.assertIn("cancelado", mensaje(cancelado))
+        en_espera = self.make_document([2, 1])
+        send_for_signature(en_espera)
+        self.assertIn("turno", mensaje(en_espera))
+
+
+if __name__ == "__main__":
+    unittest.main()
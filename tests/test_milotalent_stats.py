@@ -0,0 +1,123 @@
+import os
+import sys
+import unittest
+from datetime import date
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from models import db  # noqa: E402
+from apps.milotalent.models import PrestadorServicio  # noqa: E402
+from apps.milotalent.stats import StatsEngine, rango_edad  # noqa: E402
+from milotalent_factories import make_ps  # noqa: E402
+
+
+class StatsEngineTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add_all([
+            make_ps(1),
+            make_ps(2, sexo="F", nuevo_viejo="V", eps_id=2),
+            make_ps(3, sexo="F", fecha_nacimiento=date(1960, 5, 5)),
+        ])
+        db.session.commit()
+        self.engine = StatsEngine(ttl=60)
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self._on_execute)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._on_execute)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_summary_uses_one_query_and_is_cached(self):
+        stats, ultima = self.engine.resumen()
+        self.assertEqual(
+            stats,
+            {"total_ps": 3, "ps_nuevos": 2, "ps_viejos": 1,
+             "hombres": 1, "mujeres": 2},
+        )
+        self.assertIsNotNone(ultima)
+        self.engine.resumen()
+        self.assertEqual(len(self.statements), 1)
+
+    def test_breakdowns_group_by_dimension(self):
+        self.assertEqual(self.engine.desglose("eps"), {1: 2, 2: 1})
+        edades = self.engine.desglose("edad")
+        self.assertEqual(edades[rango_edad(date(1960, 5, 5))], 1)
+        self.assertEqual(sum(edades.values()), 3)
+        with self.assertRaises(ValueError):
+            self.engine.desglose("banco")
+
+    def test_incremental_updates_match_full_recount(self):
+        self.engine.resumen()
+        self.engine.desglose("eps")
+
+        nuevo = make_ps(4, sexo="F", eps_id=2)
+        db.session.add(nuevo)
+        marca = self.engine.marca()
+        db.session.commit()
+        self.engine.registrar_alta(nuevo, marca)
+
+        ps = PrestadorServicio.query.filter_by(cedula_ps="1001").first()
+        antes = self.engine.capturar(ps)
+        ps.nuevo_viejo = "V"
+        ps.eps_id = 3
+        db.session.commit()
+        self.engine.registrar_cambio(antes, ps)
+
+        self.statements.clear()
+        incremental, _ = self.engine.resumen()
+        desglose = self.engine.desglose("eps")
+        self.assertEqual(self.statements, [])
+        self.engine.invalidar()
+        self.assertEqual(incremental, self.engine.resumen()[0])
+        self.assertEqual(desglose, self.engine.desglose("eps"))
+
+    def test_snapshot_computed_after_commit_is_not_patched(self):
+        nuevo = make_ps(4, sexo="F", eps_id=2)
+        db.session.add(nuevo)
+        marca = self.engine.marca()
+        db.session.commit()
+        # Recalculo (TTL vencido) entre el commit y registrar_alta
+        self.assertEqual(self.engine.resumen()[0]["total_ps"], 4)
+        self.assertEqual(self.engine.desglose("eps"), {1: 2, 2: 2})
+        self.engine.registrar_alta(nuevo, marca)
+        self.assertEqual(self.engine.resumen()[0]["total_ps"], 4)
+        self.assertEqual(self.engine.desglose("eps"), {1: 2, 2: 2})
+
+        ps = PrestadorServicio.query.filter_by(cedula_ps="1002").first()
+        antes = self.engine.capturar(ps)
+        ps.sexo = "M"
+        db.session.commit()
+        self.engine.invalidar()
+        self.assertEqual(self.engine.resumen()[0]["hombres"], 2)
+        self.engine.registrar_cambio(antes, ps)
+        self.assertEqual(self.engine.resumen()[0]["hombres"], 2)
+
+        self.engine.registrar_alta(nuevo)  # sin marca: solo invalida
+        self.assertEqual(self.engine.resumen()[0]["total_ps"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
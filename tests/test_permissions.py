@@ -10,6 +10,7 @@ if SRC_PATH not in sys.path:
     sys.path.insert(0, SRC_PATH)
 
 from flask import Flask  # noqa: E402
+from sqlalchemy import event  # noqa: E402
 
 from models import (  # noqa: E402
     db,
@@ -19,6 +20,8 @@ from models import (  # noqa: E402
     Functionality,
     RoleAppAccess,
     RoleFunctionality,
+    UserRole,
+    invalidate_permission_cache,
 )
 
 
@@ -140,6 +143,85 @@ class PermissionModelTests(unittest.TestCase):
             self.assertTrue(u.has_functionality("milosign", "create"))
             self.assertFalse(u.has_functionality("milosign", "view"))
 
+    def test_snapshot_checks_issue_no_sql(self):
+        with self.app.app_context():
+            u = self.make_user("snap@milo.com")
+            u.roles.append(Role.query.get(self.role_sign_id))
+            db.session.add(
+                RoleFunctionality(
+                    role_id=self.role_sign_id,
+                    functionality_id=self.func_create_id,
+                )
+            )
+            db.session.commit()
+            self.assertTrue(u.has_functionality("milosign", "create"))
+
+            statements = []
+
+            def _count(*_args, **_kwargs):
+                statements.append(1)
+
+            engine = db.engine
+            event.listen(engine, "before_cursor_execute", _count)
+            try:
+                for _ in range(5):
+                    self.assertTrue(u.has_app_access("milosign"))
+                    self.assertTrue(u.has_functionality("milosign", "create"))
+                    self.assertFalse(u.has_functionality("milosign", "view"))
+            finally:
+                event.remove(engine, "before_cursor_execute", _count)
+            self.assertEqual(statements, [])
+
+    def test_snapshot_invalidated_on_bulk_role_change(self):
+        with self.app.app_context():
+            u = self.make_user("bulk@milo.com")
+            self.assertFalse(u.has_app_access("milosign"))
+
+            db.session.add(
+                RoleAppAccess(
+                    role_id=self.role_sign_id,
+                    app_id=self.app_milosign_id,
+                    full_access=True,
+                )
+            )
+            db.session.add(UserRole(user_id=u.id, role_id=self.role_sign_id))
+            db.session.commit()
+            self.assertTrue(u.has_app_access("milosign"))
+
+            # Los DELETE masivos requieren invalidación explícita
+            UserRole.query.filter_by(user_id=u.id).delete()
+            db.session.commit()
+            invalidate_permission_cache(u.id)
+            self.assertFalse(u.has_app_access("milosign"))
+
+    def test_snapshot_invalidated_on_commit_and_rollback(self):
+        with self.app.app_context():
+            u = self.make_user("tx@milo.com")
+            db.session.add(
+                RoleAppAccess(
+                    role_id=self.role_sign_id,
+                    app_id=self.app_milosign_id,
+                    full_access=True,
+                )
+            )
+            db.session.commit()
+            self.assertFalse(u.has_app_access("milosign"))
+
+            # El flush no invalida: el snapshot previo sigue vigente
+            db.session.add(UserRole(user_id=u.id, role_id=self.role_sign_id))
+            db.session.flush()
+            self.assertFalse(u.has_app_access("milosign"))
+            db.session.commit()
+            self.assertTrue(u.has_app_access("milosign"))
+
+            # Lo cacheado dentro de una transacción revertida se descarta
+            db.session.delete(UserRole.query.filter_by(user_id=u.id).one())
+            db.session.flush()
+            invalidate_permission_cache(u.id)  # p. ej. vencido el TTL
+            self.assertFalse(u.has_app_access("milosign"))
+            db.session.rollback()
+            self.assertTrue(u.has_app_access("milosign"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from models import db, TalentEntidad  # noqa: E402
+from apps.milotalent.models import (  # noqa: E402
+    PrestadorServicio,
+    RELACIONES_ENTIDAD,
+    precargar_entidades,
+)
+from milotalent_factories import make_ps  # noqa: E402
+
+
+class PrecargaEntidadesTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+            municipio = TalentEntidad(tipo_entidad="municipio", nombre="Cali")
+            banco = TalentEntidad(tipo_entidad="banco", nombre="Banco Ñandú")
+            eps = TalentEntidad(tipo_entidad="eps", nombre="EPS Sur")
+            db.session.add_all([municipio, banco, eps])
+            db.session.flush()
+            db.session.add_all([
+                make_ps(n, expedida_id=municipio.id, banco_id=banco.id,
+                        eps_id=eps.id if n % 2 else banco.id)
+                for n in range(1, 21)
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_page_resolves_names_with_one_query(self):
+        with self.app.app_context():
+            prestadores = db.session.execute(
+                db.select(PrestadorServicio).order_by(PrestadorServicio.id)
+            ).scalars().all()
+            consultas = []
+
+            def contar(conn, cursor, statement, *args):
+                consultas.append(statement)
+
+            event.listen(db.engine, "before_cursor_execute", contar)
+            try:
+                precargar_entidades(prestadores)
+                datos = [ps.to_dict(resolved=True) for ps in prestadores]
+            finally:
+                event.remove(db.engine, "before_cursor_execute", contar)
+
+            self.assertEqual(len(consultas), 1)
+            self.assertEqual(datos[0]["expedida_nombre"], "Cali")
+            self.assertEqual(datos[0]["eps_nombre"], "EPS Sur")
+            self.assertEqual(datos[1]["eps_nombre"], "Banco Ñandú")
+            self.assertIsNone(datos[0]["caja_compensacion_nombre"])
+            self.assertEqual(
+                len([k for k in datos[0] if k.endswith("_nombre")]),
+                len(RELACIONES_ENTIDAD),
+            )
+            # La precarga no deja cambios pendientes
+            self.assertFalse(db.session.dirty)
+
+    def test_to_dict_default_keeps_ids_only(self):
+        with self.app.app_context():
+            ps = db.session.get(PrestadorServicio, 1)
+            self.assertNotIn("banco_nombre", ps.to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
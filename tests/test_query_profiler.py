@@ -0,0 +1,84 @@
+import os
+import sys
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask, jsonify  # noqa: E402
+
+from models import db, TalentEntidad  # noqa: E402
+from query_profiler import QueryProfiler, percentile  # noqa: E402
+
+
+def make_app(profiling):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        PERF_PROFILING=profiling,
+        TESTING=True,
+    )
+    db.init_app(app)
+    profiler = QueryProfiler()
+    profiler.init_app(app)
+
+    @app.route("/entidades/<int:n>")
+    def entidades(n):
+        # N+1 deliberado: una consulta por iteración
+        for _ in range(n):
+            db.session.execute(db.select(TalentEntidad.id)).all()
+        return jsonify({"ok": True})
+
+    with app.app_context():
+        db.create_all()
+    return app, profiler
+
+
+class QueryProfilerTests(unittest.TestCase):
+    def test_percentile_nearest_rank(self):
+        valores = list(range(1, 101))
+        self.assertEqual(percentile(valores, 50), 50)
+        self.assertEqual(percentile(valores, 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_counts_queries_and_sets_server_timing(self):
+        app, profiler = make_app({"enabled": True, "slow_query_ms": 0})
+        client = app.test_client()
+        response = client.get("/entidades/3")
+        self.assertIn('desc="3 consultas"', response.headers["Server-Timing"])
+        client.get("/entidades/1")
+
+        snapshot = profiler.snapshot()
+        stats = snapshot["endpoints"]["entidades"]
+        self.assertEqual(stats["peticiones"], 2)
+        self.assertEqual(stats["consultas"], {"promedio": 2.0, "max": 3})
+        self.assertEqual(set(stats["total_ms"]), {"p50", "p90", "p95", "p99"})
+        # slow_query_ms=0: todas quedan como lentas, con su endpoint
+        self.assertEqual(len(snapshot["slow_queries"]), 4)
+        self.assertEqual(snapshot["slow_queries"][0]["endpoint"], "entidades")
+        self.assertIn("talent_entidades", snapshot["slow_queries"][0]["statement"])
+
+    def test_slow_query_list_is_bounded(self):
+        app, profiler = make_app(
+            {"enabled": True, "slow_query_ms": 0, "max_slow_queries": 2}
+        )
+        app.test_client().get("/entidades/5")
+        lentas = profiler.snapshot()["slow_queries"]
+        self.assertEqual(len(lentas), 2)
+        self.assertGreaterEqual(lentas[0]["ms"], lentas[1]["ms"])
+
+    def test_disabled_profiler_adds_nothing(self):
+        app, profiler = make_app({"enabled": False})
+        response = app.test_client().get("/entidades/2")
+        self.assertNotIn("Server-Timing", response.headers)
+        self.assertEqual(profiler.snapshot()["endpoints"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from flask import Flask  # noqa: E402
+
+from models import db, AuditLog, EmailOutbox  # noqa: E402
+import retention  # noqa: E402
+from retention import purge_table, run_retention  # noqa: E402
+
+
+class RetentionTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SECRET_KEY="test",
+            SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            TESTING=True,
+        )
+        db.init_app(self.app)
+        self.now = datetime(2025, 6, 1)
+        with self.app.app_context():
+            db.create_all()
+            old = self.now - timedelta(days=400)
+            recent = self.now - timedelta(days=10)
+            logs = [
+                AuditLog(event_type="old", created_at=old) for _ in range(7)
+            ] + [AuditLog(event_type="recent", created_at=recent)]
+            db.session.add_all(logs)
+            db.session.commit()
+        self.archive_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(self.archive_dir)
+
+    def test_purge_deletes_expired_rows_in_chunks(self):
+        with self.app.app_context():
+            cutoff = self.now - timedelta(days=180)
+            deleted = purge_table(
+                "audit_logs", "created_at", cutoff, chunk_size=3
+            )
+            self.assertEqual(deleted, 7)
+            remaining = [log.event_type for log in AuditLog.query.all()]
+            self.assertEqual(remaining, ["recent"])
+
+    def test_run_retention_archives_before_deleting(self):
+        with self.app.app_context():
+            results = run_retention(
+                self.app, archive_dir=self.archive_dir, now=self.now
+            )
+        self.assertEqual(results["audit_logs"], 7)
+        # Tablas de otros módulos que no existen se omiten
+        self.assertEqual(results["milosign_audit"], 0)
+
+        files = os.listdir(self.archive_dir)
+        self.assertEqual(len(files), 1)
+        with gzip.open(os.path.join(self.archive_dir, files[0]), "rt") as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(len(rows), 7)
+        self.assertTrue(all(r["event_type"] == "old" for r in rows))
+
+    def test_failed_archive_write_keeps_rows(self):
+        with self.app.app_context():
+            cutoff = self.now - timedelta(days=180)
+            with mock.patch.object(
+                retention._Archive, "write_rows", side_effect=OSError("disco lleno")
+            ):
+                with self.assertRaises(OSError):
+                    purge_table(
+                        "audit_logs", "created_at", cutoff,
+                        chunk_size=3, archive_dir=self.archive_dir,
+                    )
+            self.assertEqual(AuditLog.query.count(), 8)
+
+            # run_retention no borra nada y lo reporta en 0
+            with mock.patch.object(
+                retention._Archive, "write_rows", side_effect=OSError("disco lleno")
+            ), self.assertLogs("miloapps.retention", "ERROR"):
+                results = run_retention(
+                    self.app, tables=["audit_logs"],
+                    archive_dir=self.archive_dir, now=self.now,
+                )
+            self.assertEqual(results, {"audit_logs": 0})
+            self.assertEqual(AuditLog.query.count(), 8)
+
+    def test_rolled_back_delete_keeps_rows(self):
+        with self.app.app_context():
+            db.session.execute(db.text(
+                "CREATE TRIGGER bloquea_borrado BEFORE DELETE ON audit_logs "
+                "BEGIN SELECT RAISE(ABORT, 'bloqueado'); END"
+            ))
+            db.session.commit()
+            cutoff = self.now - timedelta(days=180)
+            with self.assertRaises(Exception):
+                purge_table(
+                    "audit_logs", "created_at", cutoff,
+                    chunk_size=3, archive_dir=self.archive_dir,
+                )
+            self.assertEqual(AuditLog.query.count(), 8)
+        # El bloque quedó archivado (se tolera repetirlo en el reintento)
+        files = os.listdir(self.archive_dir)
+        with gzip.open(os.path.join(self.archive_dir, files[0]), "rt") as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_outbox_purges_only_sent_emails(self):
+        old = self.now - timedelta(days=200)
+        with self.app.app_context():
+            for status in (EmailOutbox.SENT, EmailOutbox.PENDING, EmailOutbox.FAILED):
+                db.session.add(EmailOutbox(
+                    subject="Hola", recipients='["a@example.com"]', body="x",
+                    status=status, created_at=old,
+                ))
+            db.session.commit()
+
+            results = run_retention(self.app, tables=["email_outbox"], now=self.now)
+
+            self.assertEqual(results, {"email_outbox": 1})
+            restantes = sorted(
+                db.session.execute(db.select(EmailOutbox.status)).scalars()
+            )
+            self.assertEqual(restantes, [EmailOutbox.FAILED, EmailOutbox.PENDING])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import io
+import json
+import logging
+import os
+import sys
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from structured_logging import (  # noqa: E402
+    REDACTED,
+    SamplingFilter,
+    configure_logging,
+    flush_logging,
+    get_logger,
+)
+
+
+class StructuredLoggingTests(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+
+    def tearDown(self):
+        configure_logging(stream=io.StringIO())
+
+    def lines(self):
+        flush_logging()
+        return [json.loads(l) for l in self.stream.getvalue().splitlines()]
+
+    def test_json_lines_with_extra_fields_and_redaction(self):
+        configure_logging({"format": "json"}, stream=self.stream)
+        get_logger("test").info(
+            "Registro de %s", "PS",
+            extra={"cedula_ps": "123", "datos": {"password": "x", "ok": 1}},
+        )
+        (linea,) = self.lines()
+        self.assertEqual(linea["message"], "Registro de PS")
+        self.assertEqual(linea["logger"], "miloapps.test")
+        self.assertEqual(linea["level"], "INFO")
+        self.assertEqual(linea["cedula_ps"], REDACTED)
+        self.assertEqual(linea["datos"], {"password": REDACTED, "ok": 1})
+
+    def test_emails_masked_in_message(self):
+        configure_logging({"format": "json"}, stream=self.stream)
+        get_logger("email").error("Fallo enviando a %s", "ana.perez@example.com")
+        self.assertEqual(
+            self.lines()[0]["message"], "Fallo enviando a a***@example.com"
+        )
+
+    def test_per_logger_levels(self):
+        configure_logging(
+            {"format": "json", "level": "WARNING", "loggers": {"miloapps.sql": "DEBUG"}},
+            stream=self.stream,
+        )
+        get_logger("app").info("omitido")
+        get_logger("sql").debug("visible")
+        self.assertEqual([l["message"] for l in self.lines()], ["visible"])
+
+    def test_sampling_keeps_warnings(self):
+        configure_logging(
+            {"format": "json", "level": "DEBUG",
+             "sampling": {"miloapps.request": 0.0}},
+            stream=self.stream,
+        )
+        request_logger = get_logger("request")
+        for _ in range(20):
+            request_logger.debug("petición")
+        request_logger.warning("lenta")
+        get_logger("app").debug("sin muestreo")
+        self.assertEqual(
+            [l["message"] for l in self.lines()], ["lenta", "sin muestreo"]
+        )
+
+    def test_longest_prefix_rate(self):
+        filtro = SamplingFilter({"miloapps": 0.5, "miloapps.request": 0.1})
+        self.assertEqual(filtro.rate_for("miloapps.request.api"), 0.1)
+        self.assertEqual(filtro.rate_for("miloapps.requests"), 0.5)
+        self.assertEqual(filtro.rate_for("otro"), 1.0)
+
+    def test_exceptions_are_serialized(self):
+        configure_logging({"format": "json"}, stream=self.stream)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            get_logger("app").exception("falló")
+        linea = self.lines()[0]
+        self.assertIn("ValueError: boom", linea["exc_info"])
+        self.assertEqual(logging.getLogger("miloapps").propagate, False)
+
+
+if __name__ == "__main__":
+    unittest.main()
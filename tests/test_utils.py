@@ -0,0 +1,32 @@
+import os
+import sys
+import unittest
+
+# Ensure 'src' is on the Python path when running tests from repo root
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from utils import parse_user_agent, user_agent_cache_stats  # noqa: E402
+
+CHROME_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+class UserAgentCacheTests(unittest.TestCase):
+    def test_user_agent_parsing_is_memoized(self):
+        parse_user_agent.cache_clear()
+        first = parse_user_agent(CHROME_UA)
+        for _ in range(3):
+            self.assertIs(parse_user_agent(CHROME_UA), first)
+        stats = user_agent_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 1))
+        self.assertTrue(first.is_pc)
+
+
+if __name__ == "__main__":
+    unittest.main()
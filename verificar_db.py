@@ -3,41 +3,45 @@
 Script para verificar registros en la base de datos de MiloApps
 """
 
-import sqlite3
 import os
+import sys
 from datetime import datetime
 
-# Ruta a la base de datos
-db_path = os.path.join(os.path.dirname(__file__), "data", "miloapps.db")
+sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import get_engine
+
+engine = get_engine()
 
 
 def verificar_base_datos():
     """Verificar el contenido de la base de datos"""
     print("🔍 Verificando base de datos MiloApps...")
-    print(f"📍 Ruta: {db_path}")
+    print(f"📍 Motor: {engine.url.render_as_string(hide_password=True)}")
     print("-" * 60)
 
     try:
         # Conectar a la base de datos
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = engine.connect()
+        inspector = inspect(conn)
 
         # Listar todas las tablas
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tablas = cursor.fetchall()
+        tablas = inspector.get_table_names()
 
         print("📋 Tablas en la base de datos:")
         for tabla in tablas:
-            print(f"   • {tabla[0]}")
+            print(f"   • {tabla}")
 
         print("-" * 60)
 
         # Verificar usuarios
         print("👥 USUARIOS:")
-        cursor.execute(
-            "SELECT id, username, email, created_at FROM users ORDER BY created_at DESC LIMIT 5;"
-        )
-        usuarios = cursor.fetchall()
+        usuarios = conn.execute(
+            text("SELECT id, username, email, created_at FROM users ORDER BY created_at DESC LIMIT 5")
+        ).fetchall()
 
         if usuarios:
             for user in usuarios:
@@ -63,13 +67,9 @@ def verificar_base_datos():
 
         tablas_encontradas = []
         for tabla_nombre in posibles_tablas:
-            cursor.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ?;",
-                (f"%{tabla_nombre}%",),
-            )
-            resultado = cursor.fetchall()
+            resultado = [t for t in tablas if tabla_nombre in t]
             if resultado:
-                tablas_encontradas.extend([t[0] for t in resultado])
+                tablas_encontradas.extend(resultado)
 
         if tablas_encontradas:
             print("✅ Tablas de MiloTalent encontradas:")
@@ -77,13 +77,15 @@ def verificar_base_datos():
                 print(f"   • {tabla}")
 
                 # Mostrar contenido de cada tabla
-                cursor.execute(f"SELECT * FROM {tabla} ORDER BY rowid DESC LIMIT 5;")
-                registros = cursor.fetchall()
+                pk = inspector.get_pk_constraint(tabla)["constrained_columns"]
+                orden = f" ORDER BY {pk[0]} DESC" if pk else ""
+                registros = conn.execute(
+                    text(f"SELECT * FROM {tabla}{orden} LIMIT 5")
+                ).fetchall()
 
                 if registros:
                     # Obtener nombres de columnas
-                    cursor.execute(f"PRAGMA table_info({tabla});")
-                    columnas = [col[1] for col in cursor.fetchall()]
+                    columnas = [col["name"] for col in inspector.get_columns(tabla)]
 
                     print(f"   📊 Registros en {tabla}:")
                     for registro in registros:
@@ -108,17 +110,17 @@ def verificar_base_datos():
         # Verificar logs de auditoría si existen
         print("📝 LOGS DE AUDITORÍA:")
         try:
-            cursor.execute(
-                "SELECT action, details, created_at FROM audit_log ORDER BY created_at DESC LIMIT 10;"
-            )
-            logs = cursor.fetchall()
+            logs = conn.execute(
+                text("SELECT action, details, created_at FROM audit_log ORDER BY created_at DESC LIMIT 10")
+            ).fetchall()
 
             if logs:
                 for log in logs:
                     print(f"   {log[2]} | {log[0]} | {log[1]}")
             else:
                 print("   ⚠️  No hay logs de auditoría")
-        except sqlite3.OperationalError:
+        except SQLAlchemyError:
+            conn.rollback()
             print("   ⚠️  Tabla audit_log no existe")
 
         conn.close()
@@ -3,14 +3,19 @@
 Script para verificar todos los campos enum en la base de datos
 """
 
-import sqlite3
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import get_engine
 
 def verificar_todos_los_enums():
     """Verifica todos los campos que usan enums para detectar problemas similares."""
     
-    db_path = os.path.join('data', 'miloapps.db')
-    
     # Campos enum a verificar
     campos_enum = {
         'sexo': ['M', 'F'],
@@ -25,9 +30,9 @@ def verificar_todos_los_enums():
         'nuevo_viejo': ['N', 'V']
     }
     
+    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = get_engine().connect()
         
         print("🔍 VERIFICANDO TODOS LOS CAMPOS ENUM")
         print("=" * 40)
@@ -35,8 +40,9 @@ def verificar_todos_los_enums():
         problemas_encontrados = 0
         
         for campo, valores_esperados in campos_enum.items():
-            cursor.execute(f"SELECT DISTINCT {campo} FROM talent_prestadores_new WHERE {campo} IS NOT NULL")
-            valores_db = [row[0] for row in cursor.fetchall()]
+            valores_db = conn.execute(
+                text(f"SELECT DISTINCT {campo} FROM talent_prestadores_new WHERE {campo} IS NOT NULL")
+            ).scalars().all()
             
             valores_problematicos = [v for v in valores_db if v not in valores_esperados]
             
@@ -56,7 +62,7 @@ def verificar_todos_los_enums():
         
         return problemas_encontrados == 0
         
-    except sqlite3.Error as e:
+    except SQLAlchemyError as e:
         print(f"❌ Error con la base de datos: {e}")
         return False
     except Exception as e:
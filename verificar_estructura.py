@@ -3,57 +3,61 @@
 Script para verificar la estructura de la tabla y datos existentes
 """
 
-import sqlite3
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import DEFAULT_DATABASE_PATH, get_engine
 
 def verificar_estructura():
     """Verifica la estructura de la tabla."""
     
-    db_path = os.path.join('data', 'miloapps.db')
-    
-    if not os.path.exists(db_path):
-        print(f"❌ Base de datos no encontrada en: {db_path}")
+    if not os.environ.get("DATABASE_URL") and not os.path.exists(DEFAULT_DATABASE_PATH):
+        print(f"❌ Base de datos no encontrada en: {DEFAULT_DATABASE_PATH}")
         return False
     
+    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = get_engine().connect()
+        inspector = inspect(conn)
         
         # Obtener información de la tabla
-        cursor.execute("PRAGMA table_info(talent_prestadores_new)")
-        columns = cursor.fetchall()
-        
-        if not columns:
+        if not inspector.has_table("talent_prestadores_new"):
             print("❌ La tabla talent_prestadores_new no existe")
             # Ver qué tablas existen
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = cursor.fetchall()
             print("📋 Tablas existentes:")
-            for table in tables:
-                print(f"   - {table[0]}")
+            for table in inspector.get_table_names():
+                print(f"   - {table}")
             return False
         
+        columns = inspector.get_columns("talent_prestadores_new")
+        pk_columns = set(
+            inspector.get_pk_constraint("talent_prestadores_new")["constrained_columns"]
+        )
+        
         print("📋 ESTRUCTURA DE LA TABLA talent_prestadores_new:")
         print("-" * 50)
         for col in columns:
-            print(f"   {col[1]} ({col[2]}) - {'NOT NULL' if col[3] else 'NULL'} - {'PK' if col[5] else ''}")
+            print(f"   {col['name']} ({col['type']}) - {'NULL' if col['nullable'] else 'NOT NULL'} - {'PK' if col['name'] in pk_columns else ''}")
         
         # Verificar registros existentes
-        cursor.execute("SELECT COUNT(*) FROM talent_prestadores_new")
-        total = cursor.fetchone()[0]
+        total = conn.execute(text("SELECT COUNT(*) FROM talent_prestadores_new")).scalar()
         print(f"\n📊 Total registros: {total}")
         
         if total > 0:
             # Mostrar algunos registros
-            cursor.execute("SELECT * FROM talent_prestadores_new LIMIT 3")
-            records = cursor.fetchall()
+            records = conn.execute(text("SELECT * FROM talent_prestadores_new LIMIT 3")).fetchall()
             print("\n📄 Primeros registros:")
             for i, record in enumerate(records):
                 print(f"   Registro {i+1}: {record[:5]}...")  # Primeros 5 campos
         
         return True
         
-    except sqlite3.Error as e:
+    except SQLAlchemyError as e:
         print(f"❌ Error con la base de datos: {e}")
         return False
     except Exception as e:
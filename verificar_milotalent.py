@@ -3,22 +3,28 @@
 Script simplificado para verificar registros de MiloTalent
 """
 
-import sqlite3
 import os
+import sys
 
-# Ruta a la base de datos
-db_path = os.path.join(os.path.dirname(__file__), "data", "miloapps.db")
+sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import get_engine
+
+engine = get_engine()
 
 
 def verificar_milotalent():
     """Verificar específicamente los datos de MiloTalent"""
     print("🔍 Verificando registros de MiloTalent...")
-    print(f"📍 Base de datos: {db_path}")
+    print(f"📍 Base de datos: {engine.url.render_as_string(hide_password=True)}")
     print("=" * 60)
 
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = engine.connect()
+        inspector = inspect(conn)
 
         # Tablas de MiloTalent que encontramos
         tablas_talent = [
@@ -37,55 +43,56 @@ def verificar_milotalent():
 
             try:
                 # Contar registros
-                cursor.execute(f"SELECT COUNT(*) FROM {tabla};")
-                total = cursor.fetchone()[0]
+                total = conn.execute(text(f"SELECT COUNT(*) FROM {tabla}")).scalar()
                 print(f"📊 Total de registros: {total}")
 
                 if total > 0:
                     # Mostrar estructura de la tabla
-                    cursor.execute(f"PRAGMA table_info({tabla});")
-                    columnas = cursor.fetchall()
+                    columnas = [
+                        (col["name"], col["type"])
+                        for col in inspector.get_columns(tabla)
+                    ]
                     print("🏗️  Estructura:")
-                    for col in columnas:
-                        print(f"   • {col[1]} ({col[2]})")
+                    for nombre, tipo in columnas:
+                        print(f"   • {nombre} ({tipo})")
 
                     # Mostrar últimos registros
-                    cursor.execute(
-                        f"SELECT * FROM {tabla} ORDER BY rowid DESC LIMIT 3;"
-                    )
-                    registros = cursor.fetchall()
+                    pk = inspector.get_pk_constraint(tabla)["constrained_columns"]
+                    orden = f" ORDER BY {pk[0]} DESC" if pk else ""
+                    registros = conn.execute(
+                        text(f"SELECT * FROM {tabla}{orden} LIMIT 3")
+                    ).fetchall()
 
                     print("📄 Últimos registros:")
                     for i, registro in enumerate(registros, 1):
                         print(f"   Registro {i}:")
                         for j, valor in enumerate(registro):
                             col_nombre = (
-                                columnas[j][1] if j < len(columnas) else f"col_{j}"
+                                columnas[j][0] if j < len(columnas) else f"col_{j}"
                             )
                             print(f"      {col_nombre}: {valor}")
                 else:
                     print("   ⚠️  Sin registros")
 
-            except sqlite3.Error as e:
+            except SQLAlchemyError as e:
+                conn.rollback()
                 print(f"   ❌ Error: {e}")
 
         # Verificar usuarios también
         print(f"\n📋 TABLA: USERS")
         print("-" * 40)
         try:
-            cursor.execute("SELECT COUNT(*) FROM users;")
-            total_users = cursor.fetchone()[0]
+            total_users = conn.execute(text("SELECT COUNT(*) FROM users")).scalar()
             print(f"📊 Total de usuarios: {total_users}")
 
             if total_users > 0:
-                cursor.execute(
-                    "SELECT id, username, email FROM users ORDER BY id DESC LIMIT 3;"
-                )
-                usuarios = cursor.fetchall()
+                usuarios = conn.execute(
+                    text("SELECT id, username, email FROM users ORDER BY id DESC LIMIT 3")
+                ).fetchall()
                 print("👥 Últimos usuarios:")
                 for user in usuarios:
                     print(f"   ID: {user[0]} | Usuario: {user[1]} | Email: {user[2]}")
-        except sqlite3.Error as e:
+        except SQLAlchemyError as e:
             print(f"   ❌ Error: {e}")
 
         conn.close()
@@ -3,52 +3,59 @@
 Script para verificar tabla de municipios
 """
 
-import sqlite3
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import get_engine
 
 def verificar_tabla_municipios():
     """Verifica la tabla de municipios."""
     
-    db_path = os.path.join('data', 'miloapps.db')
-    
+    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = get_engine().connect()
+        inspector = inspect(conn)
         
         print("🏛️ VERIFICANDO TABLA MUNICIPIOS")
         print("=" * 40)
         
         # Verificar si existe la tabla
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='talent_municipios'")
-        exists = cursor.fetchone()
+        exists = inspector.has_table("talent_municipios")
         
         if exists:
             print("✅ Tabla talent_municipios existe")
             
             # Verificar estructura
-            cursor.execute("PRAGMA table_info(talent_municipios)")
-            columns = cursor.fetchall()
+            columns = inspector.get_columns("talent_municipios")
+            pk_columns = set(
+                inspector.get_pk_constraint("talent_municipios")["constrained_columns"]
+            )
             print(f"📋 Columnas ({len(columns)}):")
             for col in columns:
-                print(f"   - {col[1]}: {col[2]} {'(PK)' if col[5] else ''}")
+                print(f"   - {col['name']}: {col['type']} {'(PK)' if col['name'] in pk_columns else ''}")
             
             # Verificar datos
-            cursor.execute("SELECT COUNT(*) FROM talent_municipios")
-            count = cursor.fetchone()[0]
+            count = conn.execute(text("SELECT COUNT(*) FROM talent_municipios")).scalar()
             print(f"📊 Total registros: {count}")
             
             if count > 0:
-                cursor.execute("SELECT id, nombre, departamento FROM talent_municipios LIMIT 5")
-                records = cursor.fetchall()
+                records = conn.execute(
+                    text("SELECT id, nombre, departamento FROM talent_municipios LIMIT 5")
+                ).fetchall()
                 print("📄 Primeros municipios:")
                 for record in records:
                     print(f"   - {record[0]}: {record[1]} - {record[2]}")
         else:
             print("❌ Tabla talent_municipios NO existe")
         
-        return exists is not None
+        return exists
         
-    except sqlite3.Error as e:
+    except SQLAlchemyError as e:
         print(f"❌ Error con la base de datos: {e}")
         return False
     except Exception as e:
@@ -3,12 +3,15 @@
 Script para verificar los nuevos registros de MiloTalent
 """
 
-import sqlite3
 import os
+import sys
 import json
 
-# Ruta a la base de datos
-db_path = os.path.join(os.path.dirname(__file__), "data", "miloapps.db")
+sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+
+from sqlalchemy import text
+
+from database import get_engine
 
 
 def verificar_nuevos_registros():
@@ -17,22 +20,22 @@ def verificar_nuevos_registros():
     print("=" * 60)
 
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = get_engine().connect()
 
         # Verificar prestadores
         print("👥 PRESTADORES DE SERVICIO:")
         print("-" * 40)
-        cursor.execute(
-            """
+        prestadores = conn.execute(
+            text(
+                """
             SELECT id_ps, cedula, nombre_completo, correo, telefono, 
                    perfil_profesional, sector_experiencia, modalidad, estado
             FROM talent_prestadores 
             ORDER BY id_ps DESC 
             LIMIT 5
         """
-        )
-        prestadores = cursor.fetchall()
+            )
+        ).fetchall()
 
         if prestadores:
             print(f"📊 Total encontrados: {len(prestadores)}")
@@ -53,16 +56,17 @@ def verificar_nuevos_registros():
         # Verificar auditoría
         print(f"\n📝 REGISTROS DE AUDITORÍA:")
         print("-" * 40)
-        cursor.execute(
-            """
+        auditorias = conn.execute(
+            text(
+                """
             SELECT id_auditoria, ps_id, usuario_id, accion, modulo, 
                    descripcion, fecha_accion, ip_usuario
             FROM talent_auditoria 
             ORDER BY fecha_accion DESC 
             LIMIT 5
         """
-        )
-        auditorias = cursor.fetchall()
+            )
+        ).fetchall()
 
         if auditorias:
             print(f"📊 Total de auditorías: {len(auditorias)}")
@@ -84,20 +88,18 @@ def verificar_nuevos_registros():
         print("-" * 40)
 
         # Contar por estado
-        cursor.execute(
-            "SELECT estado, COUNT(*) FROM talent_prestadores GROUP BY estado"
-        )
-        estados = cursor.fetchall()
+        estados = conn.execute(
+            text("SELECT estado, COUNT(*) FROM talent_prestadores GROUP BY estado")
+        ).fetchall()
         if estados:
             print("Por estado:")
             for estado, count in estados:
                 print(f"   • {estado}: {count}")
 
         # Contar por modalidad
-        cursor.execute(
-            "SELECT modalidad, COUNT(*) FROM talent_prestadores GROUP BY modalidad"
-        )
-        modalidades = cursor.fetchall()
+        modalidades = conn.execute(
+            text("SELECT modalidad, COUNT(*) FROM talent_prestadores GROUP BY modalidad")
+        ).fetchall()
         if modalidades:
             print("Por modalidad:")
             for modalidad, count in modalidades:
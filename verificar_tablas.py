@@ -1,14 +1,19 @@
-import sqlite3
+import os
+import sys
 
-conn = sqlite3.connect('data/miloapps.db')
-cursor = conn.cursor()
+sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+
+from sqlalchemy import inspect
+
+from database import get_engine
+
+engine = get_engine()
 
 # Obtener todas las tablas
-cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-tables = cursor.fetchall()
+tables = inspect(engine).get_table_names()
 
 print("📊 TABLAS EXISTENTES:")
 for table in tables:
-    print(f"   - {table[0]}")
+    print(f"   - {table}")
 
-conn.close()
\ No newline at end of file
+engine.dispose()